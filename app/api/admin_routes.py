@@ -1,10 +1,19 @@
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timezone
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
-from app.schemas.admin_create_user import AdminCreateUserRequest
-from app.core.database.collections import auth_users_collection
-from app.core.passwords import hash_password
+from app.schemas.admin_create_user import AdminCreateUserRequest, AdminBulkCreateUsersRequest
+from app.repositories.factory import get_repositories
+from app.core.passwords import hash_passwords
+from app.core.database.invalidation import InvalidationBus
 from app.api.permissions import require_role
+from app.services.roster_import_service import RosterImportService, ImportFormat
+from app.services.campus_state_rebuild_service import CampusStateRebuildService
+from app.services.reconcile_service import ReconcileService
+from app.services.analytics_service import LatenessAnalyticsService
+from app.services.revocation_service import RevocationService
+from app.services.presence_service import PresenceService
+from app.services.session_service import SessionService
 
 router = APIRouter(
     prefix="/admin",
@@ -16,10 +25,10 @@ router = APIRouter(
 @router.post("/users", status_code=status.HTTP_201_CREATED, 
              dependencies=[Depends(require_role("ADMIN"))])
 async def create_user(req: AdminCreateUserRequest):
+    users = get_repositories().auth_users
+
     # Prevent duplicate usernames
-    existing = await auth_users_collection.find_one(
-        {"username": req.username}
-    )
+    existing = await users.existing_usernames([req.username])
 
     if existing:
         raise HTTPException(
@@ -27,16 +36,297 @@ async def create_user(req: AdminCreateUserRequest):
             detail="Username already exists"
         )
 
-    await auth_users_collection.insert_one({
+    [password_hash] = await hash_passwords([req.password])
+
+    rejected = await users.create_many([{
         "username": req.username,
-        "password_hash": hash_password(req.password),
+        "password_hash": password_hash,
         "role": req.role,
         "is_active": True,
         "created_at": datetime.utcnow(),
-    })
+    }])
+
+    if rejected:
+        raise HTTPException(
+            status_code=400,
+            detail="Username already exists"
+        )
+    await InvalidationBus.publish("auth_users")
 
     return {
         "message": "User created successfully",
         "username": req.username,
         "role": req.role,
     }
+
+
+@router.post("/users/bulk", status_code=status.HTTP_201_CREATED)
+async def create_users_bulk(req: AdminBulkCreateUsersRequest):
+    """
+    Create many users in one call.
+
+    - Existing usernames are found with a single query
+    - Passwords are hashed in parallel on a process pool
+    - Users are inserted in one batch
+    - Every requested user gets its own result entry
+    """
+    users = get_repositories().auth_users
+    existing = await users.existing_usernames(user.username for user in req.users)
+
+    results = []
+    to_create = []
+    seen = set()
+    for user in req.users:
+        if user.username in existing:
+            results.append({"username": user.username, "status": "failed", "detail": "Username already exists"})
+        elif user.username in seen:
+            results.append({"username": user.username, "status": "failed", "detail": "Duplicate username in request"})
+        else:
+            seen.add(user.username)
+            results.append({"username": user.username, "status": "created", "role": user.role})
+            to_create.append(user)
+
+    if to_create:
+        password_hashes = await hash_passwords([user.password for user in to_create])
+        now = datetime.utcnow()
+        docs = [
+            {
+                "username": user.username,
+                "password_hash": password_hash,
+                "role": user.role,
+                "is_active": True,
+                "created_at": now,
+            }
+            for user, password_hash in zip(to_create, password_hashes)
+        ]
+
+        # Usernames taken by a concurrent request since the check above
+        failed = await users.create_many(docs)
+        if failed:
+            for result in results:
+                if result["status"] == "created" and result["username"] in failed:
+                    result.update(status="failed", detail="Username already exists")
+                    result.pop("role", None)
+
+        await InvalidationBus.publish("auth_users")
+
+    return {
+        "created": sum(1 for result in results if result["status"] == "created"),
+        "failed": sum(1 for result in results if result["status"] == "failed"),
+        "results": results,
+    }
+
+
+@router.post("/users/{username}/disable")
+async def disable_user(username: str):
+    """
+    Deactivate a user and revoke every token they hold.
+    """
+    if not await get_repositories().auth_users.set_active(username=username, is_active=False):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    await RevocationService.revoke_user(username=username)
+    await InvalidationBus.publish("auth_users")
+
+    return {"message": "User disabled", "username": username}
+
+
+@router.post("/users/{username}/revoke-tokens")
+async def revoke_user_tokens(username: str):
+    """
+    Sign a user out everywhere without disabling the account.
+    """
+    await RevocationService.revoke_user(username=username)
+    return {"message": "Tokens revoked", "username": username}
+
+
+@router.post("/students/import")
+async def import_students(
+    request: Request,
+    format: Optional[ImportFormat] = Query(None),
+):
+    """
+    Bulk upsert students from a raw CSV or NDJSON request body.
+
+    - CSV needs a header row with roll_number, name, phone_number
+    - The format is taken from `format`, else from the Content-Type
+    - Invalid rows are reported and skipped
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "ndjson" in content_type or "json" in content_type else "csv"
+
+    service = RosterImportService()
+    result = await service.execute(request.stream(), format=format)
+
+    return {
+        "status": "imported",
+        **result
+    }
+
+
+@router.post("/campus-state/rebuild")
+async def rebuild_campus_state(
+    workers: Optional[int] = Query(None, ge=1, le=32),
+    run_id: Optional[str] = Query(None),
+):
+    """
+    Rebuild campus_state by replaying access_logs.
+
+    - Pass the `run_id` of an interrupted rebuild to resume it
+    """
+    service = CampusStateRebuildService()
+    kwargs = {"run_id": run_id}
+    if workers:
+        kwargs["workers"] = workers
+    result = await service.execute(**kwargs)
+
+    return {
+        "status": "rebuilt",
+        **result
+    }
+
+
+@router.post("/campus-state/reconcile")
+async def reconcile_campus_state(repair: bool = Query(False)):
+    """
+    Check campus_state, exit_permissions and visitors against the latest
+    access log of every identifier touched since the last run.
+
+    - With `repair=true`, drifted records are fixed from the logs
+    """
+    service = ReconcileService()
+    return await service.execute(repair=repair)
+
+
+@router.get("/analytics/lateness")
+async def lateness_analytics(
+    start: datetime = Query(...),
+    end: Optional[datetime] = Query(None),
+    limit: int = Query(100, ge=1, le=10000),
+):
+    """
+    Late returns, average minutes late and time outside by purpose,
+    per student, per batch (roll-number prefix) and per weekday.
+
+    - Only trips that both started and ended in [start, end) count
+    - `end` defaults to now; results are cached per time range
+    - `limit` caps the per-student list
+    """
+    # Stored times are naive UTC
+    start = start.astimezone(timezone.utc).replace(tzinfo=None) if start.tzinfo else start
+    if end is None:
+        # Whole minutes, so repeated calls share a cache entry
+        end = datetime.utcnow().replace(second=0, microsecond=0)
+    elif end.tzinfo:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+
+    service = LatenessAnalyticsService()
+    try:
+        result = await service.execute(start=start, end=end)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return {**result, "by_student": result["by_student"][:limit]}
+
+
+@router.get("/presence")
+async def presence_as_of(
+    at: Optional[datetime] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    user_type: Optional[Literal["student", "visitor"]] = Query(None),
+):
+    """
+    Who was on campus at a point in time, or during a window.
+
+    - `at`: visitors inside and students outside at that moment
+    - `start` + `end`: those inside/outside at any time in [start, end)
+    - Each result is a session with its start/end time and gates;
+      logs after `indexed_through` are not reflected yet
+    """
+    if (at is None) == (start is None or end is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either at, or both start and end"
+        )
+
+    service = PresenceService()
+    if at is not None:
+        return await service.at(_naive_utc(at), user_type)
+    try:
+        return await service.during(_naive_utc(start), _naive_utc(end), user_type)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/sessions")
+async def list_sessions(
+    start: datetime = Query(...),
+    end: Optional[datetime] = Query(None),
+    user_type: Optional[Literal["student", "visitor"]] = Query(None),
+    identifier: Optional[str] = Query(None),
+    min_minutes: Optional[float] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+):
+    """
+    Visits (visitors inside, students outside) that started in
+    [start, end), newest first, with gates, purpose and duration.
+
+    - `min_minutes`: only finished visits at least this long
+    - `end` defaults to now
+    """
+    service = SessionService()
+    try:
+        return await service.list(
+            start=_naive_utc(start),
+            end=_naive_utc(end) if end else datetime.utcnow(),
+            user_type=user_type,
+            identifier=identifier,
+            min_seconds=min_minutes * 60 if min_minutes is not None else None,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/sessions/totals")
+async def session_totals(
+    user_type: Literal["student", "visitor"] = Query(...),
+    start: datetime = Query(...),
+    end: Optional[datetime] = Query(None),
+    identifier: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=10000),
+):
+    """
+    Hours per identifier spent inside (visitors) or outside (students)
+    during [start, end), e.g. a student's time outside this month.
+    """
+    service = SessionService()
+    try:
+        return await service.totals(
+            start=_naive_utc(start),
+            end=_naive_utc(end) if end else datetime.utcnow(),
+            user_type=user_type,
+            identifier=identifier,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Stored times are naive UTC
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
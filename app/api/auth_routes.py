@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
-from app.core.database.collections import auth_users_collection
+from app.repositories.factory import get_repositories
 from app.core.passwords import verify_password
 from app.core.security import create_access_token
+from app.api.dependencies import get_current_user
+from app.models.auth_user import AuthUser
+from app.services.revocation_service import RevocationService
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -12,8 +17,8 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
-    user = await auth_users_collection.find_one(
-        {"username": form_data.username, "is_active": True}
+    user = await get_repositories().auth_users.get_active(
+        username=form_data.username
     )
 
     if not user:
@@ -34,3 +39,17 @@ async def login(
         "access_token": token,
         "token_type": "bearer",
     }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(user: AuthUser = Depends(get_current_user)):
+    """
+    Revoke the token used for this request.
+    """
+    if user.jti is None:
+        # Issued before tokens carried an id; revoke the user's tokens instead
+        await RevocationService.revoke_user(username=user.username)
+    else:
+        await RevocationService.revoke_token(
+            jti=user.jti, expires_at=datetime.utcfromtimestamp(user.exp)
+        )
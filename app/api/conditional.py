@@ -0,0 +1,64 @@
+import zlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from app.api.compression import choose_encoding
+from app.core.database.invalidation import InvalidationBus, Topic
+
+
+def dataset_etag(topic: Topic, variant: str = "") -> str:
+    """
+    Strong ETag for a dataset, from its invalidation version. Versions
+    only move forward and are shared by all workers through the bus.
+    `variant` tells apart representations such as sparse fieldsets.
+    """
+    variant = f".{zlib.crc32(variant.encode()):08x}" if variant else ""
+    return f'"{topic}.{InvalidationBus.epoch}{InvalidationBus.tag(topic)}{variant}"'
+
+
+def _matching_tag(if_none_match: str, etag: str, encoding: Optional[str]) -> Optional[str]:
+    """
+    The tag in If-None-Match naming the current version, as the client
+    has it: plain, or suffixed by CompressionMiddleware with the
+    encoding this request would get again.
+    """
+    suffixed = f'{etag[:-1]}-{encoding}"' if encoding else None
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == etag or tag == suffixed:
+            return tag
+        if tag == "*":
+            return etag
+    return None
+
+
+def not_modified(
+    request: Request,
+    response: Response,
+    topic: Topic,
+    variant: str = ""
+) -> Optional[Response]:
+    """
+    A 304 when the client already has the current version; otherwise
+    sets the ETag on `response` and returns None.
+
+    Call before reading the data: a write that lands mid-read then only
+    makes the tag older than the body, never newer. The 304 carries the
+    tag the client matched, so it is the one its 200 had, suffix and all.
+    """
+    etag = dataset_etag(topic, variant)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        matched = _matching_tag(if_none_match, etag, encoding)
+        if matched is not None:
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={**headers, "ETag": matched}
+            )
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,61 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Tuple
+
+from fastapi import Request, Response
+
+from app.repositories.base import StorageUnavailable
+
+STALE_SNAPSHOT_ENTRIES = int(os.getenv("STALE_SNAPSHOT_ENTRIES", "32"))
+# Rows kept across all snapshots; a bigger result is not kept at all
+STALE_SNAPSHOT_ROWS = int(os.getenv("STALE_SNAPSHOT_ROWS", "20000"))
+
+# Last good result per request path + query string, with its row count
+_snapshots: "OrderedDict[str, Tuple[float, object, int]]" = OrderedDict()
+_rows = 0
+
+
+async def read_or_stale(
+    request: Request,
+    response: Response,
+    load: Callable[[], Awaitable[object]]
+):
+    """
+    Result of `load()`, remembered as the last known good answer for
+    this URL. While the database is unavailable that answer is served
+    instead, marked with `X-Data-Stale: true` and an `Age` header, and
+    without an ETag so clients don't cache it as current.
+    """
+    key = f"{request.url.path}?{request.url.query}"
+    try:
+        result = await load()
+    except StorageUnavailable:
+        snapshot = _snapshots.get(key)
+        if snapshot is None:
+            raise
+        saved_at, result, _ = snapshot
+        if "etag" in response.headers:
+            del response.headers["etag"]
+        response.headers["X-Data-Stale"] = "true"
+        response.headers["Age"] = str(int(time.time() - saved_at))
+        return result
+
+    _remember(key, result)
+    return result
+
+
+def _remember(key: str, result: object) -> None:
+    global _rows
+    rows = len(result) if isinstance(result, list) else 1
+    if key in _snapshots:
+        _rows -= _snapshots.pop(key)[2]
+    if rows > STALE_SNAPSHOT_ROWS:
+        # e.g. a whole log listing: holding it would cost more than the
+        # outage fallback is worth
+        return
+
+    _snapshots[key] = (time.time(), result, rows)
+    _rows += rows
+    while len(_snapshots) > STALE_SNAPSHOT_ENTRIES or _rows > STALE_SNAPSHOT_ROWS:
+        _rows -= _snapshots.popitem(last=False)[1][2]
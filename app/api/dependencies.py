@@ -4,6 +4,7 @@ from jose import jwt, JWTError
 
 from app.models.auth_user import AuthUser
 from app.core.security import SECRET_KEY, ALGORITHM
+from app.services.revocation_service import RevocationService
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -17,9 +18,16 @@ def get_current_user(
             SECRET_KEY,
             algorithms=[ALGORITHM],
         )
-        return AuthUser(**payload)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
+
+    # In-memory denylist: no I/O per request
+    if RevocationService.is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+        )
+    return AuthUser(**payload)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+
+from app.api.permissions import require_role
+from app.services.edge_sync_service import EdgeSyncService
+
+router = APIRouter(prefix="/edge", tags=["Edge"])
+
+
+@router.get("/status",
+            dependencies=[Depends(require_role("GUARD", "ADMIN"))])
+async def edge_status():
+    """
+    Sync backlog, lag and throughput of this edge node.
+    """
+    return EdgeSyncService.status()
+
+
+@router.post("/sync",
+             dependencies=[Depends(require_role("ADMIN"))])
+async def edge_sync():
+    """
+    Push pending events now and pull a snapshot if the outbox is empty.
+    """
+    pushed = await EdgeSyncService.push()
+    snapshot = await EdgeSyncService.pull_snapshot()
+    return {"pushed": pushed, "snapshot": snapshot, **EdgeSyncService.status()}
@@ -1,76 +1,195 @@
-from fastapi import APIRouter, Depends
-from app.core.database.collections import (
-    campus_state_collection,
-    student_logs_collection,
-    visitor_logs_collection
-)
+import asyncio
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from app.repositories.factory import get_repositories
 from app.api.permissions import require_role
-from typing import List
+from app.api.conditional import not_modified
+from app.api.degraded import read_or_stale
+from app.core.database.routing import dashboard_reads
+from app.services.vehicle_index_service import VehicleIndex
+from app.services.gate_traffic_service import GateTraffic
+from app.services.scan_debounce_service import ScanDebounce
+from typing import List, Optional
 
 router = APIRouter()
 
+STATE_FIELDS = {
+    "_id", "user_type", "identifier", "user_name", "phone_number",
+    "number_of_visitors", "vehicle_number", "purpose", "is_inside",
+    "last_entry_time", "last_exit_time",
+}
+LOG_FIELDS = {
+    "_id", "user_type", "identifier", "name", "phone_number", "direction",
+    "gate_number", "purpose", "timestamp", "number_of_visitors",
+    "allowed_until", "vehicle_number",
+}
+
+
+def parse_fields(fields: Optional[str], allowed: set) -> Optional[List[str]]:
+    """
+    Turn `fields=identifier,timestamp` into a field list (None = all).
+    """
+    if fields is None:
+        return None
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields requested"
+        )
+    return requested
+
+
+FieldsQuery = Query(
+    None,
+    description="Comma-separated fields to return, e.g. identifier,direction,timestamp"
+)
+
 
 @router.get("/visitors/inside", 
             dependencies=[Depends(require_role("GUARD", "ADMIN"))])
-async def visitors_inside():
+async def visitors_inside(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FieldsQuery
+):
     """
     Returns all visitors currently inside the campus.
     """
-    results = await campus_state_collection.find(
-        {"user_type": "visitor", "is_inside": True}
-    ).to_list(None)
-    
-    # Convert ObjectId to string for JSON serialization
-    for result in results:
-        if "_id" in result:
-            result["_id"] = str(result["_id"])
-    
-    return results
+    selected = parse_fields(fields, STATE_FIELDS)
+    cached = not_modified(request, response, "campus_state", ",".join(selected or []))
+    if cached:
+        return cached
+    with dashboard_reads("campus_state"):
+        return await read_or_stale(
+            request, response,
+            lambda: get_repositories().campus_state.list(
+                user_type="visitor", is_inside=True, fields=selected
+            )
+        )
 
 
 @router.get("/students/outside",
             dependencies=[Depends(require_role("GUARD", "ADMIN"))])
-async def students_outside():
+async def students_outside(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FieldsQuery
+):
     """
     Returns all students currently outside the campus.
     """
-    results = await campus_state_collection.find(
-        {"user_type": "student", "is_inside": False}
-    ).to_list(None)
-    
-    # Convert ObjectId to string for JSON serialization
-    for result in results:
-        if "_id" in result:
-            result["_id"] = str(result["_id"])
-    
-    return results
+    selected = parse_fields(fields, STATE_FIELDS)
+    cached = not_modified(request, response, "campus_state", ",".join(selected or []))
+    if cached:
+        return cached
+    with dashboard_reads("campus_state"):
+        return await read_or_stale(
+            request, response,
+            lambda: get_repositories().campus_state.list(
+                user_type="student", is_inside=False, fields=selected
+            )
+        )
 
 
 @router.get("/logs/students",
             dependencies=[Depends(require_role("GUARD", "ADMIN"))])
-async def get_student_logs():
+async def get_student_logs(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FieldsQuery
+):
     """
     Returns all student entry/exit logs ordered by timestamp (newest first).
     """
-    results = await student_logs_collection.find().sort("timestamp", -1).to_list(None)
-    
-    for result in results:
-        if "_id" in result:
-            result["_id"] = str(result["_id"])
-    
-    return results
+    selected = parse_fields(fields, LOG_FIELDS)
+    cached = not_modified(request, response, "student_logs", ",".join(selected or []))
+    if cached:
+        return cached
+    with dashboard_reads("student_logs"):
+        return await read_or_stale(
+            request, response,
+            lambda: get_repositories().access_logs.list(user_type="student", fields=selected)
+        )
 
 
 @router.get("/logs/visitors",
             dependencies=[Depends(require_role("GUARD", "ADMIN"))])
-async def get_visitor_logs():
+async def get_visitor_logs(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FieldsQuery
+):
     """
     Returns all visitor entry/exit logs ordered by timestamp (newest first).
     """
-    results = await visitor_logs_collection.find().sort("timestamp", -1).to_list(None)
-    
-    for result in results:
-        if "_id" in result:
-            result["_id"] = str(result["_id"])
-    
-    return results
+    selected = parse_fields(fields, LOG_FIELDS)
+    cached = not_modified(request, response, "visitor_logs", ",".join(selected or []))
+    if cached:
+        return cached
+    with dashboard_reads("visitor_logs"):
+        return await read_or_stale(
+            request, response,
+            lambda: get_repositories().access_logs.list(user_type="visitor", fields=selected)
+        )
+
+
+@router.get("/vehicles/inside/{vehicle_number}",
+            dependencies=[Depends(require_role("GUARD", "ADMIN"))])
+async def vehicle_inside(vehicle_number: str):
+    """
+    Whether a plate belongs to a visitor currently inside.
+    Spaces, hyphens and case are ignored.
+    """
+    record = VehicleIndex.lookup(vehicle_number)
+    return {
+        "inside": record is not None,
+        "vehicle": asdict(record) if record else None
+    }
+
+
+@router.get("/vehicles/inside",
+            dependencies=[Depends(require_role("GUARD", "ADMIN"))])
+async def search_vehicles_inside(
+    prefix: Optional[str] = Query(None, min_length=1),
+    partial: Optional[str] = Query(None, min_length=2),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Search plates of visitors currently inside.
+
+    - `prefix`: plates starting with it, e.g. `KA01`
+    - `partial`: plates containing it; `?` matches one unreadable character, e.g. `AB?23`
+    """
+    if (prefix is None) == (partial is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of prefix or partial"
+        )
+
+    if prefix is not None:
+        records = VehicleIndex.search_prefix(prefix, limit)
+    else:
+        records = VehicleIndex.search_partial(partial, limit)
+    return [asdict(record) for record in records]
+
+
+@router.get("/gates/throughput",
+            dependencies=[Depends(require_role("GUARD", "ADMIN"))])
+async def gate_throughput():
+    """
+    Live scans per minute per gate over the last 1, 5 and 15 minutes,
+    from in-memory counters (no database query).
+    """
+    return await asyncio.to_thread(GateTraffic.snapshot)
+
+
+@router.get("/gates/debounce",
+            dependencies=[Depends(require_role("GUARD", "ADMIN"))])
+async def scan_debounce_stats():
+    """
+    Repeated scans this worker answered without running the access
+    services. Per-gate rates are in /gates/throughput as `*_duplicate`.
+    """
+    return ScanDebounce.stats()
@@ -5,6 +5,8 @@ from app.schemas.student_exit import StudentExitRequest
 from app.services.access.student_entry_service import StudentEntryService
 from app.services.access.student_exit_service import StudentExitService 
 from app.api.permissions import require_role
+from app.repositories.base import StorageUnavailable
+from app.services.scan_debounce_service import ScanDebounce
 
 router = APIRouter() 
 
@@ -18,7 +20,15 @@ async def student_entry(req: StudentEntryRequest):
     - Checks if the student is already inside
     - Validates entry timing if student had previously exited with a return time
     - Records the entry in access logs
+    - A repeat within SCAN_DEBOUNCE_SECONDS gets this response again
+      with `duplicate: true`
     """
+    return await ScanDebounce.run(
+        ("student", req.roll_number, "entry"), req.gate_number, lambda: _student_entry(req)
+    )
+
+
+async def _student_entry(req: StudentEntryRequest) -> dict:
     service = StudentEntryService() 
     
     try:
@@ -62,7 +72,15 @@ async def student_exit(req: StudentExitRequest):
     - Validates exit purpose and return time
     - Creates an exit permission for re-entry validation
     - Records the exit in access logs
+    - A repeat within SCAN_DEBOUNCE_SECONDS gets this response again
+      with `duplicate: true`
     """
+    return await ScanDebounce.run(
+        ("student", req.roll_number, "exit"), req.gate_number, lambda: _student_exit(req)
+    )
+
+
+async def _student_exit(req: StudentExitRequest) -> dict:
     service = StudentExitService() 
     
     try:
@@ -80,6 +98,8 @@ async def student_exit(req: StudentExitRequest):
             "message": str(e),
             "roll_number": req.roll_number
         }
+    except StorageUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
@@ -4,12 +4,20 @@ from app.schemas.visitor_entry import VisitorEntryRequest
 from app.services.access.visitor_entry_service import VisitorEntryService
 from app.services.access.visitor_exit_service import VisitorExitService
 from app.api.permissions import require_role
+from app.services.scan_debounce_service import ScanDebounce
 router = APIRouter()
 
 
 @router.post("/entry",
              dependencies=[Depends(require_role("GUARD"))])
 async def visitor_entry(req: VisitorEntryRequest = Body(...)):
+    # A double submit returns the first visitor_id instead of registering twice
+    return await ScanDebounce.run(
+        ("visitor", req.phone_number, "entry"), req.gate_number, lambda: _visitor_entry(req)
+    )
+
+
+async def _visitor_entry(req: VisitorEntryRequest) -> dict:
     service = VisitorEntryService()
 
     visitor_id = await service.execute(
@@ -29,6 +37,12 @@ async def visitor_entry(req: VisitorEntryRequest = Body(...)):
 @router.post("/exit/{visitor_id}",
              dependencies=[Depends(require_role("GUARD"))])
 async def visitor_exit(visitor_id: str, gate_number: int = Query(..., ge=1, le=10)):
+    return await ScanDebounce.run(
+        ("visitor", visitor_id, "exit"), gate_number, lambda: _visitor_exit(visitor_id, gate_number)
+    )
+
+
+async def _visitor_exit(visitor_id: str, gate_number: int) -> dict:
     service = VisitorExitService()
     await service.execute(visitor_id=visitor_id, gate_number=gate_number)
 
@@ -0,0 +1,158 @@
+import functools
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, PyMongoError, WTimeoutError
+
+from app.core.log import get_logger
+from app.repositories.base import StorageUnavailable
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATIO = float(os.getenv("BREAKER_FAILURE_RATIO", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "10"))
+
+logger = get_logger("breaker")
+
+# Set inside a guarded call: nested guarded calls are part of its outcome
+_inside: ContextVar[bool] = ContextVar("breaker_inside", default=False)
+
+
+def is_outage(error: PyMongoError) -> bool:
+    """
+    Timeouts and lost connections say something about the database's
+    health; duplicate keys and other rejected commands do not.
+    """
+    return (
+        isinstance(error, (ConnectionFailure, ExecutionTimeout, WTimeoutError))
+        or error.timeout
+    )
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and their outcomes fill a rolling window.
+    When at least `failure_ratio` of the last `window` calls failed, it
+    opens and calls fail at once for `open_seconds`. After that a single
+    probe call is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_ratio: float = BREAKER_FAILURE_RATIO,
+        open_seconds: float = BREAKER_OPEN_SECONDS
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self._outcomes = deque(maxlen=window)
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at < self.open_seconds:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> int:
+        if self._opened_at is None:
+            return 1
+        remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+        return max(int(remaining + 0.999), 1)
+
+    def before_call(self) -> bool:
+        """
+        Raises StorageUnavailable while open. Returns True when the call
+        is the half-open probe.
+        """
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "open":
+            raise StorageUnavailable(retry_after=self.retry_after())
+        self._probing = True
+        return True
+
+    def record(self, ok: bool, probe: bool = False) -> None:
+        if probe:
+            self._probing = False
+            if ok:
+                logger.info("Circuit closed", extra={"breaker": self.name})
+                self._opened_at = None
+                self._outcomes.clear()
+                self._failures = 0
+            else:
+                self._opened_at = time.monotonic()
+            return
+
+        if self._opened_at is not None:
+            # A call that started before the breaker opened
+            return
+
+        if len(self._outcomes) == self._outcomes.maxlen:
+            self._failures -= not self._outcomes[0]
+        self._outcomes.append(ok)
+        self._failures += not ok
+
+        if (
+            not ok
+            and len(self._outcomes) >= self.min_calls
+            and self._failures >= self.failure_ratio * len(self._outcomes)
+        ):
+            logger.warning(
+                "Circuit opened",
+                extra={"breaker": self.name, "failures": self._failures, "calls": len(self._outcomes)},
+            )
+            self._opened_at = time.monotonic()
+
+    def guard(self, func):
+        """
+        Decorator for async database calls. Outages are counted and
+        surface as StorageUnavailable; other errors pass through.
+
+        A guarded call made inside another one (a service job calling a
+        guarded repository method, say) runs straight through; the
+        outermost call gets the single verdict.
+        """
+        @functools.wraps(func)
+        async def run(*args, **kwargs):
+            if _inside.get():
+                return await func(*args, **kwargs)
+            probe = self.before_call()
+            token = _inside.set(True)
+            try:
+                result = await func(*args, **kwargs)
+            except PyMongoError as e:
+                outage = is_outage(e)
+                # Otherwise the server answered; the database is up
+                self.record(not outage, probe)
+                if outage:
+                    raise StorageUnavailable(retry_after=self.retry_after()) from e
+                raise
+            except BaseException:
+                # Cancelled or failed outside the driver: no verdict
+                if probe:
+                    self._probing = False
+                raise
+            finally:
+                _inside.reset(token)
+            self.record(True, probe)
+            return result
+
+        return run
+
+
+mongo_breaker = CircuitBreaker("mongo")
+guarded = mongo_breaker.guard
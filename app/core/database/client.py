@@ -3,11 +3,31 @@ from typing import Final
 from dotenv import load_dotenv
 import os
 
+import pymongo
+
+from app.core.tracing import MongoCommandTracer
+
 load_dotenv()
 
-MONGODB_URI: Final[str] = os.getenv("MONGO_URI")
+# Motor connects lazily, so the default costs nothing on non-Mongo backends
+MONGODB_URI: Final[str] = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DATABASE_NAME: Final[str] = os.getenv("DATABASE_NAME", "campus_security")
 
+# Deadline for every operation (server selection, connection checkout,
+# server time and network), so a stalled database can't hang requests
+MONGO_TIMEOUT_MS: Final[int] = int(os.getenv("MONGO_TIMEOUT_MS", "2000"))
+# Background and admin batch work gets this budget for the whole job
+MONGO_BATCH_TIMEOUT_MS: Final[int] = int(os.getenv("MONGO_BATCH_TIMEOUT_MS", "300000"))
+
+
+def batch_deadline():
+    """
+    Deadline for a block of batch operations (reconcile, analytics,
+    roster loads, edge sync) in place of the per-operation default.
+    """
+    return pymongo.timeout(MONGO_BATCH_TIMEOUT_MS / 1000)
+
+
 class MongoClient:
     _client: AsyncIOMotorClient | None = None
 
@@ -16,7 +36,11 @@ class MongoClient:
         if cls._client is None:
             if not MONGODB_URI:
                 raise RuntimeError("MONGO_URI is not set")
-            cls._client = AsyncIOMotorClient(MONGODB_URI)
+            cls._client = AsyncIOMotorClient(
+                MONGODB_URI,
+                timeoutMS=MONGO_TIMEOUT_MS,
+                event_listeners=[MongoCommandTracer()]
+            )
         return cls._client
 
     @classmethod
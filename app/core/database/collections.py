@@ -19,3 +19,15 @@ visitors_collection: AsyncIOMotorCollection = db["visitors"]
 students_collection: AsyncIOMotorCollection = db["students"]
 
 auth_users_collection = db["auth_users"]
+
+cache_versions_collection: AsyncIOMotorCollection = db["cache_versions"]
+
+reconcile_checkpoints_collection: AsyncIOMotorCollection = db["reconcile_checkpoints"]
+
+sync_conflicts_collection: AsyncIOMotorCollection = db["sync_conflicts"]
+
+token_revocations_collection: AsyncIOMotorCollection = db["token_revocations"]
+
+sessions_collection: AsyncIOMotorCollection = db["sessions"]
+
+session_checkpoints_collection: AsyncIOMotorCollection = db["session_checkpoints"]
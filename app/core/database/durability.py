@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+from typing import Dict, Literal, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import WriteConcern
+
+Operation = Literal["insert", "update", "delete"]
+
+# Named write concerns; None leaves the client/server default
+PROFILES: Dict[str, Optional[WriteConcern]] = {
+    # Acknowledged by a majority and journaled: survives failover
+    "strict": WriteConcern(w="majority", j=True),
+    # Acknowledged by the primary without waiting for the journal
+    "fast": WriteConcern(w=1, j=False),
+    "default": None,
+}
+
+# Campus state and everything an access decision reads must not be lost;
+# the high-volume log inserts trade a small loss window for latency
+_DEFAULTS = {
+    "campus_state": "strict",
+    "exit_permissions": "strict",
+    "visitors": "strict",
+    "auth_users": "strict",
+    "token_revocations": "strict",
+    "access_logs.insert": "fast",
+    "student_logs.insert": "fast",
+    "visitor_logs.insert": "fast",
+}
+
+
+def _parse(spec: str) -> Dict[str, str]:
+    """
+    "campus_state=strict,access_logs.insert=fast" -> rules, by
+    collection or collection.operation.
+    """
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        target, _, profile = item.partition("=")
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown durability profile in WRITE_DURABILITY: {item}")
+        rules[target.strip()] = profile
+    return rules
+
+
+# Overrides of the defaults above, e.g. "access_logs=strict"
+WRITE_DURABILITY = os.getenv("WRITE_DURABILITY", "")
+_OVERRIDES = _parse(WRITE_DURABILITY)
+
+_cache: Dict[Tuple[str, str], AsyncIOMotorCollection] = {}
+
+
+def profile_for(collection: str, operation: Operation) -> str:
+    # Any override beats any default, so "access_logs=strict" covers inserts too
+    for rules in (_OVERRIDES, _DEFAULTS):
+        profile = rules.get(f"{collection}.{operation}") or rules.get(collection)
+        if profile is not None:
+            return profile
+    return "default"
+
+
+def durable(collection: AsyncIOMotorCollection, operation: Operation) -> AsyncIOMotorCollection:
+    """
+    `collection` with the write concern of its profile for `operation`.
+    """
+    key = (collection.full_name, operation)
+    routed = _cache.get(key)
+    if routed is None:
+        concern = PROFILES[profile_for(collection.name, operation)]
+        routed = collection if concern is None else collection.with_options(write_concern=concern)
+        _cache[key] = routed
+    return routed
+
+
+def profiles() -> Dict[str, Dict[str, str]]:
+    """
+    The rules in effect, for status output.
+    """
+    return {"defaults": dict(_DEFAULTS), "overrides": dict(_OVERRIDES)}
+
+
+async def benchmark(db: AsyncIOMotorDatabase, *, writes: int, concurrency: int) -> dict:
+    """
+    Insert latency and throughput of each profile, measured on a
+    scratch collection that is dropped afterwards.
+    """
+    scratch = db["durability_bench"]
+    results = {}
+    try:
+        for name, concern in PROFILES.items():
+            collection = scratch if concern is None else scratch.with_options(write_concern=concern)
+            latencies = []
+            remaining = iter(range(writes))
+
+            async def worker() -> None:
+                for i in remaining:
+                    started = time.perf_counter()
+                    await collection.insert_one({"profile": name, "i": i, "pad": "x" * 200})
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+            latencies.sort()
+            results[name] = {
+                "write_concern": concern.document if concern is not None else None,
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+                "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+                "writes_per_second": round(writes / elapsed),
+            }
+    finally:
+        await scratch.drop()
+    return {"writes": writes, "concurrency": concurrency, "profiles": results, "rules": profiles()}
@@ -1,25 +1,181 @@
-async def create_indexes(db):
-    await db["campus_state"].create_index(
-        [("user_type", 1), ("is_inside", 1)]
-    )
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-    await db["access_logs"].create_index(
-        [("identifier", 1), ("timestamp", -1)]
-    )
-    
-    await db["student_logs"].create_index(
-        [("identifier", 1), ("timestamp", -1)]
-    )
-    
-    await db["visitor_logs"].create_index(
-        [("identifier", 1), ("timestamp", -1)]
-    )
+from pymongo import IndexModel
 
-    await db["exit_permissions"].create_index(
-        [("student_roll", 1)]
-    )
-    
-    await db["students"].create_index(
-        [("roll_number", 1)],
-        unique=True
+from app.core.database.timeseries import LOG_TIMESERIES
+
+# Metadata document recording which spec version was last applied
+META_COLLECTION = "schema_meta"
+_META_ID = "indexes"
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    options: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        # MongoDB's default name, so existing indexes are recognised
+        return self.options.get("name") or "_".join(f"{key}_{order}" for key, order in self.keys)
+
+    def model(self) -> IndexModel:
+        return IndexModel(list(self.keys), **self.options)
+
+    def describe(self) -> dict:
+        return {"collection": self.collection, "keys": [list(k) for k in self.keys], **self.options}
+
+
+# Edge nodes push idempotently keyed on their event id
+_EDGE_EVENT_ID = {
+    "unique": True,
+    "partialFilterExpression": {"edge_event_id": {"$exists": True}},
+}
+# Time-series collections can't have unique indexes; edge sync checks
+# for already-pushed events itself. The plain index gets its own name:
+# under the default one, a leftover unique index from the other layout
+# would make createIndexes fail with IndexOptionsConflict
+_LOG_EDGE_EVENT_ID = {"name": "edge_event_id_lookup"} if LOG_TIMESERIES else _EDGE_EVENT_ID
+
+INDEX_SPEC: List[IndexSpec] = [
+    IndexSpec("campus_state", (("user_type", 1), ("is_inside", 1))),
+    IndexSpec("access_logs", (("identifier", 1), ("timestamp", -1))),
+    IndexSpec("access_logs", (("timestamp", -1),)),
+    # Edge events by arrival, for the presence refresh
+    IndexSpec("access_logs", (("synced_at", 1),)),
+    IndexSpec("student_logs", (("identifier", 1), ("timestamp", -1))),
+    IndexSpec("visitor_logs", (("identifier", 1), ("timestamp", -1))),
+    IndexSpec("exit_permissions", (("student_roll", 1),)),
+    IndexSpec("students", (("roll_number", 1),), {"unique": True}),
+    IndexSpec("students", (("updated_at", 1),)),
+    IndexSpec("auth_users", (("username", 1),), {"unique": True}),
+    IndexSpec("visitors", (("vehicle_number", 1),), {"sparse": True}),
+    IndexSpec("access_logs", (("edge_event_id", 1),), _LOG_EDGE_EVENT_ID),
+    IndexSpec("student_logs", (("edge_event_id", 1),), _LOG_EDGE_EVENT_ID),
+    IndexSpec("visitor_logs", (("edge_event_id", 1),), _LOG_EDGE_EVENT_ID),
+    IndexSpec("sync_conflicts", (("edge_event_id", 1),), _EDGE_EVENT_ID),
+    IndexSpec("token_revocations", (("key", 1),), {"unique": True}),
+    IndexSpec("token_revocations", (("revoked_at", 1),)),
+    IndexSpec("token_revocations", (("expires_at", 1),), {"expireAfterSeconds": 0}),
+    # As-of queries: closed sessions by day bucket, open ones by null end
+    IndexSpec("sessions", (("days", 1), ("started_at", 1))),
+    IndexSpec("sessions", (("ended_at", 1), ("started_at", 1))),
+    IndexSpec("sessions", (("identifier", 1), ("ended_at", 1))),
+    # Range and duration queries
+    IndexSpec("sessions", (("user_type", 1), ("started_at", -1))),
+    IndexSpec("sessions", (("user_type", 1), ("duration_seconds", -1))),
+]
+
+if LOG_TIMESERIES:
+    # Series key + time; MongoDB 6.3+ creates it with the collection
+    INDEX_SPEC += [
+        IndexSpec(name, (("meta", 1), ("timestamp", 1)))
+        for name in ("access_logs", "student_logs", "visitor_logs")
+    ]
+
+
+def spec_version(spec: List[IndexSpec] = INDEX_SPEC) -> str:
+    """
+    Content hash of the spec: any change to it is a new version.
+    """
+    canonical = json.dumps([s.describe() for s in spec], sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+async def indexes_current(db, spec: List[IndexSpec] = INDEX_SPEC) -> bool:
+    meta = await db[META_COLLECTION].find_one({"_id": _META_ID}, {"version": 1})
+    return bool(meta) and meta.get("version") == spec_version(spec)
+
+
+async def _build(db, collection: str, specs: List[IndexSpec]) -> List[str]:
+    # One createIndexes per collection: its indexes are built in one scan
+    return await db[collection].create_indexes([s.model() for s in specs])
+
+
+async def create_indexes(db, spec: List[IndexSpec] = INDEX_SPEC) -> dict:
+    """
+    Build every index in the spec, one collection at a time per task
+    and all collections concurrently, then record the spec version.
+    Indexes that already exist are left alone by MongoDB.
+    """
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for s in spec:
+        by_collection.setdefault(s.collection, []).append(s)
+
+    started = datetime.utcnow()
+    await asyncio.gather(*(
+        _build(db, collection, specs) for collection, specs in by_collection.items()
+    ))
+
+    version = spec_version(spec)
+    await db[META_COLLECTION].update_one(
+        {"_id": _META_ID},
+        {"$set": {
+            "version": version,
+            "spec": [s.describe() for s in spec],
+            "applied_at": datetime.utcnow(),
+        }},
+        upsert=True
     )
+    return {
+        "version": version,
+        "indexes": len(spec),
+        "seconds": round((datetime.utcnow() - started).total_seconds(), 3),
+    }
+
+
+async def ensure_indexes(db, spec: List[IndexSpec] = INDEX_SPEC) -> Optional[dict]:
+    """
+    Build indexes only when the recorded version differs from the spec.
+    Returns None when nothing had to be done.
+    """
+    if await indexes_current(db, spec):
+        return None
+    return await create_indexes(db, spec)
+
+
+async def index_status(db, spec: List[IndexSpec] = INDEX_SPEC) -> dict:
+    """
+    Compare the spec with the indexes that exist: which are missing and
+    which exist on spec'd collections without being in the spec.
+    """
+    meta = await db[META_COLLECTION].find_one({"_id": _META_ID}) or {}
+    wanted: Dict[str, set] = {}
+    for s in spec:
+        wanted.setdefault(s.collection, set()).add(s.name)
+
+    existing = {}
+    for collection in wanted:
+        existing[collection] = {
+            index["name"] async for index in db[collection].list_indexes()
+        } - {"_id_"}
+
+    return {
+        "version": spec_version(spec),
+        "applied_version": meta.get("version"),
+        "applied_at": meta.get("applied_at"),
+        "missing": sorted(
+            f"{c}.{name}" for c, names in wanted.items() for name in names - existing[c]
+        ),
+        "unmanaged": sorted(
+            f"{c}.{name}" for c, names in existing.items() for name in names - wanted[c]
+        ),
+    }
+
+
+async def drop_unmanaged(db, spec: List[IndexSpec] = INDEX_SPEC) -> List[str]:
+    """
+    Drop indexes on spec'd collections that are not in the spec.
+    """
+    dropped = []
+    for qualified in (await index_status(db, spec))["unmanaged"]:
+        collection, name = qualified.split(".", 1)
+        await db[collection].drop_index(name)
+        dropped.append(qualified)
+    return dropped
@@ -0,0 +1,332 @@
+import asyncio
+import contextvars
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Literal, Optional, Tuple
+
+from bson.timestamp import Timestamp
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from app.core.database.breaker import guarded
+from app.core.database.collections import cache_versions_collection
+from app.core.log import get_logger
+from app.repositories.base import StorageUnavailable
+
+logger = get_logger("invalidation")
+
+Topic = Literal[
+    "campus_state", "auth_users", "students", "vehicles", "student_logs", "visitor_logs",
+    "revocations"
+]
+Listener = Callable[[], Awaitable[None]]
+Change = dict
+# Applies other workers' changes to a cache in place of a reload
+Applier = Callable[[List[Change]], None]
+
+# "poll" works everywhere; "change_stream" needs a replica set
+INVALIDATION_MODE = os.getenv("INVALIDATION_MODE", "poll")
+INVALIDATION_POLL_MS = int(os.getenv("INVALIDATION_POLL_MS", "500"))
+# Recent changes kept on a topic's version document
+CHANGE_LOG_LENGTH = 32
+
+
+class InvalidationBus:
+    """
+    Keeps in-process caches coherent across uvicorn workers.
+
+    Every topic has a version counter in the cache_versions collection.
+    Writers bump it with publish(), or publish_soon() on hot paths; each
+    worker watches the counters and runs its local listeners whenever a
+    topic moves past the version it last saw. Topics whose writers
+    publish their changes are caught up by applying those instead, when
+    every version in between has them.
+    """
+
+    _listeners: Dict[str, List[Listener]] = {}
+    _appliers: Dict[str, Applier] = {}
+    _versions: Dict[str, int] = {}
+    # Writes made here that publish_soon() hasn't published yet
+    _pending: Dict[str, int] = {}
+    # Every publish_soon() so far, so tags change with each local write
+    _writes: Dict[str, int] = {}
+    # Changes of the pending writes, and how many of them came without
+    _changes: Dict[str, List[Change]] = {}
+    _blind: Dict[str, int] = {}
+    _wake: Optional[asyncio.Event] = None
+    _flusher: Optional[asyncio.Task] = None
+    _flushing = asyncio.Lock()
+    # Cluster time by which each topic's current version was written
+    _seen_at: Dict[str, Timestamp] = {}
+    _local_only = False
+    # Tells version sequences apart when they don't outlive the process
+    epoch = ""
+
+    @classmethod
+    def use_local_only(cls) -> None:
+        """
+        Single-process deployments without Mongo: versions live in memory.
+        """
+        cls._local_only = True
+        cls.epoch = f"{time.time_ns():x}."
+
+    @classmethod
+    def subscribe(cls, topic: Topic, listener: Listener) -> None:
+        cls._listeners.setdefault(topic, []).append(listener)
+
+    @classmethod
+    def subscribe_changes(cls, topic: Topic, applier: Applier) -> None:
+        cls._appliers[topic] = applier
+
+    @classmethod
+    def version(cls, topic: Topic) -> int:
+        return cls._versions.get(topic, 0)
+
+    @classmethod
+    def tag(cls, topic: Topic) -> str:
+        """
+        Identifies the current version of a topic as this worker knows
+        it. While its own writes are still unpublished the tag is local
+        to this worker, so it never matches a tag issued for the
+        published version before them.
+        """
+        version = cls.version(topic)
+        if cls._pending.get(topic):
+            return f"{version}~{os.getpid()}.{cls._writes[topic]}"
+        return str(version)
+
+    @classmethod
+    def causal_point(cls, topics: Iterable[str]) -> Optional[Timestamp]:
+        """
+        Operation time a read must be at or after to reflect the
+        versions of `topics` this worker has seen.
+        """
+        points = [cls._seen_at[topic] for topic in topics if topic in cls._seen_at]
+        return max(points) if points else None
+
+    @classmethod
+    def _saw(cls, topic: str, operation_time: Optional[Timestamp]) -> None:
+        if operation_time is not None and operation_time > cls._seen_at.get(topic, Timestamp(0, 0)):
+            cls._seen_at[topic] = operation_time
+
+    @classmethod
+    async def publish(cls, topic: Topic) -> int:
+        """
+        Bump a topic's version. Local listeners run before returning, so
+        the writing worker reads its own writes; other workers follow
+        within one poll interval.
+        """
+        if cls._local_only:
+            version = cls.version(topic) + 1
+            await cls._advance(topic, version)
+            return version
+
+        doc = await cls._bump(topic)
+        await cls._advance(topic, doc["version"], doc.get("changes"))
+        return doc["version"]
+
+    @classmethod
+    async def publish_soon(cls, topic: Topic, changes: Optional[List[Change]] = None) -> None:
+        """
+        publish() for the gate path: never touches the database in the
+        request. The bump is made by a background flusher, which folds
+        every write since its last bump into one, so scans don't queue
+        on the shared counter and a slow or open-circuited database
+        can't fail a scan whose writes already succeeded. Until then
+        this worker's tag() for the topic is local, so it serves no
+        304s for data it has just changed.
+
+        `changes`, already applied to this worker's cache, are published
+        with the bump for the other workers' appliers.
+        """
+        if cls._local_only:
+            if changes is None:
+                await cls.publish(topic)
+            else:
+                # The only cache there is already has them
+                cls._versions[topic] = cls.version(topic) + 1
+            return
+
+        cls._pending[topic] = cls._pending.get(topic, 0) + 1
+        cls._writes[topic] = cls._writes.get(topic, 0) + 1
+        if changes is None:
+            cls._blind[topic] = cls._blind.get(topic, 0) + 1
+        else:
+            cls._changes.setdefault(topic, []).extend(changes)
+        if cls._flusher is None or cls._flusher.done():
+            cls._wake = asyncio.Event()
+            # Not part of whichever call happened to start it
+            cls._flusher = asyncio.create_task(cls._flush_forever(), context=contextvars.Context())
+        cls._wake.set()
+
+    @classmethod
+    def unpublished(cls, topics: Iterable[str]) -> bool:
+        """
+        True when this worker wrote to any of `topics` since its last bump.
+        """
+        return any(cls._pending.get(topic) for topic in topics)
+
+    @classmethod
+    async def stop(cls) -> None:
+        """
+        Stop the flusher, publishing what is still pending if possible.
+        """
+        if cls._flusher is not None:
+            cls._flusher.cancel()
+            cls._flusher = None
+        try:
+            await cls.flush()
+        except (PyMongoError, StorageUnavailable) as e:
+            logger.warning("Pending invalidations dropped at shutdown", extra={"error": str(e)})
+
+    @classmethod
+    async def _flush_forever(cls) -> None:
+        while True:
+            await cls._wake.wait()
+            cls._wake.clear()
+            try:
+                await cls.flush()
+            except (PyMongoError, StorageUnavailable) as e:
+                # Kept pending; retried once the database is back
+                logger.warning("Invalidation publish failed", extra={"error": str(e)})
+                await asyncio.sleep(INVALIDATION_POLL_MS / 1000)
+                cls._wake.set()
+
+    @classmethod
+    async def flush(cls) -> None:
+        """
+        Publish every topic with pending writes, one bump each.
+        """
+        async with cls._flushing:
+            await cls._flush_pending()
+
+    @classmethod
+    async def _flush_pending(cls) -> None:
+        for topic, count in list(cls._pending.items()):
+            changes = cls._changes.get(topic, [])
+            published = len(changes)
+            blind = cls._blind.get(topic, 0)
+            # One write without changes leaves a gap other workers reload over
+            doc = await cls._bump(topic, None if blind else changes[:published])
+            # Writes made during the bump stay pending for the next one
+            left = cls._pending[topic] - count
+            if left:
+                cls._pending[topic] = left
+            else:
+                del cls._pending[topic]
+            del changes[:published]
+            if blind:
+                cls._blind[topic] -= blind
+            await cls._advance(topic, doc["version"], doc.get("changes"))
+
+    @classmethod
+    @guarded
+    async def _bump(cls, topic: str, changes: Optional[List[Change]] = None) -> dict:
+        update = {"$inc": {"version": 1}}
+        if changes:
+            # Appended to the document's change log under the new version
+            update = [
+                {"$set": {"version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}}},
+                {"$set": {"changes": {"$slice": [
+                    {"$concatArrays": [
+                        {"$ifNull": ["$changes", []]},
+                        [{"version": "$version", "items": {"$literal": changes}}],
+                    ]},
+                    -CHANGE_LOG_LENGTH,
+                ]}}},
+            ]
+        async with await cache_versions_collection.database.client.start_session() as session:
+            doc = await cache_versions_collection.find_one_and_update(
+                {"_id": topic},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            written_at = session.operation_time
+        cls._saw(topic, written_at)
+        return doc
+
+    @classmethod
+    async def sync(cls, *, notify: bool = True) -> None:
+        """
+        Read all topic versions once. With notify=False the versions are
+        only recorded, e.g. at startup when caches were just loaded.
+        """
+        docs, read_at = await cls._read_versions()
+        for doc in docs:
+            # The read saw this version, so its time covers the write
+            cls._saw(doc["_id"], read_at)
+            if notify:
+                await cls._advance(doc["_id"], doc["version"], doc.get("changes"))
+            else:
+                cls._versions[doc["_id"]] = max(
+                    doc["version"], cls._versions.get(doc["_id"], 0)
+                )
+
+    @classmethod
+    @guarded
+    async def _read_versions(cls) -> Tuple[List[dict], Optional[Timestamp]]:
+        async with await cache_versions_collection.database.client.start_session() as session:
+            docs = await cache_versions_collection.find({}, session=session).to_list(None)
+            return docs, session.operation_time
+
+    @classmethod
+    async def run_forever(cls) -> None:
+        if INVALIDATION_MODE == "change_stream":
+            try:
+                await cls._watch()
+            except (PyMongoError, StorageUnavailable) as e:
+                logger.info("Change stream unavailable, polling instead", extra={"error": str(e)})
+        await cls._poll()
+
+    @classmethod
+    async def _poll(cls) -> None:
+        while True:
+            await asyncio.sleep(INVALIDATION_POLL_MS / 1000)
+            try:
+                await cls.sync()
+            except (PyMongoError, StorageUnavailable) as e:
+                logger.warning("Invalidation poll failed", extra={"error": str(e)})
+
+    @classmethod
+    async def _watch(cls) -> None:
+        # The stream itself bypasses the breaker: it is one long-lived
+        # cursor with no per-call outcome, and when it fails run_forever
+        # falls back to polling, which is guarded.
+        # Catch up on anything missed before the stream opened
+        await cls.sync()
+        async with cache_versions_collection.watch(
+            full_document="updateLookup"
+        ) as stream:
+            async for change in stream:
+                doc = change.get("fullDocument")
+                if doc:
+                    cls._saw(doc["_id"], change.get("clusterTime"))
+                    await cls._advance(doc["_id"], doc["version"], doc.get("changes"))
+
+    @classmethod
+    async def _advance(cls, topic: str, version: int, log: Optional[List[dict]] = None) -> None:
+        seen = cls._versions.get(topic, 0)
+        if version <= seen:
+            return
+        cls._versions[topic] = version
+
+        applier = cls._appliers.get(topic)
+        if applier is not None and log:
+            entries = {entry["version"]: entry["items"] for entry in log}
+            missed = range(seen + 1, version + 1)
+            # Own changes come back too; applying them again is harmless
+            if all(missed_version in entries for missed_version in missed):
+                try:
+                    applier([item for missed_version in missed for item in entries[missed_version]])
+                    return
+                except Exception:
+                    logger.exception("Invalidation applier failed", extra={"topic": topic})
+
+        for listener in cls._listeners.get(topic, []):
+            try:
+                await listener()
+            except Exception:
+                logger.exception("Invalidation listener failed", extra={"topic": topic})
@@ -0,0 +1,85 @@
+import os
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import read_preferences
+
+from app.core.database.invalidation import InvalidationBus, Topic
+
+# Where dashboard, log-listing and analytics reads go: "primary",
+# "primaryPreferred", "secondary", "secondaryPreferred" or "nearest".
+# Reads inside the access services always stay on the primary.
+DASHBOARD_READ_PREFERENCE = os.getenv("DASHBOARD_READ_PREFERENCE", "primary")
+# Skip secondaries lagging more than this (MongoDB's minimum is 90)
+DASHBOARD_MAX_STALENESS_SECONDS = int(os.getenv("DASHBOARD_MAX_STALENESS_SECONDS", "90"))
+
+_MODES = {
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
+
+if DASHBOARD_READ_PREFERENCE not in _MODES and DASHBOARD_READ_PREFERENCE != "primary":
+    raise ValueError(f"Unknown DASHBOARD_READ_PREFERENCE: {DASHBOARD_READ_PREFERENCE}")
+
+ROUTED = DASHBOARD_READ_PREFERENCE != "primary"
+
+_preference = (
+    _MODES[DASHBOARD_READ_PREFERENCE](max_staleness=DASHBOARD_MAX_STALENESS_SECONDS)
+    if ROUTED else read_preferences.Primary()
+)
+_routed: Dict[str, AsyncIOMotorCollection] = {}
+
+# Topics the current request's dataset reads must be consistent with
+_dashboard: ContextVar[Optional[Tuple[str, ...]]] = ContextVar("dashboard_reads", default=None)
+
+
+def for_dashboard(collection: AsyncIOMotorCollection) -> AsyncIOMotorCollection:
+    """
+    `collection` with the dashboard read preference, for reads that
+    can be a little stale (analytics, sessions).
+    """
+    if not ROUTED:
+        return collection
+    routed = _routed.get(collection.full_name)
+    if routed is None:
+        routed = _routed[collection.full_name] = collection.with_options(read_preference=_preference)
+    return routed
+
+
+@contextmanager
+def dashboard_reads(*topics: Topic):
+    """
+    Marks the reads inside as dataset listings for `topics`: they may
+    go to a secondary, but never see data older than the topic
+    versions this worker has seen (and so its ETags advertise).
+    """
+    token = _dashboard.set(topics)
+    try:
+        yield
+    finally:
+        _dashboard.reset(token)
+
+
+@asynccontextmanager
+async def listing_reads(collection: AsyncIOMotorCollection):
+    """
+    (collection, session) for a listing read. Inside dashboard_reads
+    it is routed, with a causally consistent session that a secondary
+    only answers once it has applied the write behind the version
+    this worker has seen. Elsewhere, the primary and no session.
+    """
+    topics = _dashboard.get()
+    # This worker's own unpublished writes have no causal point yet
+    if not ROUTED or topics is None or InvalidationBus.unpublished(topics):
+        yield collection, None
+        return
+
+    async with await collection.database.client.start_session(causal_consistency=True) as session:
+        point = InvalidationBus.causal_point(topics)
+        if point is not None:
+            session.advance_operation_time(point)
+        yield for_dashboard(collection), session
@@ -0,0 +1,153 @@
+import os
+from datetime import datetime
+from typing import List
+
+from app.core.log import get_logger
+
+# "collection" (plain collections) or "timeseries" (MongoDB 6.0+)
+ACCESS_LOG_LAYOUT = os.getenv("ACCESS_LOG_LAYOUT", "collection")
+LOG_TIMESERIES = ACCESS_LOG_LAYOUT == "timeseries"
+# Buckets older than this are deleted by MongoDB; 0 keeps logs forever
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "0"))
+LOG_GRANULARITY = os.getenv("LOG_GRANULARITY", "minutes")
+
+LOG_COLLECTIONS = ("access_logs", "student_logs", "visitor_logs")
+META_FIELD = "meta"
+
+_MIGRATION_ID = "logs_timeseries"
+
+logger = get_logger("timeseries")
+
+
+def with_meta(entry: dict) -> dict:
+    """
+    Copy of a log entry with its series key. Events are bucketed per
+    (user_type, gate_number); the fields also stay top level so readers
+    that filter or project on them are unaffected.
+    """
+    return {
+        **entry,
+        META_FIELD: {"user_type": entry.get("user_type"), "gate_number": entry.get("gate_number")},
+    }
+
+
+def timeseries_options() -> dict:
+    options = {
+        "timeseries": {
+            "timeField": "timestamp",
+            "metaField": META_FIELD,
+            "granularity": LOG_GRANULARITY,
+        }
+    }
+    if LOG_RETENTION_DAYS > 0:
+        options["expireAfterSeconds"] = LOG_RETENTION_DAYS * 86400
+    return options
+
+
+async def _layouts(db) -> dict:
+    return {
+        info["name"]: "timeseries" if info.get("type") == "timeseries" else "collection"
+        async for info in db.list_collections(filter={"name": {"$in": list(LOG_COLLECTIONS)}})
+    }
+
+
+async def ensure_log_collections(db) -> None:
+    """
+    Create missing log collections as time-series before anything is
+    inserted, which would create them as plain collections. Existing
+    plain collections are left alone; migrate_logs converts them.
+    """
+    layouts = await _layouts(db)
+    for name in LOG_COLLECTIONS:
+        if name not in layouts:
+            await db.create_collection(name, **timeseries_options())
+        elif layouts[name] != "timeseries":
+            logger.warning(
+                "Log collection is not time-series; run `python -m app.manage migrate-logs`",
+                extra={"collection": name},
+            )
+
+
+async def migrate_logs(db, *, batch_size: int = 5000, drop_legacy: bool = False) -> dict:
+    """
+    Convert the log collections to time-series. Run with the app
+    stopped: each plain collection is renamed to <name>_legacy, a
+    time-series collection takes its name and the documents are copied
+    over in _id order. Progress is checkpointed, so an interrupted run
+    resumes where it stopped.
+    """
+    checkpoints = db["schema_meta"]
+    layouts = await _layouts(db)
+    result = {}
+
+    for name in LOG_COLLECTIONS:
+        legacy = f"{name}_legacy"
+        has_legacy = legacy in await db.list_collection_names(filter={"name": legacy})
+
+        if layouts.get(name) == "timeseries" and not has_legacy:
+            result[name] = {"status": "already time-series"}
+            continue
+        if layouts.get(name) == "collection":
+            await db[name].rename(legacy)
+            has_legacy = True
+        if layouts.get(name) != "timeseries":
+            await db.create_collection(name, **timeseries_options())
+        if not has_legacy:
+            result[name] = {"status": "created"}
+            continue
+
+        checkpoint_id = f"{_MIGRATION_ID}:{name}"
+        checkpoint = await checkpoints.find_one({"_id": checkpoint_id}) or {}
+        if checkpoint.get("done"):
+            if drop_legacy:
+                await db[legacy].drop()
+            result[name] = {"status": "already migrated", "legacy_dropped": drop_legacy}
+            continue
+        query = {"_id": {"$gt": checkpoint["last_id"]}} if "last_id" in checkpoint else {}
+        copied = checkpoint.get("copied", 0)
+
+        batch: List[dict] = []
+        async for doc in db[legacy].find(query).sort("_id", 1):
+            batch.append(with_meta(doc))
+            if len(batch) >= batch_size:
+                copied += await _copy(db[name], checkpoints, checkpoint_id, batch, copied)
+                batch = []
+        if batch:
+            copied += await _copy(db[name], checkpoints, checkpoint_id, batch, copied)
+
+        source_count = await db[legacy].count_documents({})
+        target_count = await db[name].count_documents({})
+        if target_count < source_count:
+            raise RuntimeError(f"{name}: copied {target_count} of {source_count} documents")
+
+        await checkpoints.update_one({"_id": checkpoint_id}, {"$set": {"done": True}}, upsert=True)
+        if drop_legacy:
+            await db[legacy].drop()
+        result[name] = {"status": "migrated", "documents": target_count, "legacy_dropped": drop_legacy}
+
+    return result
+
+
+async def _copy(target, checkpoints, checkpoint_id: str, batch: List[dict], copied: int) -> int:
+    # Time-series collections don't enforce unique _ids, and a resumed
+    # batch may have been written before the checkpoint was. The time
+    # bounds let MongoDB look at the matching buckets only
+    times = [doc["timestamp"] for doc in batch]
+    present = {
+        doc["_id"] async for doc in target.find(
+            {
+                "timestamp": {"$gte": min(times), "$lte": max(times)},
+                "_id": {"$in": [doc["_id"] for doc in batch]},
+            },
+            {"_id": 1}
+        )
+    }
+    fresh = [doc for doc in batch if doc["_id"] not in present]
+    if fresh:
+        await target.insert_many(fresh, ordered=False)
+    await checkpoints.update_one(
+        {"_id": checkpoint_id},
+        {"$set": {"last_id": batch[-1]["_id"], "copied": copied + len(batch), "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return len(batch)
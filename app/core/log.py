@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. Fields passed with extra= are included,
+    as are the ids of the span the record was logged in.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    Never blocks the caller: when the writer falls behind, records are
+    dropped and counted instead.
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Format the message now; args may change after the call returns
+        from app.core.tracing import current_ids
+        record.msg = record.getMessage()
+        record.args = None
+        trace_id, span_id = current_ids()
+        if trace_id:
+            record.trace_id = trace_id
+            record.span_id = span_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[_DroppingQueueHandler] = None
+
+
+def configure_logging() -> None:
+    """
+    Route the "campus" loggers through a queue; a background thread does
+    the formatting and I/O. Called once by the app (or CLI) at startup;
+    further calls do nothing until shutdown_logging().
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    if LOG_FILE:
+        target = logging.FileHandler(LOG_FILE)
+    else:
+        target = logging.StreamHandler(sys.stderr)
+    target.setFormatter(JsonFormatter())
+
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    root = logging.getLogger("campus")
+    root.setLevel(LOG_LEVEL)
+    _handler = _DroppingQueueHandler(records)
+    root.addHandler(_handler)
+    root.propagate = False
+
+    _listener = QueueListener(records, target, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """
+    Flush queued records and stop the writer thread.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        root = logging.getLogger("campus")
+        root.removeHandler(_handler)
+        root.propagate = True
+        _listener.stop()
+        _listener = _handler = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    # No side effects: importing a module (e.g. in a process pool child)
+    # must not start the writer thread
+    return logging.getLogger(f"campus.{name}")
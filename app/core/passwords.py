@@ -1,3 +1,9 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(
@@ -5,8 +11,43 @@ pwd_context = CryptContext(
     deprecated="auto"
 )
 
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+
+_hash_pool: ProcessPoolExecutor | None = None
+
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
     return pwd_context.verify(password, hashed)
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        # spawn: don't fork a process holding the event loop and Mongo threads
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    Hash passwords in parallel on a process pool, off the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_hash_pool()
+    return await asyncio.gather(*(
+        loop.run_in_executor(pool, hash_password, password)
+        for password in passwords
+    ))
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
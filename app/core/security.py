@@ -1,4 +1,6 @@
+import calendar
 import os
+import uuid
 from datetime import datetime, timedelta
 from jose import jwt
 from dotenv import load_dotenv
@@ -12,8 +14,14 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES"))
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(
+    now = datetime.utcnow()
+    expire = now + timedelta(
         minutes=ACCESS_TOKEN_EXPIRE_MINUTES
     )
-    to_encode.update({"exp": expire})
+    # jti identifies the token for revocation; iat lets a user-wide
+    # revocation cover every token issued before it. iat keeps the
+    # milliseconds (MongoDB's precision for revoked_at), so a token
+    # issued just after a revocation is not covered by it
+    iat = calendar.timegm(now.utctimetuple()) + now.microsecond // 1000 / 1000
+    to_encode.update({"exp": expire, "iat": iat, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
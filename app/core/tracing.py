@@ -0,0 +1,383 @@
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+# Follow the sampled flag of incoming traceparent headers even while
+# TRACE_SAMPLE_RATE is 0; only for callers behind a trusted proxy
+TRACE_TRUST_PARENT = os.getenv("TRACE_TRUST_PARENT", "false").lower() == "true"
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "campus-security")
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "512"))
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "2"))
+
+_QUEUE_SIZE = 8192
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, object] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def current_ids() -> Tuple[Optional[str], Optional[str]]:
+    """
+    (trace_id, span_id) of the active span, for log correlation.
+    """
+    current = _current.get()
+    if current is None:
+        return None, None
+    return current.trace_id, current.span_id
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Child span of the active span. Outside a sampled trace this does
+    nothing, so it is cheap to leave around hot paths.
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id,
+        span_id=_new_id(64),
+        parent_id=parent.span_id,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        _exporter.submit(current)
+
+
+def traced(name: str, **attributes):
+    """
+    Decorator form of span() for sync and async functions.
+    """
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def run_async(*args, **kwargs):
+                if _current.get() is None:
+                    return await func(*args, **kwargs)
+                with span(name, **attributes):
+                    return await func(*args, **kwargs)
+            return run_async
+
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+        return run
+
+    return decorate
+
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """
+    A child span for every command sent to MongoDB. Motor runs the
+    driver on a thread pool but copies the caller's context, so the
+    listener sees the span that was active when the call was awaited.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[object, int], Span] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        parent = _current.get()
+        if parent is None:
+            return
+        collection = event.command.get(event.command_name)
+        attributes = {
+            "db.system": "mongodb",
+            "db.name": event.database_name,
+            "db.operation": event.command_name,
+            # Replica set member, to see where routed reads went
+            "server.address": event.connection_id[0],
+            "server.port": event.connection_id[1],
+        }
+        if isinstance(collection, str):
+            attributes["db.mongodb.collection"] = collection
+        self._pending[(event.connection_id, event.request_id)] = Span(
+            name=f"mongo.{event.command_name}",
+            trace_id=parent.trace_id,
+            span_id=_new_id(64),
+            parent_id=parent.span_id,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, None)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, str(event.failure.get("errmsg", "command failed")))
+
+    def _finish(self, event, error: Optional[str]) -> None:
+        current = self._pending.pop((event.connection_id, event.request_id), None)
+        if current is None:
+            return
+        current.end_ns = current.start_ns + event.duration_micros * 1000
+        current.error = error
+        _exporter.submit(current)
+
+
+def _parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    # W3C: version-traceid-parentid-flags
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class TracingMiddleware:
+    """
+    Opens the root span of each request. An incoming traceparent header
+    decides sampling and links the trace to the caller; otherwise
+    TRACE_SAMPLE_RATE does. With sampling off the header is ignored
+    unless TRACE_TRUST_PARENT is set, so no client can switch tracing
+    (and its export writes) on. Sampled responses carry a traceparent.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        trust_parent: bool = TRACE_TRUST_PARENT
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.follow_parent = sample_rate > 0 or trust_parent
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        if self.follow_parent:
+            incoming = _parse_traceparent(Headers(scope=scope).get("traceparent"))
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id = _new_id(128), None
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        root = Span(
+            name=f"{scope['method']} {scope['path']}",
+            trace_id=trace_id,
+            span_id=_new_id(64),
+            parent_id=parent_id,
+            start_ns=time.time_ns(),
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        )
+
+        async def send_traced(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.set("http.status_code", message["status"])
+                headers = MutableHeaders(scope=message)
+                headers["traceparent"] = f"00-{root.trace_id}-{root.span_id}-01"
+            await send(message)
+
+        token = _current.set(root)
+        try:
+            await self.app(scope, receive, send_traced)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                root.name = f"{scope['method']} {route.path}"
+                root.set("http.route", route.path)
+            root.end_ns = time.time_ns()
+            _exporter.submit(root)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(s: Span) -> dict:
+    data = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 2 if s.parent_id is None else 1,  # SERVER / INTERNAL
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [
+            {"key": key, "value": _otlp_value(value)} for key, value in s.attributes.items()
+        ],
+        "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+    }
+    if s.parent_id:
+        data["parentSpanId"] = s.parent_id
+    return data
+
+
+def otlp_payload(spans: List[Span]) -> dict:
+    """
+    OTLP/HTTP JSON export request for a batch of spans.
+    """
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "app.core.tracing"},
+                "spans": [_otlp_span(s) for s in spans],
+            }],
+        }]
+    }
+
+
+class SpanExporter:
+    """
+    Finished spans are queued and written in batches by a daemon
+    thread, either appended to TRACE_FILE as one OTLP JSON request per
+    line or POSTed to an OTLP/HTTP collector. A full queue drops spans
+    rather than slowing requests down.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        # submit() runs on the event loop and on Motor's executor threads
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, s: Span) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    # Started by the first sampled span
+                    thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    thread.start()
+                    self._thread = thread
+        try:
+            self._queue.put_nowait(s)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join(timeout=5)
+                self._thread = None
+
+    def _run(self) -> None:
+        batch: List[Span] = []
+        deadline = time.monotonic() + TRACE_FLUSH_SECONDS
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                item = False
+
+            if item:
+                batch.append(item)
+            if batch and (item is None or len(batch) >= TRACE_BATCH_SIZE or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+            if item is None:
+                return
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + TRACE_FLUSH_SECONDS
+
+    def _write(self, batch: List[Span]) -> None:
+        payload = json.dumps(otlp_payload(batch), separators=(",", ":"))
+        try:
+            if TRACE_EXPORTER == "otlp":
+                request = urllib.request.Request(
+                    TRACE_OTLP_ENDPOINT,
+                    data=payload.encode(),
+                    headers={"Content-Type": "application/json"},
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+            else:
+                with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                    f.write(payload + "\n")
+        except Exception as e:
+            from app.core.log import get_logger
+            get_logger("tracing").warning(
+                "Span export failed", extra={"spans": len(batch), "error": str(e)}
+            )
+
+
+_exporter = SpanExporter()
+
+
+def shutdown_tracing() -> None:
+    """
+    Write out queued spans; called on app shutdown.
+    """
+    _exporter.shutdown()
@@ -6,5 +6,5 @@ from app.domain.EntryPolicy.violations import EntryViolation
 class EntryPolicy(ABC):
     
     @abstractmethod 
-    async def validate_entry(self, **context: Any) -> Optional[EntryViolation]:
-        raise NotImplementedError
\ No newline at end of file
+    def validate_entry(self, **context: Any) -> Optional[EntryViolation]:
+        raise NotImplementedError
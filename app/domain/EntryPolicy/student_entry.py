@@ -1,27 +1,22 @@
 from datetime import datetime 
-from typing import Any, Optional 
+from typing import Optional 
 
 from app.domain.EntryPolicy.entry_policy import EntryPolicy 
 from app.domain.EntryPolicy.violations import EntryViolation
+from app.domain.PolicyEngine.engine import get_policy_engine
 
 class StudentEntryPolicy(EntryPolicy):
     
-    async def validate_entry(self, **context: Any) -> Optional[EntryViolation]:
-        allowed_until: Optional[datetime] = context.get("allowed_until")
-        current_time: datetime = context.get("current_time", datetime.utcnow()) 
-        
-        if allowed_until is None:
-            return None
-        
-        # Remove timezone info for comparison if present
-        allowed_time = allowed_until.replace(tzinfo=None) if allowed_until.tzinfo else allowed_until
-        current = current_time.replace(tzinfo=None) if current_time.tzinfo else current_time
-         
-        if current <= allowed_time:
-            return None 
-        
-        return EntryViolation(
-            code="LATE_ENTRY", 
-            allowed_until=allowed_until, 
-            entered_at=current_time
-        )
\ No newline at end of file
+    def __init__(self):
+        self._engine = get_policy_engine()
+    
+    def validate_entry(
+        self,
+        *,
+        allowed_until: Optional[datetime] = None,
+        current_time: Optional[datetime] = None
+    ) -> Optional[EntryViolation]:
+        return self._engine.check_entry(
+            allowed_until=allowed_until,
+            entered_at=current_time or datetime.utcnow()
+        )
@@ -1,10 +1,6 @@
-from typing import Any 
-
 from app.domain.EntryPolicy.entry_policy import EntryPolicy 
 
 class VisitorEntryPolicy(EntryPolicy):
     
-    async def validate_entry(self, **context: Any) -> None:
+    def validate_entry(self) -> None:
         return 
-    
-    
\ No newline at end of file
@@ -1,7 +1,8 @@
-from datetime import datetime, timedelta
-from typing import Any, Dict, Literal
+from datetime import datetime
+from typing import Dict, Literal, Optional
 
 from app.domain.ExitPolicy.exit_policy import ExitPolicy
+from app.domain.PolicyEngine.engine import get_policy_engine
 
 
 class ExitArtifact(Dict):
@@ -11,36 +12,21 @@ class ExitArtifact(Dict):
     
 
 class StudentExitPolicy(ExitPolicy):
+    """
+    Purposes and return windows come from the policy rules
+    (see app/domain/PolicyEngine/rules.py).
+    """
     
-    MAX_MARKET_DURATION = timedelta(hours=12)
+    def __init__(self):
+        self._engine = get_policy_engine()
     
-    async def validate_exit(self, **context: Any) -> None:
-        
-        purpose = context.get("purpose")
-        return_by = context.get("return_by") 
-        now = datetime.utcnow()
-        
-        if purpose not in ["MARKET", "HOME"]:
-            raise ValueError("Invalid exit purpose provided.") 
-        
-        if return_by is None:
-            raise ValueError("Return by time must be provided") 
-        
-        # Remove timezone info for comparison if present
-        return_time = return_by.replace(tzinfo=None) if return_by.tzinfo else return_by
-        
-        if purpose == "MARKET":
-            if return_time <= now:
-                raise ValueError("Return by time must be in the future for MARKET exits.")
-            if return_time > now + self.MAX_MARKET_DURATION:
-                raise ValueError("Return by time for MARKET exits cannot exceed 12 hours from now.")
-        
-    async def build_exit_artifact(self, **context: Any) -> ExitArtifact:
-        
-        purpose: Literal["MARKET", "HOME"] = context.get("purpose") 
-        return_by: datetime = context.get("return_by")
-        
-        return {
-            "purpose": purpose,
-            "allowed_until": return_by
-        }
\ No newline at end of file
+    def validate_exit(
+        self,
+        *,
+        purpose: Optional[str],
+        return_by: Optional[datetime]
+    ) -> None:
+        self._engine.check_exit(purpose=purpose, return_by=return_by)
+        
+    def build_exit_artifact(self, *, purpose: str, return_by: datetime) -> ExitArtifact:
+        return self._engine.build_exit_artifact(purpose=purpose, return_by=return_by)
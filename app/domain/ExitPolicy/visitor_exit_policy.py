@@ -1,13 +1,11 @@
-from typing import Any, Optional 
+from typing import Optional 
 
 from app.domain.ExitPolicy.exit_policy import ExitPolicy
 
 class VisitorExitPolicy(ExitPolicy):
     
-    async def validate_exit(self, **context: Any) -> None:
+    def validate_exit(self) -> None:
         return 
     
-    async def build_exit_artifact(self, **context: Any) -> Optional[dict]:
-        return None 
-    
-    
\ No newline at end of file
+    def build_exit_artifact(self) -> Optional[dict]:
+        return None
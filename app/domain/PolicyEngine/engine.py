@@ -0,0 +1,188 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+from app.core.tracing import traced
+from app.domain.EntryPolicy.violations import EntryViolation
+from app.domain.PolicyEngine.rules import ExitPurposeRule, PolicyRules, load_rules
+
+ExitCheck = Callable[[datetime, datetime], None]
+
+
+@dataclass(frozen=True, slots=True)
+class PolicyDecision:
+    """
+    Outcome of one event in a batch: a rejected exit carries `error`,
+    a late entry carries `violation`.
+    """
+    error: Optional[str] = None
+    violation: Optional[EntryViolation] = None
+
+    @property
+    def allowed(self) -> bool:
+        return self.error is None
+
+
+_ALLOWED = PolicyDecision()
+
+
+def _naive(value: datetime) -> datetime:
+    # Stored times are naive UTC; drop any timezone for comparison
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def _compile_exit_check(purpose: str, rule: ExitPurposeRule) -> ExitCheck:
+    in_future = rule.return_in_future
+    max_duration = rule.max_duration
+
+    if not in_future and max_duration is None:
+        return lambda return_time, now: None
+
+    too_late = None
+    if max_duration is not None:
+        too_late = (
+            f"Return by time for {purpose} exits cannot exceed "
+            f"{max_duration.total_seconds() / 3600:g} hours from now."
+        )
+    not_future = f"Return by time must be in the future for {purpose} exits."
+
+    def check(return_time: datetime, now: datetime) -> None:
+        if in_future and return_time <= now:
+            raise ValueError(not_future)
+        if max_duration is not None and return_time > now + max_duration:
+            raise ValueError(too_late)
+
+    return check
+
+
+class PolicyEngine:
+    """
+    Entry and exit rules compiled once from PolicyRules into plain
+    synchronous checks. Single events go through check_entry /
+    check_exit; batches of logged events, such as those an edge gate
+    pushes upstream, go through evaluate_batch.
+    """
+
+    def __init__(self, rules: PolicyRules):
+        self.rules = rules
+        self._grace = rules.late_entry_grace
+        self._exit_checks: Dict[str, ExitCheck] = {
+            purpose: _compile_exit_check(purpose, rule)
+            for purpose, rule in rules.exit_purposes.items()
+        }
+
+    @traced("policy.check_exit")
+    def check_exit(
+        self,
+        *,
+        purpose: Optional[str],
+        return_by: Optional[datetime],
+        now: Optional[datetime] = None
+    ) -> None:
+        check = self._exit_checks.get(purpose)
+        if check is None:
+            raise ValueError("Invalid exit purpose provided.")
+        if return_by is None:
+            raise ValueError("Return by time must be provided")
+        check(_naive(return_by), now or datetime.utcnow())
+
+    def build_exit_artifact(self, *, purpose: str, return_by: datetime) -> dict:
+        return {
+            "purpose": purpose,
+            "allowed_until": return_by
+        }
+
+    @traced("policy.check_entry")
+    def check_entry(
+        self,
+        *,
+        allowed_until: Optional[datetime],
+        entered_at: datetime
+    ) -> Optional[EntryViolation]:
+        if allowed_until is None:
+            return None
+        if _naive(entered_at) <= _naive(allowed_until) + self._grace:
+            return None
+        return EntryViolation(
+            code="LATE_ENTRY",
+            allowed_until=allowed_until,
+            entered_at=entered_at
+        )
+
+    @traced("policy.evaluate_batch")
+    def evaluate_batch(
+        self,
+        events: Sequence[dict],
+        previous: Optional[Mapping[str, dict]] = None
+    ) -> List[PolicyDecision]:
+        """
+        Evaluate access-log shaped events (user_type, identifier,
+        direction, timestamp, purpose, allowed_until) in one pass, each
+        as of its own timestamp. Visitors are always allowed.
+
+        Entry logs carry no return time: an entry is checked against the
+        allowed_until of the student's exit before it, found earlier in
+        the batch or else in `previous` (the latest logged event per
+        identifier).
+        """
+        exit_checks = self._exit_checks
+        grace = self._grace
+        decisions = []
+        append = decisions.append
+        return_by = {
+            identifier: event.get("allowed_until")
+            for identifier, event in (previous or {}).items()
+            if event.get("user_type") == "student" and event.get("direction") == "exit"
+        }
+
+        for event in events:
+            if event["user_type"] != "student":
+                append(_ALLOWED)
+                continue
+
+            at = event["timestamp"]
+
+            if event["direction"] == "entry":
+                allowed_until = event.get("allowed_until") or return_by.pop(event["identifier"], None)
+                if allowed_until is None or _naive(at) <= _naive(allowed_until) + grace:
+                    append(_ALLOWED)
+                else:
+                    append(PolicyDecision(violation=EntryViolation(
+                        code="LATE_ENTRY",
+                        allowed_until=allowed_until,
+                        entered_at=at
+                    )))
+                continue
+
+            allowed_until = return_by[event["identifier"]] = event.get("allowed_until")
+            check = exit_checks.get(event.get("purpose"))
+            if check is None:
+                append(PolicyDecision(error="Invalid exit purpose provided."))
+            elif allowed_until is None:
+                append(PolicyDecision(error="Return by time must be provided"))
+            else:
+                try:
+                    check(_naive(allowed_until), _naive(at))
+                    append(_ALLOWED)
+                except ValueError as e:
+                    append(PolicyDecision(error=str(e)))
+
+        return decisions
+
+
+_engine: Optional[PolicyEngine] = None
+
+
+def get_policy_engine() -> PolicyEngine:
+    global _engine
+    if _engine is None:
+        _engine = PolicyEngine(load_rules())
+    return _engine
+
+
+def set_policy_engine(engine: Optional[PolicyEngine]) -> None:
+    """
+    Swap the process-wide engine, e.g. after changing the rules.
+    """
+    global _engine
+    _engine = engine
@@ -0,0 +1,62 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Optional
+
+POLICY_RULES_PATH = os.getenv("POLICY_RULES_PATH")
+
+DEFAULT_RULES = {
+    "exit_purposes": {
+        "MARKET": {"max_duration_hours": 12, "return_in_future": True},
+        "HOME": {},
+    },
+    "late_entry_grace_minutes": 0,
+}
+
+
+@dataclass(frozen=True)
+class ExitPurposeRule:
+    max_duration: Optional[timedelta] = None
+    return_in_future: bool = False
+
+
+@dataclass(frozen=True)
+class PolicyRules:
+    exit_purposes: Dict[str, ExitPurposeRule]
+    late_entry_grace: timedelta = timedelta(0)
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "PolicyRules":
+        purposes = raw.get("exit_purposes")
+        if not purposes:
+            raise ValueError("Policy rules must define at least one exit purpose")
+
+        exit_purposes = {}
+        for purpose, rule in purposes.items():
+            hours = rule.get("max_duration_hours")
+            if hours is not None and hours <= 0:
+                raise ValueError(f"max_duration_hours for {purpose} must be positive")
+            exit_purposes[purpose] = ExitPurposeRule(
+                max_duration=timedelta(hours=hours) if hours is not None else None,
+                return_in_future=bool(rule.get("return_in_future", False)),
+            )
+
+        grace = raw.get("late_entry_grace_minutes", 0)
+        if grace < 0:
+            raise ValueError("late_entry_grace_minutes cannot be negative")
+
+        return cls(
+            exit_purposes=exit_purposes,
+            late_entry_grace=timedelta(minutes=grace),
+        )
+
+
+def load_rules(path: Optional[str] = POLICY_RULES_PATH) -> PolicyRules:
+    """
+    Rules from the JSON file at POLICY_RULES_PATH, or the defaults.
+    """
+    if not path:
+        return PolicyRules.from_dict(DEFAULT_RULES)
+    with open(path) as f:
+        return PolicyRules.from_dict(json.load(f))
@@ -1,25 +1,115 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import os
 
 from app.api.student_routes import router as student_router
 from app.api.visitor_routes import router as visitor_router
 from app.api.state_routes import router as state_router
-from app.core.database.client import MongoClient
-from app.core.database.indexes import create_indexes
+from app.core.database.client import MongoClient, batch_deadline
+from app.core.database.indexes import ensure_indexes, indexes_current
+from app.core.database.timeseries import LOG_TIMESERIES, ensure_log_collections
 from app.api.auth_routes import router as auth_router
 from app.api.admin_routes import router as admin_router
+from app.services.roster_service import RosterService
+from app.core.passwords import shutdown_hash_pool
+from app.core.database.invalidation import InvalidationBus
+from app.services.reconcile_service import ReconcileService, RECONCILE_INTERVAL_SECONDS
+from app.services.presence_service import PresenceService, PRESENCE_REFRESH_SECONDS
+from app.repositories.factory import STORAGE_BACKEND, get_repositories
+from app.repositories.base import StorageUnavailable
+from app.services.edge_sync_service import EDGE_MODE, EdgeSyncService
+from app.api.edge_routes import router as edge_router
+from app.services.vehicle_index_service import VehicleIndex
+from app.services.revocation_service import RevocationService
+from app.services.gate_traffic_service import GateTraffic, GATE_STATS_FLUSH_SECONDS
+from app.api.compression import CompressionMiddleware
+from app.core.log import configure_logging, get_logger, shutdown_logging
+from app.core.tracing import TracingMiddleware, shutdown_tracing
+
+logger = get_logger("main")
+
+# Off when indexes are managed with `python -m app.manage indexes`
+INDEX_BUILD_ON_STARTUP = os.getenv("INDEX_BUILD_ON_STARTUP", "true").lower() == "true"
+
+
+async def _load_roster():
+    # Don't hold up startup while the central DB is unreachable
+    try:
+        await RosterService.load()
+    except Exception as e:
+        logger.warning("Roster load failed, retrying on next refresh", extra={"error": str(e)})
+
+
+async def _build_indexes(db):
+    # Serving doesn't wait for builds; queries work meanwhile, just slower
+    try:
+        with batch_deadline():
+            result = await ensure_indexes(db)
+        if result:
+            logger.info("Indexes built", extra=result)
+    except Exception as e:
+        logger.error("Index build failed", extra={"error": str(e)})
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    MongoClient.get_client()
-    db = MongoClient.get_database()
-    await create_indexes(db)
+    configure_logging()
+    get_repositories()
+    await VehicleIndex.load()
+    InvalidationBus.subscribe("vehicles", VehicleIndex.load)
+    InvalidationBus.subscribe_changes("vehicles", VehicleIndex.apply)
+    InvalidationBus.subscribe("revocations", RevocationService.refresh)
+    background = []
+    if GATE_STATS_FLUSH_SECONDS > 0:
+        background.append(asyncio.create_task(GateTraffic.flush_forever()))
+
+    if STORAGE_BACKEND == "mongo":
+        MongoClient.get_client()
+        db = MongoClient.get_database()
+        if LOG_TIMESERIES:
+            # Must exist before the first insert creates a plain collection
+            await ensure_log_collections(db)
+        # One read when the recorded spec version is current
+        if INDEX_BUILD_ON_STARTUP and not await indexes_current(db):
+            background.append(asyncio.create_task(_build_indexes(db)))
+        await RosterService.load()
+        await RevocationService.load()
+        InvalidationBus.subscribe("students", RosterService.load)
+        await InvalidationBus.sync(notify=False)
+        background.append(asyncio.create_task(RosterService.refresh_forever()))
+        background.append(asyncio.create_task(RevocationService.refresh_forever()))
+        background.append(asyncio.create_task(InvalidationBus.run_forever()))
+        if RECONCILE_INTERVAL_SECONDS > 0:
+            background.append(asyncio.create_task(ReconcileService().run_forever()))
+        if PRESENCE_REFRESH_SECONDS > 0:
+            background.append(asyncio.create_task(PresenceService().run_forever()))
+    elif EDGE_MODE:
+        # Gate node: serve from the local store, sync with the central DB
+        # in the background and keep working while it is unreachable
+        if STORAGE_BACKEND != "sqlite":
+            raise RuntimeError("EDGE_MODE requires STORAGE_BACKEND=sqlite")
+        InvalidationBus.use_local_only()
+        await RevocationService.load()
+        background.append(asyncio.create_task(_load_roster()))
+        background.append(asyncio.create_task(RosterService.refresh_forever()))
+        background.append(asyncio.create_task(EdgeSyncService.run_forever()))
+    else:
+        # Local store: one process, no roster or cross-worker invalidation
+        InvalidationBus.use_local_only()
+        await RevocationService.load()
     yield
     # Shutdown
+    for task in background:
+        task.cancel()
+    await InvalidationBus.stop()
+    shutdown_hash_pool()
     MongoClient.close_client()
+    shutdown_tracing()
+    shutdown_logging()
 
 
 
@@ -35,8 +125,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Data-Stale", "Retry-After"],
 )
 
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so the request span covers everything else
+app.add_middleware(TracingMiddleware)
+
+
+@app.exception_handler(StorageUnavailable)
+async def storage_unavailable(request: Request, exc: StorageUnavailable):
+    # Fail fast so gate devices can retry or fall back
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database unavailable, try again shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.get("/")
 async def home():
     return {"messaage" : "welcome"}
@@ -46,3 +153,6 @@ app.include_router(visitor_router, prefix="/visitor", tags=["Visitor"])
 app.include_router(state_router, prefix="/state", tags=["Campus State"])
 app.include_router(auth_router)
 app.include_router(admin_router)
+
+if EDGE_MODE:
+    app.include_router(edge_router)
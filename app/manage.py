@@ -0,0 +1,168 @@
+"""
+Offline maintenance commands.
+
+    python -m app.manage rebuild-state [--workers N] [--run-id ID]
+    python -m app.manage reconcile [--repair] [--full]
+    python -m app.manage indexes [status|apply] [--prune]
+    python -m app.manage migrate-logs [--batch-size N] [--drop-legacy]
+    python -m app.manage sessions [refresh|rebuild]
+    python -m app.manage bench-writes [--writes N] [--concurrency C]
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime
+
+from app.core.log import configure_logging, shutdown_logging
+from app.services.campus_state_rebuild_service import (
+    REBUILD_WORKERS,
+    CampusStateRebuildService,
+)
+
+
+def _rebuild_state(args: argparse.Namespace) -> None:
+    result = asyncio.run(
+        CampusStateRebuildService().execute(workers=args.workers, run_id=args.run_id)
+    )
+    print(json.dumps(result, indent=2))
+
+
+def _reconcile(args: argparse.Namespace) -> None:
+    from app.services.reconcile_service import ReconcileService
+
+    since = datetime(1970, 1, 1) if args.full else None
+    result = asyncio.run(ReconcileService().execute(repair=args.repair, since=since))
+    print(json.dumps(result, indent=2, default=str))
+
+
+def _indexes(args: argparse.Namespace) -> None:
+    from app.core.database.client import MongoClient, batch_deadline
+    from app.core.database import indexes
+
+    async def run() -> dict:
+        db = MongoClient.get_database()
+        with batch_deadline():
+            if args.action == "status":
+                return await indexes.index_status(db)
+            result = await indexes.create_indexes(db)
+            if args.prune:
+                result["dropped"] = await indexes.drop_unmanaged(db)
+            return result
+
+    print(json.dumps(asyncio.run(run()), indent=2, default=str))
+
+
+def _migrate_logs(args: argparse.Namespace) -> None:
+    from app.core.database.client import MongoClient, batch_deadline
+    from app.core.database import indexes, timeseries
+
+    if not timeseries.LOG_TIMESERIES:
+        raise SystemExit("Set ACCESS_LOG_LAYOUT=timeseries, as the app will run with it")
+
+    async def run() -> dict:
+        db = MongoClient.get_database()
+        with batch_deadline():
+            result = await timeseries.migrate_logs(
+                db, batch_size=args.batch_size, drop_legacy=args.drop_legacy
+            )
+            # The new collections start without secondary indexes
+            result["indexes"] = await indexes.create_indexes(db)
+            return result
+
+    print(json.dumps(asyncio.run(run()), indent=2, default=str))
+
+
+def _sessions(args: argparse.Namespace) -> None:
+    from app.services.presence_service import PresenceService
+
+    service = PresenceService()
+    run = service.rebuild if args.action == "rebuild" else service.refresh
+    print(json.dumps(asyncio.run(run()), indent=2, default=str))
+
+
+def _bench_writes(args: argparse.Namespace) -> None:
+    from app.core.database.client import MongoClient
+    from app.core.database.durability import benchmark
+
+    if args.writes < 1 or args.concurrency < 1:
+        raise SystemExit("--writes and --concurrency must be positive")
+
+    async def run() -> dict:
+        db = MongoClient.get_database()
+        return await benchmark(db, writes=args.writes, concurrency=args.concurrency)
+
+    print(json.dumps(asyncio.run(run()), indent=2, default=str))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser(
+        "rebuild-state",
+        help="Rebuild campus_state by replaying access_logs",
+    )
+    rebuild.add_argument("--workers", type=int, default=REBUILD_WORKERS)
+    rebuild.add_argument(
+        "--run-id",
+        help="Resume an interrupted rebuild from its checkpoints",
+    )
+    rebuild.set_defaults(handler=_rebuild_state)
+
+    reconcile = commands.add_parser(
+        "reconcile",
+        help="Compare campus_state with the latest access logs",
+    )
+    reconcile.add_argument("--repair", action="store_true", help="Fix drifted records")
+    reconcile.add_argument("--full", action="store_true", help="Check every identifier, not just recent ones")
+    reconcile.set_defaults(handler=_reconcile)
+
+    index_cmd = commands.add_parser(
+        "indexes",
+        help="Show or apply the index spec in app/core/database/indexes.py",
+    )
+    index_cmd.add_argument("action", nargs="?", choices=["status", "apply"], default="status")
+    index_cmd.add_argument(
+        "--prune",
+        action="store_true",
+        help="With apply: drop indexes on spec'd collections that are not in the spec",
+    )
+    index_cmd.set_defaults(handler=_indexes)
+
+    migrate = commands.add_parser(
+        "migrate-logs",
+        help="Convert the log collections to time-series (stop the app first)",
+    )
+    migrate.add_argument("--batch-size", type=int, default=5000)
+    migrate.add_argument(
+        "--drop-legacy",
+        action="store_true",
+        help="Drop the <name>_legacy copies once migrated",
+    )
+    migrate.set_defaults(handler=_migrate_logs)
+
+    sessions = commands.add_parser(
+        "sessions",
+        help="Update (or backfill from scratch) the sessions collection",
+    )
+    sessions.add_argument("action", nargs="?", choices=["refresh", "rebuild"], default="refresh")
+    sessions.set_defaults(handler=_sessions)
+
+    bench = commands.add_parser(
+        "bench-writes",
+        help="Measure insert latency under each write durability profile",
+    )
+    bench.add_argument("--writes", type=int, default=2000)
+    bench.add_argument("--concurrency", type=int, default=16)
+    bench.set_defaults(handler=_bench_writes)
+
+    args = parser.parse_args()
+    configure_logging()
+    try:
+        args.handler(args)
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
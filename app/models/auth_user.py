@@ -1,8 +1,10 @@
-from typing import Literal 
+from typing import Literal, Optional
 from pydantic import BaseModel 
 
 Role = Literal["GUARD", "ADMIN"]
 
 class AuthUser(BaseModel):
     username: str
-    role: Role
\ No newline at end of file
+    role: Role
+    jti: Optional[str] = None
+    exp: Optional[int] = None
@@ -42,6 +42,8 @@ class CampusState(BaseModel):
     phone_number: PhoneNumber
     
     number_of_visitors: Optional[int] = None
+
+    vehicle_number: Optional[str] = None
     
     purpose: Annotated[
         Optional[str],
@@ -0,0 +1,155 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Set
+
+
+class StorageUnavailable(Exception):
+    """
+    The backing store timed out, is unreachable, or its circuit breaker
+    is open. `retry_after` is a hint in seconds.
+    """
+
+    def __init__(self, message: str = "Database unavailable", retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def project(record: dict, fields: Optional[Sequence[str]]) -> dict:
+    """
+    Copy of `record` limited to `fields` (all of them when None), for
+    backends without server-side projection.
+    """
+    if fields is None:
+        return dict(record)
+    return {field: record[field] for field in fields if field in record}
+
+
+class CampusStateRepository(ABC):
+
+    @abstractmethod
+    async def get(self, *, user_type: str, identifier: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def upsert(self, *, user_type: str, identifier: str, fields: dict) -> None:
+        """
+        Create the record or merge `fields` into it ($set semantics).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, *, user_type: str, identifier: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list(
+        self,
+        *,
+        user_type: str,
+        is_inside: bool,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        """
+        Matching records, limited to `fields` when given.
+        """
+        raise NotImplementedError
+
+
+class ExitPermissionRepository(ABC):
+
+    @abstractmethod
+    async def get(self, *, student_roll: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create(self, *, student_roll: str, artifact: dict) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, *, student_roll: str) -> int:
+        raise NotImplementedError
+
+
+class VisitorRepository(ABC):
+
+    @abstractmethod
+    async def create(self, record: dict) -> str:
+        """
+        Store a visitor and return its generated visitor_id.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get(self, *, visitor_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, *, visitor_id: str) -> int:
+        raise NotImplementedError
+
+
+class AccessLogRepository(ABC):
+
+    @abstractmethod
+    async def append(self, entry: dict) -> None:
+        """
+        Record an event in the combined log and the per-user-type log.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list(
+        self,
+        *,
+        user_type: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        """
+        All events for a user type, newest first, limited to `fields`
+        when given.
+        """
+        raise NotImplementedError
+
+
+class AuthUserRepository(ABC):
+
+    @abstractmethod
+    async def get_active(self, *, username: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def existing_usernames(self, usernames: Iterable[str]) -> Set[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_many(self, users: List[dict]) -> Set[str]:
+        """
+        Insert users, skipping taken usernames.
+        Returns the usernames that were rejected.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_active(self, *, username: str, is_active: bool) -> bool:
+        """
+        Returns False when there is no such user.
+        """
+        raise NotImplementedError
+
+
+class RevocationRepository(ABC):
+    """
+    Revoked tokens ("jti:<id>") and users ("user:<name>": every token
+    issued up to revoked_at). Entries can be forgotten after expires_at.
+    """
+
+    @abstractmethod
+    async def add(self, *, key: str, revoked_at: datetime, expires_at: datetime) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list_since(self, *, since: Optional[datetime], now: datetime) -> List[dict]:
+        """
+        Unexpired entries revoked at or after `since` (all when None).
+        """
+        raise NotImplementedError
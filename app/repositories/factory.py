@@ -0,0 +1,83 @@
+import os
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from app.repositories.base import (
+    CampusStateRepository,
+    ExitPermissionRepository,
+    VisitorRepository,
+    AccessLogRepository,
+    AuthUserRepository,
+    RevocationRepository,
+)
+
+StorageBackend = Literal["mongo", "memory", "sqlite"]
+
+STORAGE_BACKEND: StorageBackend = os.getenv("STORAGE_BACKEND", "mongo")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "campus_security.db")
+
+
+@dataclass(frozen=True)
+class Repositories:
+    campus_state: CampusStateRepository
+    exit_permissions: ExitPermissionRepository
+    visitors: VisitorRepository
+    access_logs: AccessLogRepository
+    auth_users: AuthUserRepository
+    revocations: RevocationRepository
+
+
+_repositories: Optional[Repositories] = None
+
+
+def get_repositories() -> Repositories:
+    global _repositories
+    if _repositories is None:
+        _repositories = build_repositories(STORAGE_BACKEND)
+    return _repositories
+
+
+def set_repositories(repositories: Optional[Repositories]) -> None:
+    """
+    Swap the process-wide repositories, e.g. for tests and benchmarks.
+    """
+    global _repositories
+    _repositories = repositories
+
+
+def build_repositories(backend: StorageBackend, *, sqlite_path: str = SQLITE_PATH) -> Repositories:
+    if backend == "mongo":
+        from app.repositories import mongo
+        return Repositories(
+            campus_state=mongo.MongoCampusStateRepository(),
+            exit_permissions=mongo.MongoExitPermissionRepository(),
+            visitors=mongo.MongoVisitorRepository(),
+            access_logs=mongo.MongoAccessLogRepository(),
+            auth_users=mongo.MongoAuthUserRepository(),
+            revocations=mongo.MongoRevocationRepository(),
+        )
+
+    if backend == "memory":
+        from app.repositories import memory
+        return Repositories(
+            campus_state=memory.MemoryCampusStateRepository(),
+            exit_permissions=memory.MemoryExitPermissionRepository(),
+            visitors=memory.MemoryVisitorRepository(),
+            access_logs=memory.MemoryAccessLogRepository(),
+            auth_users=memory.MemoryAuthUserRepository(),
+            revocations=memory.MemoryRevocationRepository(),
+        )
+
+    if backend == "sqlite":
+        from app.repositories import sqlite
+        connection = sqlite.connect(sqlite_path)
+        return Repositories(
+            campus_state=sqlite.SQLiteCampusStateRepository(connection),
+            exit_permissions=sqlite.SQLiteExitPermissionRepository(connection),
+            visitors=sqlite.SQLiteVisitorRepository(connection),
+            access_logs=sqlite.SQLiteAccessLogRepository(connection),
+            auth_users=sqlite.SQLiteAuthUserRepository(connection),
+            revocations=sqlite.SQLiteRevocationRepository(connection),
+        )
+
+    raise ValueError(f"Unknown storage backend: {backend}")
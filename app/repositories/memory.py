@@ -0,0 +1,159 @@
+import copy
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from bson import ObjectId
+
+from app.repositories.base import (
+    project,
+    CampusStateRepository,
+    ExitPermissionRepository,
+    VisitorRepository,
+    AccessLogRepository,
+    AuthUserRepository,
+    RevocationRepository,
+)
+
+
+class MemoryCampusStateRepository(CampusStateRepository):
+
+    def __init__(self):
+        self._records: Dict[Tuple[str, str], dict] = {}
+
+    async def get(self, *, user_type: str, identifier: str) -> Optional[dict]:
+        record = self._records.get((user_type, identifier))
+        return copy.copy(record) if record else None
+
+    async def upsert(self, *, user_type: str, identifier: str, fields: dict) -> None:
+        record = self._records.setdefault(
+            (user_type, identifier),
+            {"user_type": user_type, "identifier": identifier}
+        )
+        record.update(fields)
+
+    async def delete(self, *, user_type: str, identifier: str) -> int:
+        return 1 if self._records.pop((user_type, identifier), None) else 0
+
+    async def list(
+        self,
+        *,
+        user_type: str,
+        is_inside: bool,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        return [
+            project(record, fields)
+            for (record_type, _), record in self._records.items()
+            if record_type == user_type and record.get("is_inside") is is_inside
+        ]
+
+
+class MemoryExitPermissionRepository(ExitPermissionRepository):
+
+    def __init__(self):
+        self._permissions: Dict[str, List[dict]] = {}
+
+    async def get(self, *, student_roll: str) -> Optional[dict]:
+        permissions = self._permissions.get(student_roll)
+        return copy.copy(permissions[0]) if permissions else None
+
+    async def create(self, *, student_roll: str, artifact: dict) -> None:
+        self._permissions.setdefault(student_roll, []).append(
+            {"student_roll": student_roll, **artifact}
+        )
+
+    async def delete(self, *, student_roll: str) -> int:
+        permissions = self._permissions.get(student_roll)
+        if not permissions:
+            return 0
+        permissions.pop(0)
+        if not permissions:
+            del self._permissions[student_roll]
+        return 1
+
+
+class MemoryVisitorRepository(VisitorRepository):
+
+    def __init__(self):
+        self._visitors: Dict[str, dict] = {}
+
+    async def create(self, record: dict) -> str:
+        # Same id shape as the Mongo backend
+        visitor_id = str(ObjectId())
+        self._visitors[visitor_id] = {"_id": visitor_id, **record}
+        return visitor_id
+
+    async def get(self, *, visitor_id: str) -> Optional[dict]:
+        visitor = self._visitors.get(visitor_id)
+        return copy.copy(visitor) if visitor else None
+
+    async def delete(self, *, visitor_id: str) -> int:
+        return 1 if self._visitors.pop(visitor_id, None) else 0
+
+
+class MemoryAccessLogRepository(AccessLogRepository):
+
+    def __init__(self):
+        self._logs: Dict[str, List[dict]] = {}
+
+    async def append(self, entry: dict) -> None:
+        self._logs.setdefault(entry["user_type"], []).append(dict(entry))
+
+    async def list(
+        self,
+        *,
+        user_type: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        logs = sorted(
+            self._logs.get(user_type, []),
+            key=lambda entry: entry["timestamp"],
+            reverse=True
+        )
+        return [project(entry, fields) for entry in logs]
+
+
+class MemoryAuthUserRepository(AuthUserRepository):
+
+    def __init__(self):
+        self._users: Dict[str, dict] = {}
+
+    async def get_active(self, *, username: str) -> Optional[dict]:
+        user = self._users.get(username)
+        return copy.copy(user) if user and user.get("is_active") else None
+
+    async def existing_usernames(self, usernames: Iterable[str]) -> Set[str]:
+        return {username for username in usernames if username in self._users}
+
+    async def create_many(self, users: List[dict]) -> Set[str]:
+        rejected = set()
+        for user in users:
+            if user["username"] in self._users:
+                rejected.add(user["username"])
+            else:
+                self._users[user["username"]] = dict(user)
+        return rejected
+
+    async def set_active(self, *, username: str, is_active: bool) -> bool:
+        user = self._users.get(username)
+        if user is None:
+            return False
+        user["is_active"] = is_active
+        return True
+
+
+class MemoryRevocationRepository(RevocationRepository):
+
+    def __init__(self):
+        self._entries: Dict[str, dict] = {}
+
+    async def add(self, *, key: str, revoked_at: datetime, expires_at: datetime) -> None:
+        self._entries[key] = {"key": key, "revoked_at": revoked_at, "expires_at": expires_at}
+
+    async def list_since(self, *, since: Optional[datetime], now: datetime) -> List[dict]:
+        for key in [key for key, entry in self._entries.items() if entry["expires_at"] <= now]:
+            del self._entries[key]
+        return [
+            dict(entry) for entry in self._entries.values()
+            if since is None or entry["revoked_at"] >= since
+        ]
@@ -0,0 +1,242 @@
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Set
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError
+
+from app.core.database.collections import (
+    access_logs_collection,
+    student_logs_collection,
+    visitor_logs_collection,
+    campus_state_collection,
+    exit_permissions_collection,
+    visitors_collection,
+    auth_users_collection,
+    token_revocations_collection,
+)
+from app.core.database.breaker import guarded
+from app.core.database.client import batch_deadline
+from app.core.database.durability import durable
+from app.core.database.routing import listing_reads
+from app.core.database.timeseries import LOG_TIMESERIES, META_FIELD, with_meta
+from app.repositories.base import (
+    CampusStateRepository,
+    ExitPermissionRepository,
+    VisitorRepository,
+    AccessLogRepository,
+    AuthUserRepository,
+    RevocationRepository,
+)
+
+
+def _stringify_ids(results: List[dict]) -> List[dict]:
+    # Convert ObjectId to string for JSON serialization
+    for result in results:
+        if "_id" in result:
+            result["_id"] = str(result["_id"])
+    return results
+
+
+def _projection(fields: Optional[Sequence[str]]) -> Optional[dict]:
+    if fields is None:
+        return None
+    projection = {field: 1 for field in fields}
+    projection.setdefault("_id", 0)
+    return projection
+
+
+def _object_id(visitor_id: str) -> Optional[ObjectId]:
+    try:
+        return ObjectId(visitor_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+class MongoCampusStateRepository(CampusStateRepository):
+
+    @guarded
+    async def get(self, *, user_type: str, identifier: str) -> Optional[dict]:
+        return await campus_state_collection.find_one({
+            "user_type": user_type,
+            "identifier": identifier
+        })
+
+    @guarded
+    async def upsert(self, *, user_type: str, identifier: str, fields: dict) -> None:
+        await durable(campus_state_collection, "update").update_one(
+            {
+                "user_type": user_type,
+                "identifier": identifier
+            },
+            {
+                "$set": fields
+            },
+            upsert=True
+        )
+
+    @guarded
+    async def delete(self, *, user_type: str, identifier: str) -> int:
+        result = await durable(campus_state_collection, "delete").delete_one({
+            "user_type": user_type,
+            "identifier": identifier
+        })
+        return result.deleted_count
+
+    @guarded
+    async def list(
+        self,
+        *,
+        user_type: str,
+        is_inside: bool,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        async with listing_reads(campus_state_collection) as (collection, session):
+            results = await collection.find(
+                {"user_type": user_type, "is_inside": is_inside},
+                _projection(fields),
+                session=session
+            ).to_list(None)
+        return _stringify_ids(results)
+
+
+class MongoExitPermissionRepository(ExitPermissionRepository):
+
+    @guarded
+    async def get(self, *, student_roll: str) -> Optional[dict]:
+        return await exit_permissions_collection.find_one({
+            "student_roll": student_roll
+        })
+
+    @guarded
+    async def create(self, *, student_roll: str, artifact: dict) -> None:
+        await durable(exit_permissions_collection, "insert").insert_one({
+            "student_roll": student_roll,
+            **artifact
+        })
+
+    @guarded
+    async def delete(self, *, student_roll: str) -> int:
+        result = await durable(exit_permissions_collection, "delete").delete_one({
+            "student_roll": student_roll
+        })
+        return result.deleted_count
+
+
+class MongoVisitorRepository(VisitorRepository):
+
+    @guarded
+    async def create(self, record: dict) -> str:
+        result = await durable(visitors_collection, "insert").insert_one(dict(record))
+        return str(result.inserted_id)
+
+    @guarded
+    async def get(self, *, visitor_id: str) -> Optional[dict]:
+        oid = _object_id(visitor_id)
+        if oid is None:
+            return None
+        return await visitors_collection.find_one({"_id": oid})
+
+    @guarded
+    async def delete(self, *, visitor_id: str) -> int:
+        oid = _object_id(visitor_id)
+        if oid is None:
+            return 0
+        result = await durable(visitors_collection, "delete").delete_one({"_id": oid})
+        return result.deleted_count
+
+
+class MongoAccessLogRepository(AccessLogRepository):
+
+    @guarded
+    async def append(self, entry: dict) -> None:
+        if LOG_TIMESERIES:
+            entry = with_meta(entry)
+
+        # Log to general access_logs
+        await durable(access_logs_collection, "insert").insert_one(entry.copy())
+
+        # Log to specific collection based on user type
+        if entry["user_type"] == "student":
+            await durable(student_logs_collection, "insert").insert_one(entry.copy())
+        elif entry["user_type"] == "visitor":
+            await durable(visitor_logs_collection, "insert").insert_one(entry.copy())
+
+    @guarded
+    async def list(
+        self,
+        *,
+        user_type: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        collection = student_logs_collection if user_type == "student" else visitor_logs_collection
+        projection = _projection(fields)
+        if projection is None and LOG_TIMESERIES:
+            # The series key is storage detail, not part of the entry
+            projection = {META_FIELD: 0}
+        # A full log listing can outlast the per-operation deadline; its
+        # timeout would count against the breaker the gate writes share
+        with batch_deadline():
+            async with listing_reads(collection) as (collection, session):
+                results = await collection.find(
+                    {}, projection, session=session
+                ).sort("timestamp", -1).to_list(None)
+        return _stringify_ids(results)
+
+
+class MongoAuthUserRepository(AuthUserRepository):
+
+    @guarded
+    async def get_active(self, *, username: str) -> Optional[dict]:
+        return await auth_users_collection.find_one(
+            {"username": username, "is_active": True}
+        )
+
+    @guarded
+    async def existing_usernames(self, usernames: Iterable[str]) -> Set[str]:
+        return {
+            doc["username"]
+            async for doc in auth_users_collection.find(
+                {"username": {"$in": list(usernames)}},
+                {"_id": 0, "username": 1}
+            )
+        }
+
+    @guarded
+    async def create_many(self, users: List[dict]) -> Set[str]:
+        if not users:
+            return set()
+        docs = [dict(user) for user in users]
+        try:
+            await durable(auth_users_collection, "insert").insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # The unique username index rejected these
+            return {docs[err["index"]]["username"] for err in e.details.get("writeErrors", [])}
+        return set()
+
+    @guarded
+    async def set_active(self, *, username: str, is_active: bool) -> bool:
+        result = await durable(auth_users_collection, "update").update_one(
+            {"username": username},
+            {"$set": {"is_active": is_active}}
+        )
+        return result.matched_count > 0
+
+
+class MongoRevocationRepository(RevocationRepository):
+
+    @guarded
+    async def add(self, *, key: str, revoked_at: datetime, expires_at: datetime) -> None:
+        # The TTL index on expires_at removes entries once useless
+        await durable(token_revocations_collection, "update").update_one(
+            {"key": key},
+            {"$set": {"revoked_at": revoked_at, "expires_at": expires_at}},
+            upsert=True
+        )
+
+    @guarded
+    async def list_since(self, *, since: Optional[datetime], now: datetime) -> List[dict]:
+        query = {"expires_at": {"$gt": now}}
+        if since is not None:
+            query["revoked_at"] = {"$gte": since}
+        return await token_revocations_collection.find(query, {"_id": 0}).to_list(None)
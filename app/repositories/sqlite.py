@@ -0,0 +1,319 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Set
+
+from bson import ObjectId
+
+from app.repositories.base import (
+    project,
+    CampusStateRepository,
+    ExitPermissionRepository,
+    VisitorRepository,
+    AccessLogRepository,
+    AuthUserRepository,
+    RevocationRepository,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campus_state (
+    user_type TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    is_inside INTEGER,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (user_type, identifier)
+);
+CREATE INDEX IF NOT EXISTS campus_state_inside ON campus_state (user_type, is_inside);
+
+CREATE TABLE IF NOT EXISTS exit_permissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_roll TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS exit_permissions_roll ON exit_permissions (student_roll);
+
+CREATE TABLE IF NOT EXISTS visitors (
+    visitor_id TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS access_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_type TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS access_logs_identifier ON access_logs (identifier, timestamp);
+CREATE INDEX IF NOT EXISTS access_logs_type ON access_logs (user_type, timestamp);
+
+CREATE TABLE IF NOT EXISTS auth_users (
+    username TEXT PRIMARY KEY,
+    is_active INTEGER NOT NULL,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS token_revocations (
+    key TEXT PRIMARY KEY,
+    revoked_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS token_revocations_revoked ON token_revocations (revoked_at);
+"""
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if hasattr(value, "value"):
+        # Enums such as Direction
+        return value.value
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def _decode(obj: dict):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def encode_doc(doc: dict) -> str:
+    return json.dumps(doc, default=_encode, separators=(",", ":"))
+
+
+def decode_doc(text: Optional[str]) -> Optional[dict]:
+    return json.loads(text, object_hook=_decode) if text else None
+
+
+@contextmanager
+def transaction(connection: sqlite3.Connection):
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open the store in WAL mode. Gate writes are tiny and local, so calls
+    run inline on the event loop.
+    """
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+class SQLiteCampusStateRepository(CampusStateRepository):
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._db = connection
+
+    def _get(self, user_type: str, identifier: str) -> Optional[dict]:
+        row = self._db.execute(
+            "SELECT doc FROM campus_state WHERE user_type = ? AND identifier = ?",
+            (user_type, identifier)
+        ).fetchone()
+        return decode_doc(row[0]) if row else None
+
+    async def get(self, *, user_type: str, identifier: str) -> Optional[dict]:
+        return self._get(user_type, identifier)
+
+    async def upsert(self, *, user_type: str, identifier: str, fields: dict) -> None:
+        with transaction(self._db):
+            record = self._get(user_type, identifier) or {
+                "user_type": user_type,
+                "identifier": identifier,
+            }
+            record.update(fields)
+            self._db.execute(
+                "INSERT OR REPLACE INTO campus_state (user_type, identifier, is_inside, doc) "
+                "VALUES (?, ?, ?, ?)",
+                (user_type, identifier, record.get("is_inside"), encode_doc(record))
+            )
+
+    async def delete(self, *, user_type: str, identifier: str) -> int:
+        cursor = self._db.execute(
+            "DELETE FROM campus_state WHERE user_type = ? AND identifier = ?",
+            (user_type, identifier)
+        )
+        return cursor.rowcount
+
+    async def list(
+        self,
+        *,
+        user_type: str,
+        is_inside: bool,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        rows = self._db.execute(
+            "SELECT doc FROM campus_state WHERE user_type = ? AND is_inside = ?",
+            (user_type, int(is_inside))
+        ).fetchall()
+        return [project(decode_doc(row[0]), fields) for row in rows]
+
+
+class SQLiteExitPermissionRepository(ExitPermissionRepository):
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._db = connection
+
+    async def get(self, *, student_roll: str) -> Optional[dict]:
+        row = self._db.execute(
+            "SELECT doc FROM exit_permissions WHERE student_roll = ? ORDER BY id LIMIT 1",
+            (student_roll,)
+        ).fetchone()
+        return decode_doc(row[0]) if row else None
+
+    async def create(self, *, student_roll: str, artifact: dict) -> None:
+        self._db.execute(
+            "INSERT INTO exit_permissions (student_roll, doc) VALUES (?, ?)",
+            (student_roll, encode_doc({"student_roll": student_roll, **artifact}))
+        )
+
+    async def delete(self, *, student_roll: str) -> int:
+        cursor = self._db.execute(
+            "DELETE FROM exit_permissions WHERE id = "
+            "(SELECT id FROM exit_permissions WHERE student_roll = ? ORDER BY id LIMIT 1)",
+            (student_roll,)
+        )
+        return cursor.rowcount
+
+
+class SQLiteVisitorRepository(VisitorRepository):
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._db = connection
+
+    async def create(self, record: dict) -> str:
+        # Same id shape as the Mongo backend
+        visitor_id = str(ObjectId())
+        self._db.execute(
+            "INSERT INTO visitors (visitor_id, doc) VALUES (?, ?)",
+            (visitor_id, encode_doc({"_id": visitor_id, **record}))
+        )
+        return visitor_id
+
+    async def get(self, *, visitor_id: str) -> Optional[dict]:
+        row = self._db.execute(
+            "SELECT doc FROM visitors WHERE visitor_id = ?", (visitor_id,)
+        ).fetchone()
+        return decode_doc(row[0]) if row else None
+
+    async def delete(self, *, visitor_id: str) -> int:
+        cursor = self._db.execute(
+            "DELETE FROM visitors WHERE visitor_id = ?", (visitor_id,)
+        )
+        return cursor.rowcount
+
+
+class SQLiteAccessLogRepository(AccessLogRepository):
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._db = connection
+
+    async def append(self, entry: dict) -> None:
+        # One table serves both the combined and the per-type views
+        self._db.execute(
+            "INSERT INTO access_logs (user_type, identifier, timestamp, doc) VALUES (?, ?, ?, ?)",
+            (entry["user_type"], entry["identifier"], entry["timestamp"].isoformat(), encode_doc(entry))
+        )
+
+    async def list(
+        self,
+        *,
+        user_type: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        rows = self._db.execute(
+            "SELECT doc FROM access_logs WHERE user_type = ? ORDER BY timestamp DESC, id DESC",
+            (user_type,)
+        ).fetchall()
+        return [project(decode_doc(row[0]), fields) for row in rows]
+
+
+class SQLiteAuthUserRepository(AuthUserRepository):
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._db = connection
+
+    async def get_active(self, *, username: str) -> Optional[dict]:
+        row = self._db.execute(
+            "SELECT doc FROM auth_users WHERE username = ? AND is_active = 1",
+            (username,)
+        ).fetchone()
+        return decode_doc(row[0]) if row else None
+
+    async def existing_usernames(self, usernames: Iterable[str]) -> Set[str]:
+        usernames = list(usernames)
+        if not usernames:
+            return set()
+        placeholders = ",".join("?" * len(usernames))
+        rows = self._db.execute(
+            f"SELECT username FROM auth_users WHERE username IN ({placeholders})",
+            usernames
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    async def create_many(self, users: List[dict]) -> Set[str]:
+        rejected = set()
+        with transaction(self._db):
+            for user in users:
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO auth_users (username, is_active, doc) VALUES (?, ?, ?)",
+                    (user["username"], int(user.get("is_active", True)), encode_doc(user))
+                )
+                if cursor.rowcount == 0:
+                    rejected.add(user["username"])
+        return rejected
+
+    async def set_active(self, *, username: str, is_active: bool) -> bool:
+        row = self._db.execute(
+            "SELECT doc FROM auth_users WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            return False
+        doc = decode_doc(row[0])
+        doc["is_active"] = is_active
+        with transaction(self._db):
+            self._db.execute(
+                "UPDATE auth_users SET is_active = ?, doc = ? WHERE username = ?",
+                (int(is_active), encode_doc(doc), username)
+            )
+        return True
+
+
+class SQLiteRevocationRepository(RevocationRepository):
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._db = connection
+
+    async def add(self, *, key: str, revoked_at: datetime, expires_at: datetime) -> None:
+        with transaction(self._db):
+            self._db.execute(
+                "INSERT OR REPLACE INTO token_revocations (key, revoked_at, expires_at) VALUES (?, ?, ?)",
+                (key, revoked_at.isoformat(), expires_at.isoformat())
+            )
+
+    async def list_since(self, *, since: Optional[datetime], now: datetime) -> List[dict]:
+        with transaction(self._db):
+            self._db.execute(
+                "DELETE FROM token_revocations WHERE expires_at <= ?", (now.isoformat(),)
+            )
+        rows = self._db.execute(
+            "SELECT key, revoked_at, expires_at FROM token_revocations WHERE revoked_at >= ?",
+            ((since or datetime.min).isoformat(),)
+        ).fetchall()
+        return [
+            {
+                "key": key,
+                "revoked_at": datetime.fromisoformat(revoked_at),
+                "expires_at": datetime.fromisoformat(expires_at),
+            }
+            for key, revoked_at, expires_at in rows
+        ]
@@ -1,4 +1,4 @@
-from typing import Literal, Annotated
+from typing import List, Literal, Annotated
 from pydantic import BaseModel, Field
 
 Role = Literal["GUARD", "ADMIN"]
@@ -16,3 +16,10 @@ class AdminCreateUserRequest(BaseModel):
     ]
 
     role: Role
+
+
+class AdminBulkCreateUsersRequest(BaseModel):
+    users: Annotated[
+        List[AdminCreateUserRequest],
+        Field(min_length=1, max_length=500)
+    ]
@@ -50,8 +50,9 @@ class StudentEntryRequest(BaseModel):
     """
 
     roll_number: RollNumber
-    name: Name
-    phone_number: PhoneNumber
+    # Filled in from the student roster when omitted
+    name: Optional[Name] = None
+    phone_number: Optional[PhoneNumber] = None
     gate_number: GateNumber
 
     class Config:
@@ -1,7 +1,9 @@
-from typing import Annotated, Literal
+from typing import Annotated, Optional
 from datetime import datetime
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from app.domain.PolicyEngine.engine import get_policy_engine
 
 
 RollNumber = Annotated[
@@ -43,8 +45,6 @@ PhoneNumber = Annotated[
     )
 ]
 
-ExitPurpose = Literal["MARKET", "HOME"]
-
 
 class StudentExitRequest(BaseModel):
     """
@@ -52,13 +52,14 @@ class StudentExitRequest(BaseModel):
     """
 
     roll_number: RollNumber
-    name: Name
-    phone_number: PhoneNumber
+    # Filled in from the student roster when omitted
+    name: Optional[Name] = None
+    phone_number: Optional[PhoneNumber] = None
 
     purpose: Annotated[
-        ExitPurpose,
+        str,
         Field(
-            description="Purpose of exit: MARKET or HOME",
+            description="Purpose of exit, one of those in the policy rules (MARKET or HOME by default)",
             example="MARKET"
         )
     ]
@@ -73,6 +74,15 @@ class StudentExitRequest(BaseModel):
     
     gate_number: GateNumber
 
+    @field_validator("purpose")
+    @classmethod
+    def validate_purpose(cls, purpose: str) -> str:
+        # The purposes are whatever the loaded policy rules define
+        purposes = get_policy_engine().rules.exit_purposes
+        if purpose not in purposes:
+            raise ValueError(f"purpose must be one of: {', '.join(purposes)}")
+        return purpose
+
     @model_validator(mode="after")
     def validate_return_time(self):
         """
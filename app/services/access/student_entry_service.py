@@ -5,9 +5,10 @@ from app.domain.Users.student import Student
 from app.domain.EntryPolicy.student_entry import StudentEntryPolicy 
 from app.domain.EntryPolicy.violations import EntryViolation 
 from app.core.enums import Direction 
-from app.core.database.collections import exit_permissions_collection, campus_state_collection, students_collection
+from app.repositories.factory import get_repositories
 from app.services.campus_state_service import CampusStateService 
 from app.services.access_log_service import AccessLogService 
+from app.services.roster_service import RosterService
 
 
 class StudentEntryService:
@@ -16,21 +17,27 @@ class StudentEntryService:
         self._policy = StudentEntryPolicy()
         self._state = CampusStateService()
         self._log = AccessLogService() 
+        self._permissions = get_repositories().exit_permissions
         
     async def execute(
         self,
         *,
         roll_number: str,
-        name: str,
-        phone_number: str,
+        name: Optional[str] = None,
+        phone_number: Optional[str] = None,
         gate_number: int
     ) -> Optional[EntryViolation]:
         
-        # Create Student domain object with provided data
-        student = Student(
+        # Validate against the roster and fill in missing details
+        record = RosterService.resolve(
+            roll_number=roll_number,
             name=name,
-            phone_number=phone_number,
-            roll_number=roll_number
+            phone_number=phone_number
+        )
+        student = Student(
+            name=record.name,
+            phone_number=record.phone_number,
+            roll_number=record.roll_number
         )
         
         # Check if student is already inside
@@ -43,9 +50,9 @@ class StudentEntryService:
             raise ValueError(f"Student {student.identifier} is already inside campus")
         
         # Fetch the exit permission from database
-        exit_permission = await exit_permissions_collection.find_one({
-            "student_roll": student.identifier
-        })
+        exit_permission = await self._permissions.get(
+            student_roll=student.identifier
+        )
         
         allowed_until = None
         violation = None
@@ -54,15 +61,15 @@ class StudentEntryService:
         if exit_permission:
             allowed_until = exit_permission.get("allowed_until")
             
-            violation = await self._policy.validate_entry(
+            violation = self._policy.validate_entry(
                 allowed_until=allowed_until,
                 current_time=datetime.utcnow()
             )
             
             # Delete the exit permission after entry
-            await exit_permissions_collection.delete_one({
-                "student_roll": student.identifier
-            })
+            await self._permissions.delete(
+                student_roll=student.identifier
+            )
         
         # Update campus state with student info
         await self._state.mark_inside(
@@ -4,9 +4,10 @@ from typing import Optional
 from app.domain.Users.student import Student 
 from app.domain.ExitPolicy.student_exit_policy import StudentExitPolicy 
 from app.core.enums import Direction 
-from app.core.database.collections import exit_permissions_collection, campus_state_collection, students_collection
+from app.repositories.factory import get_repositories
 from app.services.campus_state_service import CampusStateService
 from app.services.access_log_service import AccessLogService 
+from app.services.roster_service import RosterService
 
 
 class StudentExitService:
@@ -15,23 +16,29 @@ class StudentExitService:
         self._policy = StudentExitPolicy() 
         self._state = CampusStateService() 
         self._log = AccessLogService() 
+        self._permissions = get_repositories().exit_permissions
         
     async def execute(
         self,
         *,
         roll_number: str,
-        name: str,
-        phone_number: str,
+        name: Optional[str] = None,
+        phone_number: Optional[str] = None,
         purpose: str,
         return_by: datetime,
         gate_number: int
     ) -> None:
         
-        # Create Student domain object with provided data
-        student = Student(
+        # Validate against the roster and fill in missing details
+        record = RosterService.resolve(
+            roll_number=roll_number,
             name=name,
-            phone_number=phone_number,
-            roll_number=roll_number
+            phone_number=phone_number
+        )
+        student = Student(
+            name=record.name,
+            phone_number=record.phone_number,
+            roll_number=record.roll_number
         )
         
         # Check if student is already outside (has already exited)
@@ -43,27 +50,27 @@ class StudentExitService:
         if existing_state and existing_state.get("is_inside") is False:
             raise ValueError(f"Student {student.identifier} has already exited campus")
         
-        await self._policy.validate_exit(
+        self._policy.validate_exit(
             purpose=purpose,
             return_by=return_by
         )
         
-        artifact = await self._policy.build_exit_artifact(
+        artifact = self._policy.build_exit_artifact(
             purpose=purpose,
             return_by=return_by
         )
         
-        await exit_permissions_collection.insert_one({
-            "student_roll": student.identifier,
-            **artifact
-        })
+        await self._permissions.create(
+            student_roll=student.identifier,
+            artifact=artifact
+        )
         
         # Mark student as outside before logging
         await self._state.mark_outside(
             user_type="student",
             identifier=student.identifier,
-            user_name=name,
-            phone_number=phone_number,
+            user_name=student.name,
+            phone_number=student.phone_number,
             purpose=purpose
         )
         
@@ -74,5 +81,6 @@ class StudentExitService:
             gate_number=gate_number,
             name=student.name,
             phone_number=student.phone_number,
-            purpose=purpose
+            purpose=purpose,
+            allowed_until=artifact["allowed_until"]
         )
\ No newline at end of file
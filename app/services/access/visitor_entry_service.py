@@ -4,9 +4,11 @@ from typing import Optional
 from app.domain.Users.visitor import Visitor
 from app.domain.EntryPolicy.visitor_entry import VisitorEntryPolicy
 from app.core.enums import Direction
-from app.core.database.collections import visitors_collection
+from app.repositories.factory import get_repositories
 from app.services.campus_state_service import CampusStateService
 from app.services.access_log_service import AccessLogService
+from app.services.vehicle_index_service import VehicleIndex, VehicleRecord, added, normalize_plate
+from app.core.database.invalidation import InvalidationBus
 
 
 class VisitorEntryService:
@@ -18,6 +20,7 @@ class VisitorEntryService:
         self._policy = VisitorEntryPolicy()
         self._state = CampusStateService()
         self._log = AccessLogService()
+        self._visitors = get_repositories().visitors
 
     async def execute(
         self,
@@ -29,7 +32,7 @@ class VisitorEntryService:
         gate_number: int
     ) -> str:
 
-        result = await visitors_collection.insert_one({
+        visitor_id = await self._visitors.create({
             "name": name,
             "phone_number": phone_number,
             "number_of_visitors": number_of_visitors,
@@ -37,8 +40,6 @@ class VisitorEntryService:
             "entered_at": datetime.utcnow()
         })
 
-        visitor_id = str(result.inserted_id)
-
         visitor = Visitor(
             visitor_id=visitor_id,
             name=name,
@@ -47,7 +48,7 @@ class VisitorEntryService:
             vehicle_number=vehicle_number
         )
 
-        await self._policy.validate_entry()
+        self._policy.validate_entry()
 
         await self._log.log(
             user_type="visitor",
@@ -56,15 +57,28 @@ class VisitorEntryService:
             gate_number=gate_number,
             name=name,
             phone_number=phone_number,
-            number_of_visitors=number_of_visitors
+            number_of_visitors=number_of_visitors,
+            vehicle_number=vehicle_number
         )
 
         await self._state.mark_inside(
             user_name=visitor.name,
             phone_number=visitor.phone_number,
             number_of_visitors=visitor.number_of_visitors,
+            vehicle_number=visitor.vehicle_number,
             user_type="visitor",
             identifier=visitor.identifier
         )
 
+        if visitor.vehicle_number:
+            record = VehicleRecord(
+                vehicle_number=normalize_plate(visitor.vehicle_number),
+                visitor_id=visitor_id,
+                name=visitor.name,
+                number_of_visitors=visitor.number_of_visitors,
+                entered_at=datetime.utcnow()
+            )
+            VehicleIndex.add(record)
+            await InvalidationBus.publish_soon("vehicles", [added(record)])
+
         return visitor_id
@@ -1,9 +1,14 @@
 from app.domain.Users.visitor import Visitor
 from app.domain.ExitPolicy.visitor_exit_policy import VisitorExitPolicy
 from app.core.enums import Direction
-from app.core.database.collections import visitors_collection
+from app.repositories.factory import get_repositories
 from app.services.campus_state_service import CampusStateService
 from app.services.access_log_service import AccessLogService
+from app.services.vehicle_index_service import VehicleIndex, removed
+from app.core.database.invalidation import InvalidationBus
+from app.core.log import get_logger
+
+logger = get_logger("visitor_exit")
 
 
 class VisitorExitService:
@@ -15,14 +20,12 @@ class VisitorExitService:
         self._policy = VisitorExitPolicy()
         self._state = CampusStateService()
         self._log = AccessLogService()
+        self._visitors = get_repositories().visitors
 
     async def execute(self, *, visitor_id: str, gate_number: int) -> None:
         
         # Get visitor info from visitors collection
-        from bson import ObjectId
-        from app.core.database.collections import campus_state_collection
-        
-        visitor_doc = await visitors_collection.find_one({"_id": ObjectId(visitor_id)})
+        visitor_doc = await self._visitors.get(visitor_id=visitor_id)
         
         name = visitor_doc.get("name", "UNKNOWN") if visitor_doc else "UNKNOWN"
         phone_number = visitor_doc.get("phone_number", "9999999999") if visitor_doc else "9999999999"
@@ -36,10 +39,9 @@ class VisitorExitService:
             vehicle_number=None
         )
         
-        print(f"Exiting visitor with ID: {visitor_id}")
-        print(f"Visitor identifier: {visitor.identifier}")
+        logger.debug("Exiting visitor", extra={"visitor_id": visitor_id})
 
-        await self._policy.validate_exit()
+        self._policy.validate_exit()
 
         # Remove from campus_state
         await self._state.mark_outside(
@@ -47,12 +49,16 @@ class VisitorExitService:
             identifier=visitor.identifier
         )
         
+        # Also when this worker never saw the entry: others may have
+        if VehicleIndex.remove_visitor(visitor_id) or (visitor_doc or {}).get("vehicle_number"):
+            await InvalidationBus.publish_soon("vehicles", [removed(visitor_id)])
+
         # Delete from visitors collection
         try:
-            await visitors_collection.delete_one({"_id": ObjectId(visitor_id)})
-            print(f"Deleted visitor from visitors collection: {visitor_id}")
+            await self._visitors.delete(visitor_id=visitor_id)
+            logger.debug("Deleted visitor", extra={"visitor_id": visitor_id})
         except Exception as e:
-            print(f"Error deleting visitor from visitors collection: {e}")
+            logger.error("Deleting visitor failed", extra={"visitor_id": visitor_id, "error": str(e)})
 
         await self._log.log(
             user_type="visitor",
@@ -1,14 +1,15 @@
 from datetime import datetime 
 from typing import Optional 
 from app.core.enums import Direction 
-from app.core.database.collections import (
-    access_logs_collection,
-    student_logs_collection,
-    visitor_logs_collection
-)
+from app.repositories.factory import get_repositories
+from app.core.database.invalidation import InvalidationBus
+from app.services.gate_traffic_service import GateTraffic
 
 
 class AccessLogService:
+
+    def __init__(self):
+        self._logs = get_repositories().access_logs
     
     async def log(
         self,
@@ -20,7 +21,9 @@ class AccessLogService:
         name: str = "UNKNOWN",
         phone_number: str = "9999999999",
         number_of_visitors: Optional[int] = None,
-        purpose: Optional[str] = None
+        purpose: Optional[str] = None,
+        allowed_until: Optional[datetime] = None,
+        vehicle_number: Optional[str] = None
     ) -> None:
         log_entry = {
             "user_type": user_type,
@@ -35,12 +38,15 @@ class AccessLogService:
         
         if user_type == "visitor" and number_of_visitors is not None:
             log_entry["number_of_visitors"] = number_of_visitors
+
+        # Lets the log alone rebuild exit permissions and visitor records
+        if allowed_until is not None:
+            log_entry["allowed_until"] = allowed_until
+        if vehicle_number is not None:
+            log_entry["vehicle_number"] = vehicle_number
         
-        # Log to general access_logs
-        await access_logs_collection.insert_one(log_entry.copy())
-        
-        # Log to specific collection based on user type
-        if user_type == "student":
-            await student_logs_collection.insert_one(log_entry)
-        elif user_type == "visitor":
-            await visitor_logs_collection.insert_one(log_entry)
\ No newline at end of file
+        await self._logs.append(log_entry)
+        GateTraffic.record(
+            gate_number=gate_number, direction=direction.value, user_type=user_type
+        )
+        await InvalidationBus.publish_soon(f"{user_type}_logs")
\ No newline at end of file
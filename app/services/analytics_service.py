@@ -0,0 +1,260 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.core.database.breaker import guarded
+from app.core.database.client import batch_deadline
+from app.core.database.routing import for_dashboard
+from app.core.database.collections import (
+    student_logs_collection,
+    exit_permissions_collection,
+)
+
+ANALYTICS_CHUNK_SIZE = int(os.getenv("ANALYTICS_CHUNK_SIZE", "20000"))
+ANALYTICS_CACHE_SECONDS = int(os.getenv("ANALYTICS_CACHE_SECONDS", "300"))
+ANALYTICS_BATCH_PREFIX = int(os.getenv("ANALYTICS_BATCH_PREFIX", "5"))
+
+_CACHE_SIZE = 32
+_WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_MS_PER_MINUTE = 60_000
+_MS_PER_DAY = 86_400_000
+
+# Columns come back as plain ints/bools; converting datetimes client
+# side costs more than the whole aggregation
+_COLUMNS = {
+    "_id": 0,
+    "identifier": 1,
+    "exit": {"$eq": ["$direction", "exit"]},
+    "ts": {"$toLong": "$timestamp"},
+    "purpose": {"$ifNull": ["$purpose", ""]},
+    "allowed": {"$ifNull": [{"$toLong": "$allowed_until"}, -1]},
+}
+
+
+class _Codes:
+    """
+    Stable integer codes for strings seen across chunks.
+    """
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def encode(self, column: list) -> np.ndarray:
+        index = self.index
+        return np.fromiter(
+            (index.setdefault(value, len(index)) for value in column),
+            dtype=np.int64,
+            count=len(column),
+        )
+
+    @property
+    def values(self) -> List[str]:
+        return list(self.index)
+
+
+class _Trips:
+    """
+    Completed trips (an exit followed by the same student's next entry)
+    accumulated chunk by chunk as columns.
+    """
+
+    def __init__(self):
+        self.student: List[np.ndarray] = []
+        self.purpose: List[np.ndarray] = []
+        self.exit_ms: List[np.ndarray] = []
+        self.outside_ms: List[np.ndarray] = []
+        self.late_ms: List[np.ndarray] = []
+
+    def add(self, student, is_exit, ts, purpose, allowed) -> None:
+        pair = is_exit[:-1] & ~is_exit[1:] & (student[:-1] == student[1:])
+        exit_ms = ts[:-1][pair]
+        entry_ms = ts[1:][pair]
+        allowed_ms = allowed[:-1][pair]
+
+        # No return time on record (older logs): counted as on time
+        late = np.where(allowed_ms >= 0, entry_ms - allowed_ms, 0)
+
+        self.student.append(student[:-1][pair])
+        self.purpose.append(purpose[:-1][pair])
+        self.exit_ms.append(exit_ms)
+        self.outside_ms.append(entry_ms - exit_ms)
+        self.late_ms.append(np.maximum(late, 0))
+
+    def columns(self) -> Tuple[np.ndarray, ...]:
+        def join(parts):
+            return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        return (
+            join(self.student),
+            join(self.purpose),
+            join(self.exit_ms),
+            join(self.outside_ms),
+            join(self.late_ms),
+        )
+
+
+class LatenessAnalyticsService:
+    """
+    Late returns and time spent outside, per student, per batch
+    (roll-number prefix) and per weekday of the exit.
+
+    student_logs are streamed in chunks of columnar arrays, sorted by
+    student then time, so each exit is paired with the next entry by
+    comparing shifted arrays. Aggregates are bincounts over the trips.
+    Results are cached per time range.
+    """
+
+    _cache: "OrderedDict[Tuple[datetime, datetime], Tuple[float, dict]]" = OrderedDict()
+
+    async def execute(self, *, start: datetime, end: datetime) -> dict:
+        if start >= end:
+            raise ValueError("start must be before end")
+
+        key = (start, end)
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < ANALYTICS_CACHE_SECONDS:
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        with batch_deadline():
+            result = await self._compute(start, end)
+
+        self._cache[key] = (time.monotonic(), result)
+        if len(self._cache) > _CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+    @guarded
+    async def _compute(self, start: datetime, end: datetime) -> dict:
+        students = _Codes()
+        purposes = _Codes()
+        trips = _Trips()
+        rows = 0
+        carry = None
+
+        # (identifier -1, timestamp 1) walks the (identifier 1,
+        # timestamp -1) index backwards instead of sorting in memory
+        cursor = for_dashboard(student_logs_collection).aggregate([
+            {"$match": {"timestamp": {"$gte": start, "$lt": end}}},
+            {"$sort": {"identifier": -1, "timestamp": 1}},
+            {"$project": _COLUMNS},
+        ], batchSize=ANALYTICS_CHUNK_SIZE)
+
+        while True:
+            docs = await cursor.to_list(length=ANALYTICS_CHUNK_SIZE)
+            if not docs:
+                break
+            rows += len(docs)
+
+            chunk = (
+                students.encode([doc["identifier"] for doc in docs]),
+                _column(docs, "exit", bool),
+                _column(docs, "ts", np.int64),
+                purposes.encode([doc["purpose"] for doc in docs]),
+                _column(docs, "allowed", np.int64),
+            )
+            if carry is not None:
+                # An exit at the end of one chunk pairs with the next chunk
+                chunk = tuple(np.concatenate([c, n]) for c, n in zip(carry, chunk))
+
+            trips.add(*chunk)
+            carry = tuple(column[-1:] for column in chunk)
+
+        student, purpose, exit_ms, outside_ms, late_ms = trips.columns()
+        student_names = np.array(students.values, dtype=object)
+        batch_of_student, batch_names = _batches(student_names)
+
+        groups = {
+            "by_student": (student, student_names),
+            "by_batch": (batch_of_student[student], batch_names),
+            "by_weekday": ((exit_ms // _MS_PER_DAY + 3) % 7, np.array(_WEEKDAYS, dtype=object)),
+        }
+
+        result = {
+            name: _aggregate(codes, labels, purpose, purposes.values, outside_ms, late_ms)
+            for name, (codes, labels) in groups.items()
+        }
+        # Worst offenders first
+        for name in ("by_student", "by_batch"):
+            result[name].sort(key=lambda row: (-row["late_returns"], row["key"]))
+
+        return {
+            "start": start,
+            "end": end,
+            "rows": rows,
+            "trips": int(len(student)),
+            "late_returns": int(np.count_nonzero(late_ms)),
+            **result,
+            "currently_overdue": await _currently_overdue(),
+        }
+
+
+def _column(docs: List[dict], field: str, dtype) -> np.ndarray:
+    return np.fromiter((doc[field] for doc in docs), dtype=dtype, count=len(docs))
+
+
+def _batches(student_names: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    prefixes = np.array([name[:ANALYTICS_BATCH_PREFIX] for name in student_names], dtype=str)
+    batch_names, batch_of_student = np.unique(prefixes, return_inverse=True)
+    return batch_of_student, batch_names.astype(object)
+
+
+def _aggregate(
+    codes: np.ndarray,
+    labels: np.ndarray,
+    purpose: np.ndarray,
+    purpose_names: List[str],
+    outside_ms: np.ndarray,
+    late_ms: np.ndarray
+) -> List[dict]:
+    size = len(labels)
+    trips = np.bincount(codes, minlength=size)
+    late = np.bincount(codes, weights=late_ms > 0, minlength=size)
+    late_minutes = np.bincount(codes, weights=late_ms, minlength=size) / _MS_PER_MINUTE
+
+    outside = {
+        name or "UNKNOWN": np.bincount(
+            codes, weights=np.where(purpose == code, outside_ms, 0), minlength=size
+        ) / _MS_PER_MINUTE
+        for code, name in enumerate(purpose_names)
+    }
+
+    rows = []
+    for i in np.flatnonzero(trips):
+        rows.append({
+            "key": labels[i],
+            "trips": int(trips[i]),
+            "late_returns": int(late[i]),
+            "avg_minutes_late": round(float(late_minutes[i] / late[i]), 1) if late[i] else 0.0,
+            "minutes_outside_by_purpose": {
+                name: round(float(minutes[i]), 1)
+                for name, minutes in outside.items() if minutes[i]
+            },
+        })
+    return rows
+
+
+async def _currently_overdue() -> dict:
+    docs = await for_dashboard(exit_permissions_collection).aggregate([
+        {"$project": {
+            "_id": 0,
+            "student_roll": 1,
+            "allowed": {"$ifNull": [{"$toLong": "$allowed_until"}, -1]},
+        }},
+    ]).to_list(None)
+    if not docs:
+        return {"total": 0, "by_batch": {}}
+
+    allowed = _column(docs, "allowed", np.int64)
+    now = int(time.time() * 1000)
+    overdue = (allowed >= 0) & (allowed < now)
+
+    prefixes = np.array([doc["student_roll"][:ANALYTICS_BATCH_PREFIX] for doc in docs], dtype=str)
+    batch_names, counts = np.unique(prefixes[overdue], return_counts=True)
+    return {
+        "total": int(np.count_nonzero(overdue)),
+        "by_batch": {str(name): int(count) for name, count in zip(batch_names, counts)},
+    }
@@ -0,0 +1,300 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, MongoClient as SyncMongoClient, ReplaceOne, UpdateOne
+
+from app.core.database.client import MONGODB_URI, DATABASE_NAME, MONGO_BATCH_TIMEOUT_MS
+from app.core.database.invalidation import InvalidationBus
+
+REBUILD_WORKERS = int(os.getenv("REBUILD_WORKERS", os.cpu_count() or 1))
+BATCH_SIZE = 1000
+
+_PROJECTION = {
+    "_id": 0,
+    "user_type": 1,
+    "identifier": 1,
+    "direction": 1,
+    "name": 1,
+    "phone_number": 1,
+    "number_of_visitors": 1,
+    "vehicle_number": 1,
+    "purpose": 1,
+    "allowed_until": 1,
+    "timestamp": 1,
+}
+
+
+class CampusStateRebuildService:
+    """
+    Rebuilds campus_state, exit_permissions and visitors from
+    access_logs, their source of truth. Records of identifiers without
+    logs are deleted.
+
+    Work is split into identifier ranges, each replayed by its own
+    process with its own client. Progress is checkpointed per range so
+    an interrupted run can be resumed with the same run_id.
+    """
+
+    async def execute(
+        self,
+        *,
+        workers: int = REBUILD_WORKERS,
+        run_id: Optional[str] = None
+    ) -> dict:
+        # The rebuild is blocking pymongo work; keep it off the event loop
+        result = await asyncio.to_thread(
+            rebuild_campus_state, workers=workers, run_id=run_id
+        )
+        # Let every worker drop its cached view of campus_state
+        await InvalidationBus.publish("campus_state")
+        await InvalidationBus.publish("vehicles")
+        return result
+
+
+def rebuild_campus_state(
+    *,
+    workers: int = REBUILD_WORKERS,
+    run_id: Optional[str] = None
+) -> dict:
+    started = time.perf_counter()
+    run_id = run_id or datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+
+    client = _connect()
+    db = client[DATABASE_NAME]
+    bounds = _partition_bounds(db, workers)
+    partitions = list(zip([None] + bounds, bounds + [None]))
+    jobs = [(run_id, index, lo, hi) for index, (lo, hi) in enumerate(partitions)]
+
+    if len(jobs) == 1:
+        results = [_rebuild_partition(*jobs[0])]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=len(jobs),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            results = list(pool.map(_rebuild_partition, *zip(*jobs)))
+
+    _prune_visitors(db)
+    client.close()
+
+    return {
+        "run_id": run_id,
+        "partitions": len(jobs),
+        "events": sum(result["events"] for result in results),
+        "identifiers": sum(result["identifiers"] for result in results),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _connect() -> SyncMongoClient:
+    if not MONGODB_URI:
+        raise RuntimeError("MONGO_URI is not set")
+    # Each operation of a partition replay gets the batch deadline
+    return SyncMongoClient(MONGODB_URI, timeoutMS=MONGO_BATCH_TIMEOUT_MS)
+
+
+def _partition_bounds(db, workers: int) -> List[str]:
+    """
+    Split points for `workers` roughly equal identifier ranges, taken
+    from a random sample of the logs. Ranges (not hashes) keep every
+    partition a single scan of the (identifier, timestamp) index.
+    """
+    if workers <= 1:
+        return []
+
+    sample = sorted({
+        doc["identifier"]
+        for doc in db["access_logs"].aggregate([
+            {"$sample": {"size": workers * 200}},
+            {"$project": {"_id": 0, "identifier": 1}},
+        ])
+    })
+    if len(sample) < workers:
+        return []
+
+    step = len(sample) / workers
+    return sorted({sample[int(step * i)] for i in range(1, workers)})
+
+
+def _rebuild_partition(
+    run_id: str,
+    index: int,
+    lo: Optional[str],
+    hi: Optional[str]
+) -> dict:
+    client = _connect()
+    db = client[DATABASE_NAME]
+    checkpoints = db["rebuild_checkpoints"]
+    checkpoint_id = f"{run_id}:{index}"
+
+    checkpoint = checkpoints.find_one({"_id": checkpoint_id}) or {}
+    if checkpoint.get("done"):
+        client.close()
+        return checkpoint
+
+    events = checkpoint.get("events", 0)
+    identifiers = checkpoint.get("identifiers", 0)
+
+    bounds = {}
+    if checkpoint.get("last_identifier") is not None:
+        bounds["$gt"] = checkpoint["last_identifier"]
+    elif lo is not None:
+        bounds["$gte"] = lo
+    if hi is not None:
+        bounds["$lt"] = hi
+
+    # Newest event first within each identifier: walks the
+    # (identifier 1, timestamp -1) index forward, no in-memory sort
+    cursor = db["access_logs"].find(
+        {"identifier": bounds} if bounds else {},
+        _PROJECTION,
+        batch_size=5000,
+    ).sort([("identifier", 1), ("timestamp", -1)])
+
+    ops = {"campus_state": [], "exit_permissions": [], "visitors": []}
+    # The identifier range the pending ops cover
+    stretch = dict(bounds)
+    seen = []
+    current = None
+    for event in cursor:
+        events += 1
+        if event["identifier"] == current:
+            continue
+        # Folding an identifier's events only leaves its latest one
+        current = event["identifier"]
+        identifiers += 1
+        seen.append(current)
+        ops["campus_state"].append(state_op_for_event(event))
+        ops["exit_permissions"].extend(permission_ops_for_event(event))
+        ops["visitors"].extend(visitor_ops_for_event(event))
+
+        if len(seen) >= BATCH_SIZE:
+            stretch["$lte"] = current
+            stretch.pop("$lt", None)
+            _flush(db, checkpoints, checkpoint_id, ops, stretch, seen, current, events, identifiers)
+            stretch = {"$gt": current}
+            ops = {"campus_state": [], "exit_permissions": [], "visitors": []}
+            seen = []
+
+    if hi is not None:
+        stretch["$lt"] = hi
+    _flush(db, checkpoints, checkpoint_id, ops, stretch, seen, current, events, identifiers, done=True)
+    client.close()
+
+    return {"events": events, "identifiers": identifiers}
+
+
+def _flush(db, checkpoints, checkpoint_id, ops, stretch, seen, last_identifier, events, identifiers, done=False):
+    for collection, writes in ops.items():
+        if writes:
+            db[collection].bulk_write(writes, ordered=False)
+    # Records in this stretch of identifiers that no log accounts for
+    unlogged = {"$nin": seen, **stretch}
+    db["campus_state"].delete_many({"identifier": unlogged})
+    db["exit_permissions"].delete_many({"student_roll": unlogged})
+
+    checkpoints.update_one(
+        {"_id": checkpoint_id},
+        {"$set": {
+            "last_identifier": last_identifier,
+            "events": events,
+            "identifiers": identifiers,
+            "done": done,
+            "updated_at": datetime.utcnow(),
+        }},
+        upsert=True
+    )
+
+
+def _prune_visitors(db) -> None:
+    # Visitor records exist exactly for the visitors inside, and those
+    # are few; pruning by range would compare ObjectIds with strings
+    inside = [
+        ObjectId(state["identifier"])
+        for state in db["campus_state"].find({"user_type": "visitor"}, {"identifier": 1})
+        if ObjectId.is_valid(state["identifier"])
+    ]
+    db["visitors"].delete_many({"_id": {"$nin": inside}})
+
+
+def state_op_for_event(event: dict):
+    """
+    The campus_state write CampusStateService would have left behind
+    after this event.
+    """
+    user_type = event["user_type"]
+    key = {"user_type": user_type, "identifier": event["identifier"]}
+    is_entry = event["direction"] == "entry"
+
+    if user_type == "student":
+        if is_entry:
+            # Students inside have no campus_state record
+            return DeleteOne(key)
+        return ReplaceOne(key, {
+            **key,
+            "is_inside": False,
+            "last_exit_time": event["timestamp"],
+            "user_name": event.get("name"),
+            "phone_number": event.get("phone_number"),
+            "purpose": event.get("purpose"),
+        }, upsert=True)
+
+    if not is_entry:
+        # Visitors are removed on exit
+        return DeleteOne(key)
+    return ReplaceOne(key, {
+        **key,
+        "user_name": event.get("name"),
+        "phone_number": event.get("phone_number"),
+        "number_of_visitors": event.get("number_of_visitors"),
+        "vehicle_number": event.get("vehicle_number"),
+        "purpose": None,
+        "is_inside": True,
+        "last_entry_time": event["timestamp"],
+        "last_exit_time": None,
+    }, upsert=True)
+
+
+def permission_ops_for_event(event: dict) -> list:
+    """
+    The exit_permissions writes the student services would have left
+    behind after this event. Exit logs from before they carried
+    allowed_until leave the permission as it is.
+    """
+    if event["user_type"] != "student":
+        return []
+    roll = {"student_roll": event["identifier"]}
+    if event["direction"] == "entry":
+        return [DeleteMany(roll)]
+    if event.get("allowed_until") is None:
+        return []
+    return [UpdateOne(roll, {"$set": {
+        **roll,
+        "purpose": event.get("purpose"),
+        "allowed_until": event["allowed_until"],
+    }}, upsert=True)]
+
+
+def visitor_ops_for_event(event: dict) -> list:
+    """
+    The visitors write the visitor services would have left behind
+    after this event.
+    """
+    if event["user_type"] != "visitor" or not ObjectId.is_valid(event["identifier"]):
+        return []
+    key = {"_id": ObjectId(event["identifier"])}
+    if event["direction"] == "exit":
+        return [DeleteOne(key)]
+    return [UpdateOne(key, {"$setOnInsert": {
+        "name": event.get("name"),
+        "phone_number": event.get("phone_number"),
+        "number_of_visitors": event.get("number_of_visitors"),
+        "vehicle_number": event.get("vehicle_number"),
+        "entered_at": event["timestamp"],
+    }}, upsert=True)]
@@ -1,8 +1,12 @@
 from datetime import datetime
 
-from app.core.database.collections import campus_state_collection
-from app.models.campus_state import CampusState
+from app.repositories.factory import get_repositories
+from app.core.database.invalidation import InvalidationBus
 from typing import Optional
+from app.core.log import get_logger
+
+logger = get_logger("campus_state")
+
 
 class CampusStateService:
     """
@@ -13,6 +17,9 @@ class CampusStateService:
     - EXIT   -> is_inside = False
     """
 
+    def __init__(self):
+        self._states = get_repositories().campus_state
+
     async def get_state(
         self,
         *,
@@ -22,16 +29,17 @@ class CampusStateService:
         """
         Get the current state of a person.
         """
-        return await campus_state_collection.find_one({
-            "user_type": user_type,
-            "identifier": identifier
-        })
+        return await self._states.get(
+            user_type=user_type,
+            identifier=identifier
+        )
 
     async def mark_inside(
         self,
         *,
         phone_number: str,
         number_of_visitors: Optional[int] = None,
+        vehicle_number: Optional[str] = None,
         user_name: str,
         user_type: str,
         identifier: str
@@ -40,32 +48,33 @@ class CampusStateService:
         Mark a person as currently inside campus.
         """
 
-        state = CampusState(
-            user_name=user_name,
-            phone_number=phone_number,
-            number_of_visitors=number_of_visitors,
-            user_type=user_type,
-            identifier=identifier,
-            is_inside=True,
-            last_entry_time=datetime.utcnow(),
-            last_exit_time=None
-        )
+        # Same shape as CampusState.dict(); callers pass validated data,
+        # so skip building the model just to dump it again.
+        state = {
+            "user_type": user_type,
+            "identifier": identifier,
+            "user_name": user_name,
+            "phone_number": phone_number,
+            "number_of_visitors": number_of_visitors,
+            "vehicle_number": vehicle_number,
+            "purpose": None,
+            "is_inside": True,
+            "last_entry_time": datetime.utcnow(),
+            "last_exit_time": None
+        }
         if user_type == "visitor":
-            await campus_state_collection.update_one(
-                {
-                    "user_type": user_type,
-                    "identifier": identifier
-                },
-                {
-                    "$set": state.dict()
-                },
-                upsert=True
+            await self._states.upsert(
+                user_type=user_type,
+                identifier=identifier,
+                fields=state
             )
         else:
-            await campus_state_collection.delete_one({
-                "user_type": user_type,
-                "identifier": identifier
-            })
+            await self._states.delete(
+                user_type=user_type,
+                identifier=identifier
+            )
+
+        await InvalidationBus.publish_soon("campus_state")
 
     async def mark_outside(
         self,
@@ -84,11 +93,11 @@ class CampusStateService:
         
         if user_type == "visitor":
             # Delete visitor record completely on exit
-            result = await campus_state_collection.delete_one({
-                "user_type": user_type,
-                "identifier": identifier
-            })
-            print(f"Deleted visitor {identifier}, deleted_count: {result.deleted_count}")
+            deleted_count = await self._states.delete(
+                user_type=user_type,
+                identifier=identifier
+            )
+            logger.debug("Deleted visitor state", extra={"identifier": identifier, "deleted_count": deleted_count})
             
         else:
             # For students, mark as outside and store user details
@@ -103,13 +112,10 @@ class CampusStateService:
             if purpose:
                 update_data["purpose"] = purpose
             
-            await campus_state_collection.update_one(
-                {
-                    "user_type": user_type,
-                    "identifier": identifier
-                },
-                {
-                    "$set": update_data
-                },
-                upsert=True
+            await self._states.upsert(
+                user_type=user_type,
+                identifier=identifier,
+                fields=update_data
             )
+
+        await InvalidationBus.publish_soon("campus_state")
@@ -0,0 +1,410 @@
+import asyncio
+import os
+import socket
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.core.database.breaker import guarded
+from app.core.database.client import batch_deadline
+from app.core.database.collections import (
+    access_logs_collection,
+    student_logs_collection,
+    visitor_logs_collection,
+    campus_state_collection,
+    exit_permissions_collection,
+    visitors_collection,
+    auth_users_collection,
+    sync_conflicts_collection,
+    token_revocations_collection,
+)
+from app.core.database.invalidation import InvalidationBus
+from app.core.database.timeseries import LOG_TIMESERIES, with_meta
+from app.domain.PolicyEngine.engine import get_policy_engine
+from app.repositories import sqlite
+from app.repositories.factory import SQLITE_PATH
+from app.services.campus_state_rebuild_service import (
+    permission_ops_for_event,
+    state_op_for_event,
+    visitor_ops_for_event,
+)
+from app.core.log import get_logger
+
+logger = get_logger("edge_sync")
+
+EDGE_MODE = os.getenv("EDGE_MODE", "false").lower() == "true"
+EDGE_NODE_ID = os.getenv("EDGE_NODE_ID", socket.gethostname())
+EDGE_SYNC_INTERVAL_SECONDS = float(os.getenv("EDGE_SYNC_INTERVAL_SECONDS", "5"))
+EDGE_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("EDGE_SNAPSHOT_INTERVAL_SECONDS", "60"))
+EDGE_SYNC_BATCH_SIZE = int(os.getenv("EDGE_SYNC_BATCH_SIZE", "500"))
+
+_EDGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS edge_sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class EdgeSyncService:
+    """
+    Keeps an edge gate's local SQLite store in step with the central DB.
+
+    Gate scans are applied locally by the usual services; every one of
+    them lands in the local access_logs table, which doubles as the
+    outbox. Events are pushed upstream in id order and the derived
+    collections are replayed centrally from them. Snapshots of
+    campus_state, exit_permissions, visitors and auth_users are pulled
+    down only once the outbox is drained, so unsynced local effects are
+    never overwritten.
+    """
+
+    _db: Optional[sqlite3.Connection] = None
+    _pushed = 0
+    _conflicts = 0
+    _batches = 0
+    _push_seconds = 0.0
+    _last_push: Optional[datetime] = None
+    _last_snapshot: Optional[datetime] = None
+    _last_error: Optional[str] = None
+    # The sync loop and POST /edge/sync both push; one batch at a time
+    _pushing = asyncio.Lock()
+
+    @classmethod
+    def _connection(cls) -> sqlite3.Connection:
+        if cls._db is None:
+            # Separate connection to the gate's store; WAL lets both read
+            cls._db = sqlite.connect(SQLITE_PATH)
+            cls._db.executescript(_EDGE_SCHEMA)
+        return cls._db
+
+    @classmethod
+    def _get_marker(cls, key: str) -> Optional[str]:
+        row = cls._connection().execute(
+            "SELECT value FROM edge_sync_state WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def _set_marker(cls, key: str, value: str) -> None:
+        cls._connection().execute(
+            "INSERT OR REPLACE INTO edge_sync_state (key, value) VALUES (?, ?)",
+            (key, value)
+        )
+
+    @classmethod
+    def _last_pushed_id(cls) -> int:
+        return int(cls._get_marker("last_pushed_id") or 0)
+
+    @classmethod
+    def backlog(cls) -> int:
+        return cls._connection().execute(
+            "SELECT COUNT(*) FROM access_logs WHERE id > ?", (cls._last_pushed_id(),)
+        ).fetchone()[0]
+
+    @classmethod
+    async def push(cls, batch_size: int = EDGE_SYNC_BATCH_SIZE) -> int:
+        """
+        Push every unsynced local event upstream, one ordered batch at a
+        time. Returns the number of events pushed.
+        """
+        async with cls._pushing:
+            return await cls._push(batch_size)
+
+    @classmethod
+    async def _push(cls, batch_size: int) -> int:
+        pushed = 0
+        while True:
+            rows = cls._connection().execute(
+                "SELECT id, doc FROM access_logs WHERE id > ? ORDER BY id LIMIT ?",
+                (cls._last_pushed_id(), batch_size)
+            ).fetchall()
+            if not rows:
+                return pushed
+
+            started = time.perf_counter()
+            events = [_tag(row_id, sqlite.decode_doc(doc)) for row_id, doc in rows]
+            with batch_deadline():
+                conflicts = await _apply_upstream(events)
+
+            # Only advance once the central writes are in; a retry after a
+            # failure replays the batch, which every write tolerates
+            cls._set_marker("last_pushed_id", str(rows[-1][0]))
+
+            pushed += len(events)
+            cls._pushed += len(events)
+            cls._conflicts += conflicts
+            cls._batches += 1
+            cls._push_seconds += time.perf_counter() - started
+            cls._last_push = datetime.utcnow()
+
+    @classmethod
+    async def pull_snapshot(cls) -> bool:
+        """
+        Replace the local state tables with the central ones.
+        Skipped (returns False) while local events are still unsynced.
+        """
+        if cls.backlog():
+            return False
+
+        with batch_deadline():
+            state, permissions, visitors, users, revocations = await _download_snapshot()
+
+        db = cls._connection()
+        try:
+            with sqlite.transaction(db):
+                # A scan may have landed while the snapshot was downloading
+                if cls.backlog():
+                    raise _SnapshotRaced()
+                db.execute("DELETE FROM campus_state")
+                db.executemany(
+                    "INSERT INTO campus_state (user_type, identifier, is_inside, doc) VALUES (?, ?, ?, ?)",
+                    [(doc["user_type"], doc["identifier"], doc.get("is_inside"), sqlite.encode_doc(doc))
+                     for doc in state]
+                )
+                db.execute("DELETE FROM exit_permissions")
+                db.executemany(
+                    "INSERT INTO exit_permissions (student_roll, doc) VALUES (?, ?)",
+                    [(doc["student_roll"], sqlite.encode_doc(doc)) for doc in permissions]
+                )
+                db.execute("DELETE FROM visitors")
+                db.executemany(
+                    "INSERT INTO visitors (visitor_id, doc) VALUES (?, ?)",
+                    [(str(doc["_id"]), sqlite.encode_doc({**doc, "_id": str(doc["_id"])}))
+                     for doc in visitors]
+                )
+                db.execute("DELETE FROM auth_users")
+                db.executemany(
+                    "INSERT INTO auth_users (username, is_active, doc) VALUES (?, ?, ?)",
+                    [(doc["username"], int(doc.get("is_active", True)), sqlite.encode_doc(doc))
+                     for doc in users]
+                )
+                # Merged, not replaced: tokens revoked at this gate stay revoked
+                db.executemany(
+                    "INSERT OR REPLACE INTO token_revocations (key, revoked_at, expires_at) VALUES (?, ?, ?)",
+                    [(doc["key"], doc["revoked_at"].isoformat(), doc["expires_at"].isoformat())
+                     for doc in revocations]
+                )
+        except _SnapshotRaced:
+            return False
+
+        cls._last_snapshot = datetime.utcnow()
+        await InvalidationBus.publish("campus_state")
+        await InvalidationBus.publish("vehicles")
+        await InvalidationBus.publish("revocations")
+        return True
+
+    @classmethod
+    def status(cls) -> dict:
+        oldest = cls._connection().execute(
+            "SELECT MIN(timestamp) FROM access_logs WHERE id > ?", (cls._last_pushed_id(),)
+        ).fetchone()[0]
+        lag = (datetime.utcnow() - datetime.fromisoformat(oldest)).total_seconds() if oldest else 0.0
+
+        return {
+            "node_id": EDGE_NODE_ID,
+            "backlog": cls.backlog(),
+            "lag_seconds": round(lag, 3),
+            "pushed": cls._pushed,
+            "conflicts": cls._conflicts,
+            "batches": cls._batches,
+            "events_per_second": round(cls._pushed / cls._push_seconds, 1) if cls._push_seconds else None,
+            "last_push": cls._last_push,
+            "last_snapshot": cls._last_snapshot,
+            "last_error": cls._last_error,
+        }
+
+    @classmethod
+    async def run_forever(
+        cls,
+        interval: float = EDGE_SYNC_INTERVAL_SECONDS,
+        snapshot_interval: float = EDGE_SNAPSHOT_INTERVAL_SECONDS
+    ) -> None:
+        next_snapshot = 0.0
+        while True:
+            try:
+                await cls.push()
+                if time.monotonic() >= next_snapshot and await cls.pull_snapshot():
+                    next_snapshot = time.monotonic() + snapshot_interval
+                cls._last_error = None
+            except Exception as e:
+                # Central DB unreachable: keep serving locally and retry
+                cls._last_error = str(e)
+                logger.warning("Edge sync failed", extra={"error": str(e)})
+            await asyncio.sleep(interval)
+
+
+class _SnapshotRaced(Exception):
+    pass
+
+
+def _tag(row_id: int, event: dict) -> dict:
+    event["edge_node"] = EDGE_NODE_ID
+    event["edge_seq"] = row_id
+    event["edge_event_id"] = f"{EDGE_NODE_ID}:{row_id}"
+    return event
+
+
+@guarded
+async def _download_snapshot() -> tuple:
+    return (
+        await campus_state_collection.find({}, {"_id": 0}).to_list(None),
+        await exit_permissions_collection.find({}, {"_id": 0}).to_list(None),
+        await visitors_collection.find().to_list(None),
+        await auth_users_collection.find({}, {"_id": 0}).to_list(None),
+        await token_revocations_collection.find(
+            {"expires_at": {"$gt": datetime.utcnow()}}, {"_id": 0}
+        ).to_list(None),
+    )
+
+
+async def _central_latest(identifiers: List[str]) -> Dict[str, dict]:
+    latest = {}
+    async for row in access_logs_collection.aggregate([
+        {"$match": {"identifier": {"$in": identifiers}}},
+        {"$sort": {"identifier": 1, "timestamp": -1}},
+        {"$group": {"_id": "$identifier", "latest": {"$first": "$$ROOT"}}},
+    ]):
+        latest[row["_id"]] = row["latest"]
+    return latest
+
+
+def _conflict_kind(event: dict, latest: Optional[dict]) -> Optional[str]:
+    if latest is None:
+        return None
+    if latest["timestamp"] > event["timestamp"]:
+        # e.g. another gate already recorded a later scan
+        return "stale_event"
+    if latest["direction"] == event["direction"]:
+        # e.g. the same student scanned out at two gates
+        return "duplicate_direction"
+    return None
+
+
+def _already_applied(event: dict, latest: Optional[dict]) -> bool:
+    # A replayed batch finds its own later events upstream; they are
+    # logged only after their derived writes, so those are in as well
+    return (
+        latest is not None
+        and latest.get("edge_node") == event["edge_node"]
+        and latest.get("edge_seq", 0) >= event["edge_seq"]
+    )
+
+
+@guarded
+async def _apply_upstream(events: List[dict]) -> int:
+    """
+    Write one batch of edge events to the central DB.
+    Returns the number of conflicts recorded.
+    """
+    synced_at = datetime.utcnow()
+    for event in events:
+        # Lets the presence refresh find events timestamped long ago
+        event["synced_at"] = synced_at
+    latest = await _central_latest(list({event["identifier"] for event in events}))
+    # The gate checked each event with the rules it had then; re-check
+    # them under the central rules, each as of its own timestamp
+    decisions = get_policy_engine().evaluate_batch(events, latest)
+
+    log_events = {"access_logs": [], "student": [], "visitor": []}
+    state_ops = []
+    visitors_moved = False
+    permission_ops = []
+    visitor_ops = []
+    conflict_ops = []
+
+    for event, decision in zip(events, decisions):
+        log_events["access_logs"].append(event)
+        log_events[event["user_type"]].append(event)
+
+        current = latest.get(event["identifier"])
+        if _already_applied(event, current):
+            continue
+
+        kind = _conflict_kind(event, current)
+        if kind:
+            conflict_ops.append(_conflict_op(kind, event, current))
+            # Logged, but the central derived state stands. A stale event
+            # also must not become the identifier's latest
+            if kind == "stale_event":
+                continue
+        else:
+            if not decision.allowed:
+                # The person did pass the gate, so the state follows the
+                # event; the rejection is recorded for review
+                conflict_ops.append(_conflict_op("policy_rejected", event, current, error=decision.error))
+            state_ops.append(state_op_for_event(event))
+            visitors_moved |= event["user_type"] == "visitor"
+            permission_ops.extend(permission_ops_for_event(event))
+            visitor_ops.extend(visitor_ops_for_event(event))
+
+        latest[event["identifier"]] = event
+
+    # Derived writes first, logs last: a replay infers what was applied
+    # from the node's events in access_logs, so they must only exist
+    # once everything derived from them is in. Every write here is
+    # idempotent, so a batch that failed part way is simply replayed.
+    # Ordered: an identifier can appear more than once in a batch
+    if state_ops:
+        await campus_state_collection.bulk_write(state_ops, ordered=True)
+        await InvalidationBus.publish("campus_state")
+    if visitors_moved:
+        # The plate index is built from visitors' campus_state
+        await InvalidationBus.publish("vehicles")
+    if permission_ops:
+        await exit_permissions_collection.bulk_write(permission_ops, ordered=True)
+    if visitor_ops:
+        await visitors_collection.bulk_write(visitor_ops, ordered=True)
+    if conflict_ops:
+        await sync_conflicts_collection.bulk_write(conflict_ops, ordered=False)
+
+    # The per-type logs before access_logs, which marks the batch applied
+    if log_events["student"]:
+        await _write_logs(student_logs_collection, log_events["student"])
+        await InvalidationBus.publish("student_logs")
+    if log_events["visitor"]:
+        await _write_logs(visitor_logs_collection, log_events["visitor"])
+        await InvalidationBus.publish("visitor_logs")
+    if log_events["access_logs"]:
+        await _write_logs(access_logs_collection, log_events["access_logs"])
+
+    return len(conflict_ops)
+
+
+def _conflict_op(kind: str, event: dict, current: Optional[dict], **details) -> UpdateOne:
+    key = {"edge_event_id": event["edge_event_id"]}
+    return UpdateOne(key, {"$setOnInsert": {
+        **key,
+        "kind": kind,
+        "user_type": event["user_type"],
+        "identifier": event["identifier"],
+        "event": event,
+        "central_latest": current,
+        "detected_at": datetime.utcnow(),
+        **details,
+    }}, upsert=True)
+
+
+async def _write_logs(collection, events: List[dict]) -> None:
+    if not LOG_TIMESERIES:
+        await collection.bulk_write([
+            UpdateOne({"edge_event_id": event["edge_event_id"]}, {"$setOnInsert": event}, upsert=True)
+            for event in events
+        ], ordered=False)
+        return
+
+    # Time-series collections take neither upserts nor unique indexes, so
+    # skip events an earlier attempt already pushed. Batches from one
+    # node are pushed one at a time, so nothing races this check
+    pushed = {
+        doc["edge_event_id"] async for doc in collection.find(
+            {"edge_event_id": {"$in": [event["edge_event_id"] for event in events]}},
+            {"_id": 0, "edge_event_id": 1}
+        )
+    }
+    fresh = [with_meta(event) for event in events if event["edge_event_id"] not in pushed]
+    if fresh:
+        await collection.insert_many(fresh, ordered=False)
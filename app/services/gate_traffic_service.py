@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from app.core.log import get_logger
+
+# Workers on this host share their counters through this directory
+GATE_STATS_DIR = os.getenv(
+    "GATE_STATS_DIR", os.path.join(tempfile.gettempdir(), "campus-gate-stats")
+)
+# How often each worker writes its counters there (0 keeps them local)
+GATE_STATS_FLUSH_SECONDS = float(os.getenv("GATE_STATS_FLUSH_SECONDS", "2"))
+
+# One-second slots covering the longest rate window
+_WINDOW = 900
+_RATES = {"1m": 60, "5m": 300, "15m": 900}
+
+Key = Tuple[int, str, str]
+
+logger = get_logger("gate_traffic")
+
+
+class _Ring:
+    """
+    Per-second scan counts for the last _WINDOW seconds. A slot is
+    reset when a new second lands on it, so nothing is ever shifted.
+    """
+
+    __slots__ = ("counts", "stamps")
+
+    def __init__(self):
+        self.counts = [0] * _WINDOW
+        self.stamps = [0] * _WINDOW
+
+    def add(self, second: int) -> None:
+        i = second % _WINDOW
+        if self.stamps[i] != second:
+            self.stamps[i] = second
+            self.counts[i] = 0
+        self.counts[i] += 1
+
+    def recent(self, now: int) -> List[List[int]]:
+        oldest = now - _WINDOW
+        return [
+            [stamp, count] for stamp, count in zip(self.stamps, self.counts)
+            if stamp > oldest and count
+        ]
+
+
+class GateTraffic:
+    """
+    Live scans per minute per gate over 1/5/15 minutes, kept in memory
+    as a ring buffer per (gate_number, direction, user_type) and fed by
+    every logged access event.
+
+    Each worker periodically writes its recent counts to a file in
+    GATE_STATS_DIR; a snapshot adds up the files of the other workers
+    on this host, so no database is involved.
+    """
+
+    _rings: Dict[Key, _Ring] = {}
+    _dirty = False
+
+    @classmethod
+    def record(cls, *, gate_number: int, direction: str, user_type: str) -> None:
+        key = (gate_number, direction, user_type)
+        ring = cls._rings.get(key)
+        if ring is None:
+            ring = cls._rings[key] = _Ring()
+        ring.add(int(time.time()))
+        cls._dirty = True
+
+    @classmethod
+    def _local(cls, now: int) -> Dict[str, List[List[int]]]:
+        return {
+            f"{gate}|{direction}|{user_type}": ring.recent(now)
+            for (gate, direction, user_type), ring in list(cls._rings.items())
+        }
+
+    @classmethod
+    def _path(cls) -> str:
+        return os.path.join(GATE_STATS_DIR, f"{os.getpid()}.json")
+
+    @classmethod
+    def flush(cls) -> None:
+        """
+        Write this worker's recent counts for the other workers.
+        """
+        if not cls._dirty:
+            return
+        cls._dirty = False
+        os.makedirs(GATE_STATS_DIR, exist_ok=True)
+        path = cls._path()
+        # Replaced atomically, so readers never see half a file
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(cls._local(int(time.time())), f)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def _others(cls, now: int) -> List[Dict[str, List[List[int]]]]:
+        if GATE_STATS_FLUSH_SECONDS <= 0 or not os.path.isdir(GATE_STATS_DIR):
+            return []
+        own = os.path.basename(cls._path())
+        found = []
+        for name in os.listdir(GATE_STATS_DIR):
+            if name == own or not name.endswith(".json"):
+                continue
+            path = os.path.join(GATE_STATS_DIR, name)
+            try:
+                if os.path.getmtime(path) < now - _WINDOW:
+                    # A worker gone for longer than the window
+                    os.remove(path)
+                    continue
+                with open(path) as f:
+                    found.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return found
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """
+        Scans per minute over the last 1, 5 and 15 minutes, per gate and
+        per direction/user type, summed over the workers on this host.
+        `pressure` is the 1-minute rate over the 15-minute one: above 1
+        the gate is busier than it has been.
+        """
+        now = int(time.time())
+        sources = [cls._local(now)] + cls._others(now)
+
+        totals: Dict[str, Dict[str, int]] = {}
+        for source in sources:
+            for key, slots in source.items():
+                counts = totals.setdefault(key, dict.fromkeys(_RATES, 0))
+                for stamp, count in slots:
+                    age = now - stamp
+                    for label, seconds in _RATES.items():
+                        if age < seconds:
+                            counts[label] += count
+
+        gates: Dict[int, dict] = {}
+        for key, counts in totals.items():
+            gate, direction, user_type = key.split("|")
+            rates = {label: _per_minute(counts[label], seconds) for label, seconds in _RATES.items()}
+            entry = gates.setdefault(int(gate), {
+                "gate_number": int(gate),
+                "scans_per_minute": dict.fromkeys(_RATES, 0.0),
+                "by_type": {},
+            })
+            entry["by_type"][f"{user_type}_{direction}"] = rates
+            if direction.endswith("_duplicate"):
+                # Debounced repeats are shown but aren't extra people
+                continue
+            for label in _RATES:
+                entry["scans_per_minute"][label] += counts[label] / (_RATES[label] / 60)
+
+        for entry in gates.values():
+            rates = entry["scans_per_minute"]
+            entry["pressure"] = round(rates["1m"] / rates["15m"], 2) if rates["15m"] else None
+            entry["scans_per_minute"] = {label: round(rate, 2) for label, rate in rates.items()}
+
+        return {
+            "at": now,
+            "workers": len(sources),
+            "gates": sorted(gates.values(), key=lambda entry: entry["gate_number"]),
+        }
+
+    @classmethod
+    async def flush_forever(cls, interval: float = GATE_STATS_FLUSH_SECONDS) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(cls.flush)
+            except OSError as e:
+                logger.warning("Gate stats flush failed", extra={"error": str(e)})
+
+
+def _per_minute(count: int, seconds: int) -> float:
+    return round(count / (seconds / 60), 2)
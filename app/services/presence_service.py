@@ -0,0 +1,356 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import DeleteMany, ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.database.breaker import guarded
+from app.core.database.client import batch_deadline
+from app.core.database.routing import for_dashboard
+from app.core.database.collections import (
+    access_logs_collection,
+    sessions_collection,
+    session_checkpoints_collection,
+)
+from app.core.log import get_logger
+
+logger = get_logger("presence")
+
+PRESENCE_REFRESH_SECONDS = int(os.getenv("PRESENCE_REFRESH_SECONDS", "10"))
+PRESENCE_MAX_WINDOW_DAYS = int(os.getenv("PRESENCE_MAX_WINDOW_DAYS", "31"))
+
+# Logs written by other workers can carry a timestamp a little older
+# than ones already processed; re-reading is harmless
+_OVERLAP = timedelta(seconds=60)
+_CHECKPOINT_ID = "presence"
+_CHUNK = 500
+_BACKFILL_BATCH = 5000
+
+# The direction that opens a session: visitors are tracked while
+# inside, students (inside unless they logged an exit) while outside
+_OPENS = {"visitor": "entry", "student": "exit"}
+
+_PROJECTION = {
+    "_id": 1,
+    "user_type": 1,
+    "identifier": 1,
+    "direction": 1,
+    "name": 1,
+    "phone_number": 1,
+    "gate_number": 1,
+    "purpose": 1,
+    "number_of_visitors": 1,
+    "vehicle_number": 1,
+    "timestamp": 1,
+}
+
+
+def _day(value: datetime) -> int:
+    return (value - datetime(1970, 1, 1)).days
+
+
+def sessions_for(user_type: str, events: List[dict]) -> List[dict]:
+    """
+    Fold one identifier's events (in time order) into sessions. An
+    opening event while a session is open, or a closing one while none
+    is, doesn't change anything, as for campus_state.
+    """
+    opens = _OPENS[user_type]
+    intervals = []
+    current: Optional[dict] = None
+
+    for event in events:
+        if event["direction"] == opens:
+            if current is None:
+                current = {
+                    # The opening log's _id, so a recompute replaces it
+                    "_id": event["_id"],
+                    "user_type": user_type,
+                    "identifier": event["identifier"],
+                    "name": event.get("name"),
+                    "phone_number": event.get("phone_number"),
+                    # Exit purpose for students; visitor group details
+                    "purpose": event.get("purpose"),
+                    "number_of_visitors": event.get("number_of_visitors"),
+                    "vehicle_number": event.get("vehicle_number"),
+                    "started_at": event["timestamp"],
+                    "start_gate": event.get("gate_number"),
+                    "ended_at": None,
+                    "end_gate": None,
+                    "duration_seconds": None,
+                }
+                intervals.append(current)
+        elif current is not None:
+            current["ended_at"] = event["timestamp"]
+            current["end_gate"] = event.get("gate_number")
+            current["duration_seconds"] = (event["timestamp"] - current["started_at"]).total_seconds()
+            # Days the session touches: a stabbing query at T only has
+            # to look at the sessions bucketed under T's day
+            current["days"] = list(range(_day(current["started_at"]), _day(event["timestamp"]) + 1))
+            current = None
+
+    return intervals
+
+
+class PresenceService:
+    """
+    Maintains `sessions`, the [start, end) visits derived from
+    access_logs: visitors while inside, students while outside (they
+    are inside otherwise), and answers point-in-time queries from it.
+
+    Closed sessions are bucketed by the days they touch and open ones
+    are few, so a query at any time reads only that day's sessions.
+    New logs are folded in incrementally by one worker every
+    PRESENCE_REFRESH_SECONDS.
+    """
+
+    async def at(self, when: datetime, user_type: Optional[str] = None) -> dict:
+        """
+        Visitors inside and students outside at `when`.
+        """
+        query = {
+            "started_at": {"$lte": when},
+            "$or": [
+                {"days": _day(when), "ended_at": {"$gt": when}},
+                {"ended_at": None},
+            ],
+        }
+        return await self._find(query, user_type, at=when)
+
+    async def during(self, start: datetime, end: datetime, user_type: Optional[str] = None) -> dict:
+        """
+        Visitors inside and students outside at any time in [start, end).
+        """
+        if end <= start:
+            raise ValueError("end must be after start")
+        if (end - start).days >= PRESENCE_MAX_WINDOW_DAYS:
+            raise ValueError(f"Window is limited to {PRESENCE_MAX_WINDOW_DAYS} days")
+
+        query = {
+            "started_at": {"$lt": end},
+            "$or": [
+                {
+                    "days": {"$in": list(range(_day(start), _day(end) + 1))},
+                    "ended_at": {"$gt": start},
+                },
+                {"ended_at": None},
+            ],
+        }
+        return await self._find(query, user_type, start=start, end=end)
+
+    @guarded
+    async def _find(self, query: dict, user_type: Optional[str], **bounds) -> dict:
+        if user_type is not None:
+            query["user_type"] = user_type
+
+        checkpoint, intervals = await asyncio.gather(
+            # Same node for both, so indexed_through matches what is read
+            for_dashboard(session_checkpoints_collection).find_one(
+                {"_id": _CHECKPOINT_ID}, {"indexed_through": 1}
+            ),
+            for_dashboard(sessions_collection).find(query, {"days": 0, "written_at": 0}).sort(
+                "started_at", 1
+            ).to_list(None),
+        )
+        for interval in intervals:
+            interval["_id"] = str(interval["_id"])
+
+        return {
+            **bounds,
+            # Logs written after this aren't reflected yet
+            "indexed_through": (checkpoint or {}).get("indexed_through"),
+            "visitors_inside": [i for i in intervals if i["user_type"] == "visitor"],
+            "students_outside": [i for i in intervals if i["user_type"] == "student"],
+        }
+
+    @guarded
+    async def refresh(self) -> dict:
+        """
+        Fold logs written since the last refresh into the index. Each
+        touched identifier's open session (and any session a late
+        edge event falls into) is recomputed from its logs.
+
+        New logs are found by their indexed timestamp; edge events,
+        which can arrive long after it, by when they were synced.
+        """
+        checkpoint = await session_checkpoints_collection.find_one({"_id": _CHECKPOINT_ID}) or {}
+        if "indexed_through" not in checkpoint:
+            return await self.rebuild()
+
+        since = checkpoint["indexed_through"] - _OVERLAP
+        started = datetime.utcnow()
+
+        earliest: Dict[Tuple[str, str], datetime] = {}
+        with batch_deadline():
+            async for event in access_logs_collection.find(
+                {"$or": [{"timestamp": {"$gt": since}}, {"synced_at": {"$gt": since}}]},
+                {"_id": 0, "user_type": 1, "identifier": 1, "timestamp": 1}
+            ):
+                key = (event["user_type"], event["identifier"])
+                if key not in earliest or event["timestamp"] < earliest[key]:
+                    earliest[key] = event["timestamp"]
+
+            keys = list(earliest)
+            written = 0
+            for i in range(0, len(keys), _CHUNK):
+                written += await _recompute({key: earliest[key] for key in keys[i:i + _CHUNK]})
+
+        await _checkpoint(started)
+        return {"identifiers": len(keys), "sessions": written}
+
+    @guarded
+    async def rebuild(self) -> dict:
+        """
+        Backfill: derive every session from the full log in one scan.
+        Each batch is written while the next one is being read.
+
+        Sessions are replaced in place and the ones no log produced
+        again are pruned at the end, so queries keep seeing the old
+        index until then rather than an empty one.
+        """
+        started = datetime.utcnow()
+        written = 0
+        pending: Optional[asyncio.Task] = None
+        ops = []
+
+        async def flush(batch: list) -> None:
+            nonlocal pending, written
+            if pending is not None:
+                await pending
+            written += len(batch)
+            pending = asyncio.create_task(
+                sessions_collection.bulk_write(_upserts(batch, started), ordered=False)
+            )
+
+        with batch_deadline():
+            # (identifier -1, timestamp 1) walks the (identifier 1,
+            # timestamp -1) index backwards, so there is no sort stage
+            cursor = access_logs_collection.find({}, _PROJECTION, batch_size=_BACKFILL_BATCH).sort(
+                [("identifier", -1), ("timestamp", 1)]
+            )
+            events: List[dict] = []
+            async for event in cursor:
+                if events and (event["identifier"], event["user_type"]) != (
+                    events[0]["identifier"], events[0]["user_type"]
+                ):
+                    ops.extend(sessions_for(events[0]["user_type"], events))
+                    events = []
+                    if len(ops) >= _BACKFILL_BATCH:
+                        await flush(ops)
+                        ops = []
+                events.append(event)
+            if events:
+                ops.extend(sessions_for(events[0]["user_type"], events))
+            if ops:
+                await flush(ops)
+            if pending is not None:
+                await pending
+            # Whatever neither this scan nor a refresh since rewrote is gone
+            await sessions_collection.delete_many({"written_at": {"$not": {"$gte": started}}})
+
+        # Logs written during the scan are picked up by the next refresh
+        await _checkpoint(started)
+        seconds = (datetime.utcnow() - started).total_seconds()
+        return {
+            "sessions": written,
+            "seconds": round(seconds, 3),
+            "sessions_per_second": round(written / seconds) if seconds else written,
+        }
+
+    async def run_forever(self, interval: int = PRESENCE_REFRESH_SECONDS) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # Only one worker refreshes per interval
+                if await _claim(interval):
+                    await self.refresh()
+            except Exception:
+                logger.exception("Session refresh failed")
+
+
+def _upserts(intervals: List[dict], written_at: datetime) -> list:
+    # written_at tells a rebuild which sessions are current
+    return [
+        ReplaceOne({"_id": i["_id"]}, {**i, "written_at": written_at}, upsert=True)
+        for i in intervals
+    ]
+
+
+async def _recompute(earliest: Dict[Tuple[str, str], datetime]) -> int:
+    """
+    Recompute the sessions of these identifiers from the given time
+    on. Sessions still open or ending at/after it are replaced, so the
+    replay starts at the earliest of those.
+    """
+    replay_from = dict(earliest)
+    async for interval in sessions_collection.find(
+        {
+            "identifier": {"$in": [identifier for _, identifier in earliest]},
+            "$or": [{"ended_at": None}, {"ended_at": {"$gte": min(earliest.values())}}],
+        },
+        {"user_type": 1, "identifier": 1, "started_at": 1, "ended_at": 1}
+    ):
+        key = (interval["user_type"], interval["identifier"])
+        since = earliest.get(key)
+        if since is None or (interval["ended_at"] is not None and interval["ended_at"] < since):
+            continue
+        replay_from[key] = min(replay_from[key], interval["started_at"])
+
+    events: Dict[Tuple[str, str], List[dict]] = {key: [] for key in earliest}
+    async for event in access_logs_collection.find(
+        {"$or": [
+            {"user_type": user_type, "identifier": identifier, "timestamp": {"$gte": since}}
+            for (user_type, identifier), since in replay_from.items()
+        ]},
+        _PROJECTION
+    ).sort([("timestamp", 1), ("_id", 1)]):
+        events[(event["user_type"], event["identifier"])].append(event)
+
+    ops = []
+    written_at = datetime.utcnow()
+    for (user_type, identifier), since in earliest.items():
+        fresh = sessions_for(user_type, events[(user_type, identifier)])
+        ops.extend(_upserts(fresh, written_at))
+        # Whatever the replay didn't produce again is gone
+        ops.append(DeleteMany({
+            "user_type": user_type,
+            "identifier": identifier,
+            "_id": {"$nin": [i["_id"] for i in fresh]},
+            "$or": [{"ended_at": None}, {"ended_at": {"$gte": since}}],
+        }))
+
+    if ops:
+        await sessions_collection.bulk_write(ops, ordered=False)
+    return len(ops) - len(earliest)
+
+
+async def _checkpoint(indexed_through: datetime) -> None:
+    await session_checkpoints_collection.update_one(
+        {"_id": _CHECKPOINT_ID},
+        {"$set": {"indexed_through": indexed_through}},
+        upsert=True
+    )
+
+
+@guarded
+async def _claim(interval: int) -> bool:
+    now = datetime.utcnow()
+    try:
+        claimed = await session_checkpoints_collection.find_one_and_update(
+            {
+                "_id": _CHECKPOINT_ID,
+                "$or": [
+                    {"locked_until": {"$exists": False}},
+                    {"locked_until": {"$lt": now}},
+                ],
+            },
+            {"$set": {"locked_until": now + timedelta(seconds=interval)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Another worker holds the lock
+        return False
+    return claimed is not None
@@ -0,0 +1,318 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.database.breaker import guarded
+from app.core.database.client import batch_deadline
+from app.core.database.collections import (
+    access_logs_collection,
+    campus_state_collection,
+    exit_permissions_collection,
+    visitors_collection,
+    reconcile_checkpoints_collection,
+)
+from app.core.database.invalidation import InvalidationBus
+from app.services.campus_state_rebuild_service import state_op_for_event
+from app.core.log import get_logger
+
+logger = get_logger("reconcile")
+
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("RECONCILE_INTERVAL_SECONDS", "300"))
+RECONCILE_AUTO_REPAIR = os.getenv("RECONCILE_AUTO_REPAIR", "false").lower() == "true"
+# A scan writes its state and its log one after the other, so records
+# touched this recently may just be mid-scan and are left for next run
+RECONCILE_SETTLE_SECONDS = int(os.getenv("RECONCILE_SETTLE_SECONDS", "30"))
+
+_SETTLE = timedelta(seconds=RECONCILE_SETTLE_SECONDS)
+# Re-check a little before the last checkpoint so writes that were in
+# flight when it was taken, or still settling, are not skipped
+_OVERLAP = timedelta(seconds=60) + _SETTLE
+_CHECKPOINT_ID = "campus_state"
+
+
+class ReconcileService:
+    """
+    Finds drift between campus_state / exit_permissions / visitors and
+    the latest access log of each identifier.
+
+    Only identifiers with log or state writes since the last checkpoint
+    are checked, and the join runs as a single aggregation.
+    """
+
+    @guarded
+    async def execute(
+        self,
+        *,
+        repair: bool = False,
+        since: Optional[datetime] = None
+    ) -> dict:
+        started = datetime.utcnow()
+
+        if since is None:
+            checkpoint = await reconcile_checkpoints_collection.find_one(
+                {"_id": _CHECKPOINT_ID}
+            )
+            last_run = checkpoint.get("last_run") if checkpoint else None
+            since = last_run - _OVERLAP if last_run else datetime(1970, 1, 1)
+
+        checked = 0
+        drift: List[dict] = []
+        settled_before = started - _SETTLE
+        with batch_deadline():
+            async for row in access_logs_collection.aggregate(_pipeline(since)):
+                if _last_touched(row) > settled_before:
+                    continue
+                checked += 1
+                drift.extend(_find_drift(row))
+
+            repaired = await _repair(drift) if repair else 0
+
+        await reconcile_checkpoints_collection.update_one(
+            {"_id": _CHECKPOINT_ID},
+            {"$set": {"last_run": started}},
+            upsert=True
+        )
+
+        return {
+            "since": since,
+            "checked": checked,
+            "drift": [_describe(item) for item in drift],
+            "repaired": repaired,
+        }
+
+    async def run_forever(
+        self,
+        interval: int = RECONCILE_INTERVAL_SECONDS,
+        repair: bool = RECONCILE_AUTO_REPAIR
+    ) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # Only one worker reconciles per interval
+                if await _claim(interval):
+                    result = await self.execute(repair=repair)
+                    if result["drift"]:
+                        logger.warning(
+                            "Reconciler found drifted records",
+                            extra={"drifted": len(result["drift"]), "repaired": result["repaired"]},
+                        )
+            except Exception:
+                logger.exception("Reconcile run failed")
+
+
+def _pipeline(since: datetime) -> list:
+    touched = {"_id": 0, "user_type": 1, "identifier": 1}
+    return [
+        {"$match": {"timestamp": {"$gte": since}}},
+        {"$project": touched},
+        # A crash between the state write and the log write leaves only
+        # the state touched, so pick those identifiers up too
+        {"$unionWith": {
+            "coll": "campus_state",
+            "pipeline": [
+                {"$match": {"$or": [
+                    {"last_entry_time": {"$gte": since}},
+                    {"last_exit_time": {"$gte": since}},
+                ]}},
+                {"$project": touched},
+            ],
+        }},
+        {"$group": {"_id": {"user_type": "$user_type", "identifier": "$identifier"}}},
+        # A student and a visitor could share an identifier
+        {"$lookup": {
+            "from": "access_logs",
+            "localField": "_id.identifier",
+            "foreignField": "identifier",
+            "let": {"user_type": "$_id.user_type"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$user_type", "$$user_type"]}}},
+                {"$sort": {"timestamp": -1}},
+                {"$limit": 1},
+                {"$project": {"_id": 0}},
+            ],
+            "as": "latest",
+        }},
+        {"$lookup": {
+            "from": "campus_state",
+            "localField": "_id.identifier",
+            "foreignField": "identifier",
+            "let": {"user_type": "$_id.user_type"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$user_type", "$$user_type"]}}},
+                {"$project": {
+                    "_id": 0, "user_type": 1, "is_inside": 1,
+                    "last_entry_time": 1, "last_exit_time": 1,
+                }},
+            ],
+            "as": "state",
+        }},
+        {"$lookup": {
+            "from": "exit_permissions",
+            "localField": "_id.identifier",
+            "foreignField": "student_roll",
+            "pipeline": [{"$limit": 1}, {"$project": {"_id": 1}}],
+            "as": "permission",
+        }},
+        {"$addFields": {"visitor_oid": {"$convert": {
+            "input": "$_id.identifier", "to": "objectId", "onError": None, "onNull": None,
+        }}}},
+        {"$lookup": {
+            "from": "visitors",
+            "localField": "visitor_oid",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"_id": 1}}],
+            "as": "visitor",
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_type": "$_id.user_type",
+            "identifier": "$_id.identifier",
+            "latest": {"$first": "$latest"},
+            "state": {"$first": "$state"},
+            "has_permission": {"$gt": [{"$size": "$permission"}, 0]},
+            "has_visitor": {"$gt": [{"$size": "$visitor"}, 0]},
+        }},
+    ]
+
+
+def _last_touched(row: dict) -> datetime:
+    times = [datetime.min]
+    if row.get("latest"):
+        times.append(row["latest"]["timestamp"])
+    if row.get("state"):
+        times.extend(row["state"].get(field) or datetime.min for field in ("last_entry_time", "last_exit_time"))
+    return max(times)
+
+
+def _find_drift(row: dict) -> List[dict]:
+    latest = row.get("latest")
+    state = row.get("state")
+    found = []
+
+    def add(kind: str):
+        found.append({"kind": kind, **row})
+
+    if latest is None:
+        add("state_without_logs")
+        return found
+
+    is_entry = latest["direction"] == "entry"
+
+    if row["user_type"] == "student":
+        # Students inside have no campus_state record
+        expected_state = None if is_entry else False
+        actual_state = state.get("is_inside") if state else None
+        if actual_state != expected_state:
+            add("state_mismatch")
+        if is_entry and row["has_permission"]:
+            add("stale_exit_permission")
+        if not is_entry and not row["has_permission"]:
+            add("missing_exit_permission")
+    else:
+        # Visitors outside have no campus_state record
+        expected_state = True if is_entry else None
+        actual_state = state.get("is_inside") if state else None
+        if actual_state != expected_state:
+            add("state_mismatch")
+        if is_entry and not row["has_visitor"]:
+            add("missing_visitor_record")
+        if not is_entry and row["has_visitor"]:
+            add("stale_visitor_record")
+
+    return found
+
+
+async def _repair(drift: List[dict]) -> int:
+    """
+    Bring the derived collections back in line with the latest log.
+    Exit logs carry the permission's purpose and return time, so a
+    missing exit permission is recreated from them; logs from before
+    they did are only reported.
+    """
+    repaired = 0
+    state_ops = []
+
+    for item in drift:
+        kind = item["kind"]
+        latest = item.get("latest")
+
+        if kind == "state_mismatch":
+            state_ops.append(state_op_for_event(latest))
+        elif kind == "missing_exit_permission" and latest.get("allowed_until"):
+            await exit_permissions_collection.update_one(
+                {"student_roll": item["identifier"]},
+                {"$setOnInsert": {
+                    "student_roll": item["identifier"],
+                    "purpose": latest.get("purpose"),
+                    "allowed_until": latest.get("allowed_until"),
+                }},
+                upsert=True
+            )
+            repaired += 1
+        elif kind == "stale_exit_permission":
+            await exit_permissions_collection.delete_many({"student_roll": item["identifier"]})
+            repaired += 1
+        elif kind == "stale_visitor_record":
+            await visitors_collection.delete_one({"_id": ObjectId(item["identifier"])})
+            repaired += 1
+        elif kind == "missing_visitor_record" and ObjectId.is_valid(item["identifier"]):
+            await visitors_collection.update_one(
+                {"_id": ObjectId(item["identifier"])},
+                {"$setOnInsert": {
+                    "name": latest.get("name"),
+                    "phone_number": latest.get("phone_number"),
+                    "number_of_visitors": latest.get("number_of_visitors"),
+                    "vehicle_number": latest.get("vehicle_number"),
+                    "entered_at": latest["timestamp"],
+                }},
+                upsert=True
+            )
+            repaired += 1
+
+    if state_ops:
+        await campus_state_collection.bulk_write(state_ops, ordered=False)
+        repaired += len(state_ops)
+        await InvalidationBus.publish("campus_state")
+        await InvalidationBus.publish("vehicles")
+
+    return repaired
+
+
+@guarded
+async def _claim(interval: int) -> bool:
+    now = datetime.utcnow()
+    try:
+        claimed = await reconcile_checkpoints_collection.find_one_and_update(
+            {
+                "_id": _CHECKPOINT_ID,
+                "$or": [
+                    {"locked_until": {"$exists": False}},
+                    {"locked_until": {"$lt": now}},
+                ],
+            },
+            {"$set": {"locked_until": now + timedelta(seconds=interval)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Another worker holds the lock
+        return False
+    return claimed is not None
+
+
+def _describe(item: dict) -> dict:
+    latest = item.get("latest") or {}
+    state = item.get("state") or {}
+    return {
+        "kind": item["kind"],
+        "user_type": item["user_type"],
+        "identifier": item["identifier"],
+        "latest_direction": latest.get("direction"),
+        "latest_at": latest.get("timestamp"),
+        "is_inside": state.get("is_inside"),
+    }
@@ -0,0 +1,138 @@
+import asyncio
+import calendar
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.core.database.invalidation import InvalidationBus
+from app.core.log import get_logger
+from app.core.security import ACCESS_TOKEN_EXPIRE_MINUTES
+from app.repositories.factory import get_repositories
+
+REVOCATION_REFRESH_SECONDS = int(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+
+# Re-read a little before the watermark so entries written by another
+# worker with a slightly earlier clock are not missed
+_OVERLAP = timedelta(seconds=5)
+
+logger = get_logger("revocations")
+
+
+def _millis(value: datetime) -> int:
+    # Milliseconds since the epoch: the precision MongoDB stores
+    return calendar.timegm(value.utctimetuple()) * 1000 + value.microsecond // 1000
+
+
+class RevocationService:
+    """
+    Denylist of revoked tokens (by jti) and users (every token issued up
+    to the revocation), checked on every authenticated request. A user
+    revocation covers tokens whose iat is at or before it, compared in
+    milliseconds: one issued in the same millisecond counts as revoked.
+
+    Kept in memory as two dicts so the check is a pair of hash lookups
+    with no I/O. Loaded at startup, then refreshed incrementally from
+    entries revoked since the last refresh: at once on the "revocations"
+    topic, and every REVOCATION_REFRESH_SECONDS as a backstop. Entries
+    are dropped once every token they cover has expired.
+    """
+
+    # jti -> expires_at
+    _tokens: Dict[str, datetime] = {}
+    # username -> (revoked_at as epoch milliseconds, expires_at)
+    _users: Dict[str, tuple] = {}
+    _loaded_at: Optional[datetime] = None
+
+    @classmethod
+    def is_revoked(cls, payload: dict) -> bool:
+        if payload.get("jti") in cls._tokens:
+            return True
+        user = cls._users.get(payload.get("username"))
+        # Tokens from before jti/iat were added have no iat: covered too
+        return user is not None and round(payload.get("iat", 0) * 1000) <= user[0]
+
+    @classmethod
+    async def revoke_token(cls, *, jti: str, expires_at: datetime) -> None:
+        now = datetime.utcnow()
+        await get_repositories().revocations.add(
+            key=f"jti:{jti}", revoked_at=now, expires_at=expires_at
+        )
+        cls._tokens[jti] = expires_at
+        await InvalidationBus.publish("revocations")
+
+    @classmethod
+    async def revoke_user(cls, *, username: str) -> None:
+        """
+        Revoke every token issued to `username` so far.
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        await get_repositories().revocations.add(
+            key=f"user:{username}", revoked_at=now, expires_at=expires_at
+        )
+        cls._users[username] = (_millis(now), expires_at)
+        await InvalidationBus.publish("revocations")
+
+    @classmethod
+    async def load(cls) -> None:
+        """
+        Full reload from the store.
+        """
+        started = datetime.utcnow()
+        entries = await get_repositories().revocations.list_since(since=None, now=started)
+        tokens: Dict[str, datetime] = {}
+        users: Dict[str, tuple] = {}
+        for entry in entries:
+            _apply(entry, tokens, users)
+        cls._tokens = tokens
+        cls._users = users
+        cls._loaded_at = started
+
+    @classmethod
+    async def refresh(cls) -> int:
+        """
+        Apply entries revoked since the last load/refresh and forget
+        expired ones. Returns the number of entries read.
+        """
+        if cls._loaded_at is None:
+            await cls.load()
+            return len(cls._tokens) + len(cls._users)
+
+        started = datetime.utcnow()
+        entries = await get_repositories().revocations.list_since(
+            since=cls._loaded_at - _OVERLAP, now=started
+        )
+        for entry in entries:
+            _apply(entry, cls._tokens, cls._users)
+
+        for jti in [jti for jti, expires_at in cls._tokens.items() if expires_at <= started]:
+            del cls._tokens[jti]
+        for name in [name for name, (_, expires_at) in cls._users.items() if expires_at <= started]:
+            del cls._users[name]
+
+        cls._loaded_at = started
+        return len(entries)
+
+    @classmethod
+    async def refresh_forever(cls, interval: int = REVOCATION_REFRESH_SECONDS) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.refresh()
+            except Exception as e:
+                logger.warning("Revocation refresh failed", extra={"error": str(e)})
+
+    @classmethod
+    def size(cls) -> int:
+        return len(cls._tokens) + len(cls._users)
+
+
+def _apply(entry: dict, tokens: Dict[str, datetime], users: Dict[str, tuple]) -> None:
+    kind, _, value = entry["key"].partition(":")
+    if kind == "jti":
+        tokens[value] = entry["expires_at"]
+    elif kind == "user":
+        revoked_at = _millis(entry["revoked_at"])
+        current = users.get(value)
+        if current is None or revoked_at >= current[0]:
+            users[value] = (revoked_at, entry["expires_at"])
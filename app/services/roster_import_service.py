@@ -0,0 +1,225 @@
+import codecs
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Literal
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+
+from app.domain.Users.student import Student
+from app.core.database.client import batch_deadline
+from app.core.database.collections import students_collection
+from app.core.database.invalidation import InvalidationBus
+
+ImportFormat = Literal["csv", "ndjson"]
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# Longest a quoted CSV field may run on before it counts as unterminated
+MAX_RECORD_LINES = 100
+MAX_RECORD_CHARS = 64 * 1024
+
+
+class RosterImportService:
+    """
+    Streams a CSV / NDJSON roster upload into the students collection.
+
+    Rows are validated with the Student domain constraints and upserted
+    on roll_number in bulk_write batches. Bad rows are reported and
+    skipped; the rest of the import carries on.
+    """
+
+    async def execute(
+        self,
+        chunks: AsyncIterator[bytes],
+        *,
+        format: ImportFormat = "csv"
+    ) -> dict:
+        rows = 0
+        failed = 0
+        upserted = 0
+        modified = 0
+        errors: List[dict] = []
+        batch: List[UpdateOne] = []
+        now = datetime.utcnow()
+
+        async for row_number, row in _iter_rows(chunks, format):
+            rows += 1
+            try:
+                student = _validate(row)
+            except ValueError as e:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"row": row_number, "error": _describe(e)})
+                continue
+
+            batch.append(UpdateOne(
+                {"roll_number": student.roll_number},
+                {
+                    "$set": {
+                        "name": student.name,
+                        "phone_number": student.phone_number,
+                        "updated_at": now,
+                    },
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            ))
+
+            if len(batch) >= BATCH_SIZE:
+                with batch_deadline():
+                    result = await students_collection.bulk_write(batch, ordered=False)
+                upserted += result.upserted_count
+                modified += result.modified_count
+                batch = []
+
+        if batch:
+            with batch_deadline():
+                result = await students_collection.bulk_write(batch, ordered=False)
+            upserted += result.upserted_count
+            modified += result.modified_count
+
+        # Every worker reloads its roster: rows are stamped with the import
+        # start time, which an incremental refresh may already have passed
+        await InvalidationBus.publish("students")
+
+        return {
+            "rows": rows,
+            "inserted": upserted,
+            "updated": modified,
+            "failed": failed,
+            "errors": errors,
+        }
+
+
+async def _iter_rows(chunks: AsyncIterator[bytes], format: ImportFormat) -> AsyncIterator[tuple]:
+    """
+    (row_number, row) for each record of the upload.
+    """
+    row_number = 1
+    if format == "csv":
+        parser = _CsvRows()
+        async for lines in _iter_lines(chunks):
+            for row in parser.feed(lines):
+                yield row_number, row
+                row_number += 1
+        for row in parser.close():
+            yield row_number, row
+            row_number += 1
+    else:
+        async for lines in _iter_lines(chunks):
+            for row in _parse_ndjson(lines):
+                yield row_number, row
+                row_number += 1
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[str]]:
+    """
+    Re-chunk a byte stream into lists of complete lines, each keeping
+    its line ending. Only the trailing partial line is held between
+    chunks.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        text = pending + decoder.decode(chunk)
+        end = text.rfind("\n") + 1
+        pending = text[end:]
+        if end:
+            yield _split(text[:end])
+
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield _split(pending)
+
+
+def _split(text: str) -> List[str]:
+    # Lines end at \n, \r\n or \r, as csv expects, and keep their endings
+    return list(io.StringIO(text, newline=""))
+
+
+class _CsvRows:
+    """
+    Keeps the CSV header across chunks, and holds back lines while a
+    quoted field is open, so a record may span lines and chunks.
+
+    A record still open after MAX_RECORD_LINES lines or MAX_RECORD_CHARS
+    characters has a stray quote: its first line is reported as a bad
+    row and the lines after it are read again from there.
+    """
+
+    def __init__(self):
+        self.header: List[str] = []
+        self.lines: List[str] = []
+        self.size = 0
+        self.quoted = False
+
+    def feed(self, lines: List[str]) -> Iterator:
+        for line in lines:
+            self.lines.append(line)
+            self.size += len(line)
+            # Parity is tracked per line, so a long record isn't rescanned
+            if line.count('"') % 2:
+                self.quoted = not self.quoted
+            if not self.quoted:
+                yield from self._take()
+            elif len(self.lines) > MAX_RECORD_LINES or self.size > MAX_RECORD_CHARS:
+                yield from self._resync()
+
+    def close(self) -> Iterator:
+        while self.quoted:
+            yield from self._resync()
+        if any(line.strip() for line in self.lines):
+            yield from self._take()
+
+    def _take(self) -> Iterator[dict]:
+        record = "".join(self.lines)
+        self.lines, self.size = [], 0
+        # The record is whole, so the reader sees embedded newlines intact
+        for fields in csv.reader([record]):
+            if not fields:
+                continue
+            if not self.header:
+                self.header = [field.strip().lower() for field in fields]
+                continue
+            yield dict(zip(self.header, fields))
+
+    def _resync(self) -> Iterator:
+        rest = self.lines[1:]
+        self.lines, self.size, self.quoted = [], 0, False
+        yield ValueError("Unterminated quoted field")
+        yield from self.feed(rest)
+
+
+def _parse_ndjson(lines: List[str]) -> Iterator:
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f"Invalid JSON: {e}")
+
+
+def _validate(row) -> Student:
+    if isinstance(row, ValueError):
+        # A record the parser could not read
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    return Student(
+        roll_number=str(row.get("roll_number", "")).strip(),
+        name=str(row.get("name", "")).strip(),
+        phone_number=str(row.get("phone_number", "")).strip(),
+    )
+
+
+def _describe(error: ValueError) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+            for err in error.errors()
+        )
+    return str(error)
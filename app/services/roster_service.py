@@ -0,0 +1,226 @@
+import asyncio
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.database.breaker import guarded
+from app.core.database.client import batch_deadline
+from app.core.database.collections import students_collection
+from app.core.log import get_logger
+
+logger = get_logger("roster")
+
+ROSTER_REFRESH_SECONDS = int(os.getenv("ROSTER_REFRESH_SECONDS", "60"))
+# Incremental refreshes can't see deleted students; a full reload this
+# often drops them
+ROSTER_FULL_RELOAD_SECONDS = int(os.getenv("ROSTER_FULL_RELOAD_SECONDS", "3600"))
+# Reject scans while no roster is loaded, rather than accept any roll number
+ROSTER_REQUIRED = os.getenv("ROSTER_REQUIRED", "false").lower() == "true"
+
+# Unchecked scans are logged at most this often
+_UNCHECKED_LOG_SECONDS = 60
+
+_PROJECTION = {
+    "_id": 0,
+    "roll_number": 1,
+    "name": 1,
+    "phone_number": 1,
+    "updated_at": 1,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class StudentRecord:
+    roll_number: str
+    name: str
+    phone_number: str
+
+
+class RosterService:
+    """
+    In-memory index of the students collection, keyed by roll number.
+
+    Loaded once at startup and refreshed incrementally from documents
+    whose `updated_at` is newer than the last refresh, so scans never
+    hit the database to look a student up. Every
+    ROSTER_FULL_RELOAD_SECONDS a refresh is a full reload instead,
+    which drops students deleted since. Documents without a name or
+    phone number are left out (and logged) rather than guessed.
+    """
+
+    _index: Dict[str, StudentRecord] = {}
+    _loaded_at: Optional[datetime] = None
+    _full_at: Optional[datetime] = None
+    _unchecked = 0
+    _unchecked_logged_at: Optional[datetime] = None
+
+    @classmethod
+    def lookup(cls, roll_number: str) -> Optional[StudentRecord]:
+        return cls._index.get(roll_number)
+
+    @classmethod
+    def resolve(
+        cls,
+        *,
+        roll_number: str,
+        name: Optional[str] = None,
+        phone_number: Optional[str] = None
+    ) -> StudentRecord:
+        """
+        Validate a scanned roll number and fill in the student's details.
+        The roster is authoritative: details the guard entered must match
+        it. Without one, the guard's input is used (and the scan logged as
+        unchecked), or rejected under ROSTER_REQUIRED.
+        """
+        record = cls._index.get(roll_number)
+        if record:
+            mismatched = [
+                field for field, entered, known in (
+                    ("name", name, record.name),
+                    ("phone number", phone_number, record.phone_number),
+                )
+                if entered and _normalized(entered) != _normalized(known)
+            ]
+            if mismatched:
+                raise ValueError(
+                    f"Student {roll_number} is on the roster with a different "
+                    f"{' and '.join(mismatched)}"
+                )
+            return record
+
+        if cls._index:
+            raise ValueError(f"Student {roll_number} is not on the roster")
+
+        if ROSTER_REQUIRED:
+            raise ValueError(f"Cannot verify {roll_number}: roster not loaded")
+        cls._log_unchecked(roll_number)
+
+        if not name or not phone_number:
+            raise ValueError(
+                f"Name and phone number are required for {roll_number}: roster not loaded"
+            )
+        return StudentRecord(
+            roll_number=roll_number,
+            name=name,
+            phone_number=phone_number,
+        )
+
+    @classmethod
+    def _log_unchecked(cls, roll_number: str) -> None:
+        cls._unchecked += 1
+        now = datetime.utcnow()
+        if (
+            cls._unchecked_logged_at is None
+            or (now - cls._unchecked_logged_at).total_seconds() >= _UNCHECKED_LOG_SECONDS
+        ):
+            logger.warning(
+                "Roster not loaded, roll numbers accepted unchecked",
+                extra={"unchecked": cls._unchecked, "roll_number": roll_number}
+            )
+            cls._unchecked = 0
+            cls._unchecked_logged_at = now
+
+    @classmethod
+    def is_loaded(cls) -> bool:
+        """
+        True once a roster with at least one student is in memory.
+        Until then roll numbers go unchecked, see resolve().
+        """
+        return bool(cls._index)
+
+    @classmethod
+    def size(cls) -> int:
+        return len(cls._index)
+
+    @classmethod
+    @guarded
+    async def load(cls) -> None:
+        """
+        Full reload of the roster.
+        """
+        started = datetime.utcnow()
+        index: Dict[str, StudentRecord] = {}
+        skipped = []
+        with batch_deadline():
+            async for doc in students_collection.find({}, _PROJECTION):
+                record = _to_record(doc)
+                if record:
+                    index[record.roll_number] = record
+                elif doc.get("roll_number"):
+                    skipped.append(doc["roll_number"])
+
+        _log_skipped(skipped)
+        cls._index = index
+        cls._loaded_at = cls._full_at = started
+
+    @classmethod
+    @guarded
+    async def refresh(cls) -> int:
+        """
+        Apply students changed since the last load/refresh.
+        Returns the number of records updated.
+        """
+        started = datetime.utcnow()
+        if cls._loaded_at is None or (
+            (started - cls._full_at).total_seconds() >= ROSTER_FULL_RELOAD_SECONDS
+        ):
+            await cls.load()
+            return len(cls._index)
+
+        updated = 0
+        skipped = []
+        with batch_deadline():
+            async for doc in students_collection.find(
+                {"updated_at": {"$gte": cls._loaded_at}}, _PROJECTION
+            ):
+                record = _to_record(doc)
+                if record:
+                    cls._index[record.roll_number] = record
+                    updated += 1
+                elif doc.get("roll_number"):
+                    # Edited into an unusable record: stop serving the old one
+                    cls._index.pop(doc["roll_number"], None)
+                    skipped.append(doc["roll_number"])
+
+        _log_skipped(skipped)
+        cls._loaded_at = started
+        return updated
+
+    @classmethod
+    async def refresh_forever(cls, interval: int = ROSTER_REFRESH_SECONDS) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.refresh()
+            except Exception as e:
+                logger.warning("Roster refresh failed", extra={"error": str(e)})
+
+
+def _to_record(doc: dict) -> Optional[StudentRecord]:
+    roll_number = doc.get("roll_number")
+    name = doc.get("name")
+    phone_number = doc.get("phone_number")
+    if not roll_number or not name or not phone_number:
+        return None
+    # Interning keeps one copy of each key shared by the dict and record
+    roll_number = sys.intern(roll_number)
+    return StudentRecord(
+        roll_number=roll_number,
+        name=name,
+        phone_number=phone_number,
+    )
+
+
+def _normalized(value: str) -> str:
+    # Case, spacing and phone number punctuation aren't mismatches
+    return "".join(value.split()).replace("-", "").casefold()
+
+
+def _log_skipped(roll_numbers: List[str]) -> None:
+    if roll_numbers:
+        logger.warning(
+            "Students without a name or phone number left out of the roster",
+            extra={"count": len(roll_numbers), "roll_numbers": roll_numbers[:20]},
+        )
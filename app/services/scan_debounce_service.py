@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Tuple
+
+from app.services.gate_traffic_service import GateTraffic
+
+# Repeats of a scan within this many seconds get the first one's answer
+SCAN_DEBOUNCE_SECONDS = float(os.getenv("SCAN_DEBOUNCE_SECONDS", "5"))
+SCAN_DEBOUNCE_MAX_ENTRIES = int(os.getenv("SCAN_DEBOUNCE_MAX_ENTRIES", "10000"))
+
+# (user_type, identifier, direction)
+Key = Tuple[str, str, str]
+# (expires_at, direction, first scan's response)
+_Entry = Tuple[float, str, asyncio.Future]
+
+
+class ScanDebounce:
+    """
+    Coalesces repeated scans of the same (identifier, direction) within
+    SCAN_DEBOUNCE_SECONDS, such as a double tap or two gates reading one
+    card: the repeat gets the first scan's response, marked
+    `duplicate`, without running the access service again. A repeat
+    arriving while the first is still running waits for it.
+
+    One entry per identifier, replaced by a scan in the other direction
+    (exit then entry is not a repeat). Entries are kept in first-seen
+    order, which is also expiry order, so expired ones are dropped from
+    the front; at most SCAN_DEBOUNCE_MAX_ENTRIES are kept. Per worker: repeats landing on
+    another worker run normally and are caught by the usual checks.
+    """
+
+    _entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+    _saved: Dict[str, int] = {}
+
+    @classmethod
+    async def run(
+        cls,
+        key: Key,
+        gate_number: int,
+        call: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        if SCAN_DEBOUNCE_SECONDS <= 0:
+            return await call()
+
+        user_type, identifier, direction = key
+        who = (user_type, identifier)
+        now = time.monotonic()
+        cls._expire(now)
+
+        entry = cls._entries.get(who)
+        if entry is not None and entry[1] == direction:
+            # Shielded: a client hanging up on the repeat mustn't cancel the first
+            result = await asyncio.shield(entry[2])
+            # None: the first scan failed, so this one is a retry
+            if result is not None:
+                kind = f"{user_type}_{direction}"
+                cls._saved[kind] = cls._saved.get(kind, 0) + 1
+                GateTraffic.record(
+                    gate_number=gate_number, direction=f"{direction}_duplicate", user_type=user_type
+                )
+                return {**result, "duplicate": True}
+
+        future = asyncio.get_running_loop().create_future()
+        cls._entries[who] = (now + SCAN_DEBOUNCE_SECONDS, direction, future)
+        cls._entries.move_to_end(who)
+        while len(cls._entries) > SCAN_DEBOUNCE_MAX_ENTRIES:
+            cls._entries.popitem(last=False)
+
+        try:
+            result = await call()
+        except BaseException:
+            # Errors aren't remembered, so an immediate retry runs
+            if cls._entries.get(who, (None, None, None))[2] is future:
+                del cls._entries[who]
+            future.set_result(None)
+            raise
+        future.set_result(result)
+        return result
+
+    @classmethod
+    def _expire(cls, now: float) -> None:
+        entries = cls._entries
+        while entries:
+            who, (expires_at, _, _) = next(iter(entries.items()))
+            if expires_at > now:
+                break
+            del entries[who]
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "window_seconds": SCAN_DEBOUNCE_SECONDS,
+            "tracked": len(cls._entries),
+            "saved": sum(cls._saved.values()),
+            "saved_by_type": dict(cls._saved),
+            "pid": os.getpid(),
+        }
@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.database.client import batch_deadline
+from app.core.database.collections import sessions_collection
+from app.core.database.routing import for_dashboard
+
+
+class SessionService:
+    """
+    Queries over `sessions` (visits kept up to date by PresenceService):
+    visitors' time inside and students' time outside.
+    """
+
+    async def list(
+        self,
+        *,
+        start: datetime,
+        end: datetime,
+        user_type: Optional[str] = None,
+        identifier: Optional[str] = None,
+        min_seconds: Optional[float] = None,
+        limit: int = 100
+    ) -> List[dict]:
+        """
+        Sessions that started in [start, end), newest first. With
+        `min_seconds`, only finished ones at least that long.
+        """
+        if end <= start:
+            raise ValueError("end must be after start")
+
+        query: dict = {"started_at": {"$gte": start, "$lt": end}}
+        if user_type is not None:
+            query["user_type"] = user_type
+        if identifier is not None:
+            query["identifier"] = identifier
+        if min_seconds is not None:
+            query["duration_seconds"] = {"$gte": min_seconds}
+
+        sessions = await for_dashboard(sessions_collection).find(query, {"days": 0, "written_at": 0}).sort(
+            "started_at", -1
+        ).limit(limit).to_list(None)
+        for session in sessions:
+            session["_id"] = str(session["_id"])
+        return sessions
+
+    async def totals(
+        self,
+        *,
+        start: datetime,
+        end: datetime,
+        user_type: str,
+        identifier: Optional[str] = None,
+        limit: int = 100
+    ) -> List[dict]:
+        """
+        Time per identifier spent in sessions overlapping [start, end),
+        clipped to the window (open sessions count up to now), most
+        time first.
+        """
+        if end <= start:
+            raise ValueError("end must be after start")
+
+        match: dict = {
+            "user_type": user_type,
+            "started_at": {"$lt": end},
+            "$or": [{"ended_at": {"$gt": start}}, {"ended_at": None}],
+        }
+        if identifier is not None:
+            match["identifier"] = identifier
+
+        until = min(end, datetime.utcnow())
+        pipeline = [
+            {"$match": match},
+            {"$project": {
+                "identifier": 1,
+                "ms": {"$subtract": [
+                    {"$min": [until, {"$ifNull": ["$ended_at", until]}]},
+                    {"$max": [start, "$started_at"]},
+                ]},
+            }},
+            {"$group": {
+                "_id": "$identifier",
+                "sessions": {"$sum": 1},
+                "ms": {"$sum": {"$max": ["$ms", 0]}},
+            }},
+            {"$sort": {"ms": -1}},
+            {"$limit": limit},
+        ]
+
+        with batch_deadline():
+            rows = await for_dashboard(sessions_collection).aggregate(pipeline).to_list(None)
+        return [
+            {
+                "identifier": row["_id"],
+                "sessions": row["sessions"],
+                "hours": round(row["ms"] / 3_600_000, 2),
+            }
+            for row in rows
+        ]
@@ -0,0 +1,179 @@
+import bisect
+import re
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from app.repositories.factory import get_repositories
+
+# Plates are matched on these characters only; "?" stands for one
+# character a camera could not read
+_NOT_PLATE = re.compile(r"[^A-Z0-9?]")
+_GRAM = 2
+
+
+@dataclass(frozen=True, slots=True)
+class VehicleRecord:
+    vehicle_number: str
+    visitor_id: str
+    name: Optional[str]
+    number_of_visitors: Optional[int]
+    entered_at: Optional[datetime]
+
+
+def normalize_plate(plate: str) -> str:
+    return _NOT_PLATE.sub("", plate.upper())
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + _GRAM] for i in range(len(text) - _GRAM + 1)}
+
+
+class VehicleIndex:
+    """
+    In-memory index of the vehicles of visitors currently inside.
+
+    Exact lookups are a dict hit, prefix searches bisect a sorted list of
+    plates, and partial searches narrow candidates with a bigram index
+    before matching. Visitor entry/exit keep it current in this worker
+    and publish their changes on the "vehicles" topic, which the other
+    workers apply; a publish without changes makes them reload.
+    """
+
+    _by_plate: Dict[str, VehicleRecord] = {}
+    _by_visitor: Dict[str, str] = {}
+    _sorted: List[str] = []
+    _grams: Dict[str, Set[str]] = {}
+
+    @classmethod
+    async def load(cls) -> None:
+        """
+        Rebuild from campus_state.
+        """
+        states = await get_repositories().campus_state.list(
+            user_type="visitor", is_inside=True
+        )
+        by_plate = {}
+        for state in states:
+            record = _to_record(state)
+            if record:
+                by_plate[record.vehicle_number] = record
+
+        grams: Dict[str, Set[str]] = {}
+        for plate in by_plate:
+            for gram in _grams(plate):
+                grams.setdefault(gram, set()).add(plate)
+
+        cls._by_plate = by_plate
+        cls._by_visitor = {record.visitor_id: plate for plate, record in by_plate.items()}
+        cls._sorted = sorted(by_plate)
+        cls._grams = grams
+
+    @classmethod
+    def add(cls, record: VehicleRecord) -> None:
+        plate = record.vehicle_number
+        previous = cls._by_plate.get(plate)
+        if previous is None:
+            bisect.insort(cls._sorted, plate)
+            for gram in _grams(plate):
+                cls._grams.setdefault(gram, set()).add(plate)
+        else:
+            # The plate came back in with a new visitor entry
+            cls._by_visitor.pop(previous.visitor_id, None)
+        cls._by_plate[plate] = record
+        cls._by_visitor[record.visitor_id] = plate
+
+    @classmethod
+    def remove_visitor(cls, visitor_id: str) -> Optional[VehicleRecord]:
+        plate = cls._by_visitor.pop(visitor_id, None)
+        if plate is None:
+            return None
+
+        record = cls._by_plate.pop(plate)
+        i = bisect.bisect_left(cls._sorted, plate)
+        if i < len(cls._sorted) and cls._sorted[i] == plate:
+            del cls._sorted[i]
+        for gram in _grams(plate):
+            plates = cls._grams.get(gram)
+            if plates:
+                plates.discard(plate)
+                if not plates:
+                    del cls._grams[gram]
+        return record
+
+    @classmethod
+    def apply(cls, changes: List[dict]) -> None:
+        """
+        Replay changes made by another worker, in order.
+        """
+        for change in changes:
+            if change["op"] == "add":
+                cls.add(VehicleRecord(**change["record"]))
+            else:
+                cls.remove_visitor(change["visitor_id"])
+
+    @classmethod
+    def lookup(cls, plate: str) -> Optional[VehicleRecord]:
+        return cls._by_plate.get(normalize_plate(plate))
+
+    @classmethod
+    def search_prefix(cls, prefix: str, limit: int = 20) -> List[VehicleRecord]:
+        prefix = normalize_plate(prefix)
+        start = bisect.bisect_left(cls._sorted, prefix)
+        matches = []
+        for plate in cls._sorted[start:start + limit]:
+            if not plate.startswith(prefix):
+                break
+            matches.append(cls._by_plate[plate])
+        return matches
+
+    @classmethod
+    def search_partial(cls, fragment: str, limit: int = 20) -> List[VehicleRecord]:
+        """
+        Plates containing `fragment`, where "?" matches any one character.
+        """
+        fragment = normalize_plate(fragment)
+        if not fragment.strip("?"):
+            return []
+
+        # Every readable run of two or more characters narrows the candidates
+        grams = set().union(*(_grams(part) for part in fragment.split("?")))
+        if grams:
+            sets = sorted((cls._grams.get(gram, set()) for gram in grams), key=len)
+            candidates = sorted(sets[0].intersection(*sets[1:]))
+        else:
+            candidates = cls._sorted
+
+        pattern = re.compile(".".join(re.escape(part) for part in fragment.split("?")))
+        matches = []
+        for plate in candidates:
+            if pattern.search(plate):
+                matches.append(cls._by_plate[plate])
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    @classmethod
+    def size(cls) -> int:
+        return len(cls._by_plate)
+
+
+def added(record: VehicleRecord) -> dict:
+    return {"op": "add", "record": asdict(record)}
+
+
+def removed(visitor_id: str) -> dict:
+    return {"op": "remove", "visitor_id": visitor_id}
+
+
+def _to_record(state: dict) -> Optional[VehicleRecord]:
+    plate = state.get("vehicle_number")
+    if not plate:
+        return None
+    return VehicleRecord(
+        vehicle_number=normalize_plate(plate),
+        visitor_id=state["identifier"],
+        name=state.get("user_name"),
+        number_of_visitors=state.get("number_of_visitors"),
+        entered_at=state.get("last_entry_time"),
+    )
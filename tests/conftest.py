@@ -0,0 +1,25 @@
+import asyncio
+import os
+
+import pytest
+
+# The Mongo backend tests use their own database on TEST_MONGO_URI and
+# drop its collections, so never point them at the app's settings
+os.environ["MONGO_URI"] = os.getenv(
+    "TEST_MONGO_URI", "mongodb://127.0.0.1:27017/?serverSelectionTimeoutMS=500"
+)
+os.environ["DATABASE_NAME"] = os.getenv("TEST_DATABASE_NAME", "campus_security_test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+
+@pytest.fixture(scope="session")
+def run():
+    """
+    Runs a coroutine to completion. One loop for the whole session, as
+    the Motor client binds to the first loop it is used on.
+    """
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
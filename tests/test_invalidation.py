@@ -0,0 +1,179 @@
+import asyncio
+import random
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from app.core.database import invalidation
+from app.core.database.invalidation import InvalidationBus
+
+
+class _Session:
+    operation_time = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Client:
+    async def start_session(self, **kwargs):
+        return _Session()
+
+
+class _Database:
+    client = _Client()
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    async def to_list(self, length):
+        return self._docs
+
+
+class SharedVersions:
+    """
+    The cache_versions collection all workers share, with a little
+    latency so their calls interleave.
+    """
+
+    database = _Database()
+
+    def __init__(self):
+        self.docs = {}
+        self.bumps = 0
+        self.fail_next = 0
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        await asyncio.sleep(random.uniform(0, 0.002))
+        if self.fail_next:
+            self.fail_next -= 1
+            raise AutoReconnect("connection lost")
+        self.bumps += 1
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "version": 0})
+        if isinstance(update, list):
+            # The change-log pipeline: bump, then append under the new version
+            doc["version"] += 1
+            items = update[1]["$set"]["changes"]["$slice"][0]["$concatArrays"][1][0]["items"]["$literal"]
+            log = doc.get("changes", []) + [{"version": doc["version"], "items": list(items)}]
+            doc["changes"] = log[-invalidation.CHANGE_LOG_LENGTH:]
+        else:
+            doc["version"] += update["$inc"]["version"]
+        return dict(doc)
+
+    def find(self, query, **kwargs):
+        return _Cursor([dict(doc) for doc in self.docs.values()])
+
+
+def _worker():
+    # Own class state, as a separate process would have
+    return type("Worker", (InvalidationBus,), {
+        "_listeners": {}, "_versions": {}, "_seen_at": {}, "_pending": {},
+        "_writes": {}, "_changes": {}, "_blind": {}, "_appliers": {},
+        "_wake": None, "_flusher": None, "_local_only": False,
+    })
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    shared = SharedVersions()
+    monkeypatch.setattr(invalidation, "cache_versions_collection", shared)
+    return shared
+
+
+def test_workers_converge_under_concurrent_writes(versions, run):
+    database = {}
+    workers = [_worker() for _ in range(4)]
+    caches = [dict() for _ in workers]
+
+    for worker, cache in zip(workers, caches):
+        async def reload(cache=cache):
+            cache.clear()
+            cache.update(database)
+        worker.subscribe("campus_state", reload)
+
+    async def scan(worker, key):
+        await asyncio.sleep(random.uniform(0, 0.003))
+        database[key] = True
+        before = worker.tag("campus_state")
+        await worker.publish_soon("campus_state")
+        # The writer's own tag moves at once, so it can't 304 its write
+        assert worker.tag("campus_state") != before
+
+    async def scenario():
+        await asyncio.gather(*(
+            scan(worker, (n, i)) for n, worker in enumerate(workers) for i in range(50)
+        ))
+        for worker in workers:
+            await worker.stop()
+        for worker in workers:
+            await worker.sync()
+
+    run(scenario())
+
+    final = versions.docs["campus_state"]["version"]
+    assert all(worker.tag("campus_state") == str(final) for worker in workers)
+    assert all(cache == database for cache in caches)
+    assert len(database) == 200
+    # Writes were folded into fewer bumps of the shared counter
+    assert versions.bumps == final < 200
+
+
+def test_failed_bump_stays_pending(versions, monkeypatch, run):
+    monkeypatch.setattr(invalidation, "INVALIDATION_POLL_MS", 10)
+    worker = _worker()
+    versions.fail_next = 1
+
+    async def scenario():
+        # Doesn't raise, although the first bump fails
+        await worker.publish_soon("student_logs")
+        await asyncio.sleep(0.1)
+        await worker.stop()
+
+    run(scenario())
+
+    assert versions.docs["student_logs"]["version"] == 1
+    assert worker.version("student_logs") == 1
+    assert not worker.unpublished(["student_logs"])
+
+
+def test_published_changes_are_applied_instead_of_reloading(versions, monkeypatch, run):
+    monkeypatch.setattr(invalidation, "CHANGE_LOG_LENGTH", 4)
+    writer, reader = _worker(), _worker()
+    applied, reloads = [], []
+
+    async def reload():
+        reloads.append(True)
+
+    reader.subscribe("vehicles", reload)
+    reader.subscribe_changes("vehicles", applied.extend)
+
+    async def scenario():
+        await writer.publish_soon("vehicles", [{"op": "add", "n": 1}])
+        await writer.flush()
+        await writer.publish_soon("vehicles", [{"op": "remove", "n": 1}])
+        await writer.publish_soon("vehicles", [{"op": "add", "n": 2}])
+        await writer.flush()
+        await reader.sync()
+        assert applied == [{"op": "add", "n": 1}, {"op": "remove", "n": 1}, {"op": "add", "n": 2}]
+        assert reloads == []
+
+        # A publish without changes leaves a gap: reload
+        await writer.publish("vehicles")
+        await reader.sync()
+        assert len(reloads) == 1
+
+        # So does falling further behind than the log reaches
+        for n in range(6):
+            await writer.publish_soon("vehicles", [{"op": "add", "n": n}])
+            await writer.flush()
+        await reader.sync()
+        assert len(reloads) == 2
+        await writer.stop()
+
+    run(scenario())
+    assert reader.version("vehicles") == writer.version("vehicles") == 9
@@ -0,0 +1,218 @@
+"""
+The sessions index against a brute-force replay of the log: whoever's
+last event at T is an opening one (a visitor's entry, a student's
+exit) must be listed at T, and no one else.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo import DeleteMany, ReplaceOne
+
+from app.services import presence_service
+from app.services.presence_service import PresenceService, sessions_for
+
+T0 = datetime(2025, 1, 6)
+IDENTIFIERS = [("student", f"21BCS{n:03}") for n in range(8)] + [("visitor", f"v{n}") for n in range(8)]
+
+_COMPARE = {
+    "$gt": lambda value, bound: value is not None and value > bound,
+    "$gte": lambda value, bound: value is not None and value >= bound,
+    "$lt": lambda value, bound: value is not None and value < bound,
+    "$lte": lambda value, bound: value is not None and value <= bound,
+    "$in": lambda value, bound: value in bound or (isinstance(value, list) and any(v in bound for v in value)),
+    "$nin": lambda value, bound: value not in bound,
+}
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            for op, bound in condition.items():
+                if op == "$not":
+                    if _matches(doc, {key: bound}):
+                        return False
+                elif not _COMPARE[op](value, bound):
+                    return False
+        elif isinstance(value, list):
+            if condition not in value:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda doc: doc[field], reverse=order < 0)
+        return self
+
+    async def to_list(self, length):
+        return self._docs
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Collection:
+    """Just the queries and writes the presence service makes."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query, projection=None, **kwargs):
+        return _Cursor([dict(doc) for doc in self.docs.values() if _matches(doc, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(doc) for doc in self.docs.values() if _matches(doc, query)), None)
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+        doc.update(update["$set"])
+
+    async def delete_many(self, query):
+        for key in [key for key, doc in self.docs.items() if _matches(doc, query)]:
+            del self.docs[key]
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            if isinstance(op, ReplaceOne):
+                self.docs[op._filter["_id"]] = dict(op._doc)
+            elif isinstance(op, DeleteMany):
+                await self.delete_many(op._filter)
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    logs, sessions, checkpoints = _Collection(), _Collection(), _Collection()
+    monkeypatch.setattr(presence_service, "access_logs_collection", logs)
+    monkeypatch.setattr(presence_service, "sessions_collection", sessions)
+    monkeypatch.setattr(presence_service, "session_checkpoints_collection", checkpoints)
+    return logs, sessions, checkpoints
+
+
+def _log(logs, minutes, **extra):
+    user_type, identifier = random.choice(IDENTIFIERS)
+    event = {
+        "_id": ObjectId(),
+        "user_type": user_type,
+        "identifier": identifier,
+        "direction": random.choice(["entry", "exit"]),
+        "gate_number": random.randint(1, 4),
+        "timestamp": T0 + timedelta(minutes=minutes),
+        **extra,
+    }
+    logs.docs[event["_id"]] = event
+
+
+def _replay(logs, when):
+    """Everyone whose last event at `when` opened a session."""
+    last = {}
+    for event in sorted(logs.docs.values(), key=lambda e: e["timestamp"]):
+        if event["timestamp"] <= when:
+            last[(event["user_type"], event["identifier"])] = event["direction"]
+    return {key for key, direction in last.items() if direction == presence_service._OPENS[key[0]]}
+
+
+def _listed(result):
+    return {(s["user_type"], s["identifier"]) for s in result["visitors_inside"] + result["students_outside"]}
+
+
+def _check(presence, logs, run, samples=40):
+    for _ in range(samples):
+        when = T0 + timedelta(minutes=random.randint(0, 60 * 24 * 6))
+        assert _listed(run(presence.at(when))) == _replay(logs, when), when
+
+
+def test_sessions_for_matches_the_replay():
+    random.seed(7)
+    events = sorted(
+        (
+            {
+                "_id": ObjectId(),
+                "identifier": "21BCS001",
+                "direction": random.choice(["entry", "exit"]),
+                "timestamp": T0 + timedelta(minutes=minutes),
+            }
+            for minutes in random.sample(range(60 * 24 * 5), 60)
+        ),
+        key=lambda e: e["timestamp"],
+    )
+    sessions = sessions_for("student", events)
+
+    for minutes in range(0, 60 * 24 * 6, 17):
+        when = T0 + timedelta(minutes=minutes)
+        last = [e["direction"] for e in events if e["timestamp"] <= when][-1:]
+        outside = any(
+            s["started_at"] <= when and (s["ended_at"] is None or when < s["ended_at"]) for s in sessions
+        )
+        assert outside == (last == ["exit"]), when
+    # Closed sessions are bucketed under every day they touch
+    for s in sessions:
+        if s["ended_at"] is not None:
+            assert s["days"][0] == presence_service._day(s["started_at"])
+            assert s["days"][-1] == presence_service._day(s["ended_at"])
+
+
+def test_refresh_matches_the_replay_with_late_events(collections, run):
+    random.seed(11)
+    logs, sessions, checkpoints = collections
+    presence = PresenceService()
+    minutes = random.sample(range(60 * 24 * 5), 400)
+
+    for m in minutes[:250]:
+        _log(logs, m)
+    run(presence.rebuild())
+    _check(presence, logs, run)
+
+    # Edge events synced now, recorded days ago, between existing ones
+    checkpoints.docs["presence"]["indexed_through"] = datetime.utcnow()
+    synced_at = datetime.utcnow() + timedelta(seconds=1)
+    for m in minutes[250:]:
+        _log(logs, m, synced_at=synced_at)
+    run(presence.refresh())
+    _check(presence, logs, run)
+
+    # Running it again changes nothing
+    before = dict(sessions.docs)
+    run(presence.refresh())
+    assert sessions.docs.keys() == before.keys()
+    _check(presence, logs, run)
+
+
+def test_rebuild_prunes_sessions_no_log_produces(collections, run):
+    random.seed(13)
+    logs, sessions, _ = collections
+    presence = PresenceService()
+    for m in random.sample(range(60 * 24 * 5), 200):
+        _log(logs, m)
+    run(presence.rebuild())
+    kept = set(sessions.docs)
+
+    stale = ObjectId()
+    sessions.docs[stale] = {
+        "_id": stale, "user_type": "visitor", "identifier": "gone",
+        "started_at": T0, "ended_at": None, "written_at": T0,
+    }
+    run(presence.rebuild())
+
+    assert set(sessions.docs) == kept
+    _check(presence, logs, run)
@@ -0,0 +1,225 @@
+"""
+One contract, three backends: every test runs against the memory,
+SQLite and MongoDB repositories. The MongoDB ones are skipped when no
+server answers on TEST_MONGO_URI.
+"""
+import functools
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.repositories.factory import build_repositories
+
+T0 = datetime(2025, 1, 6, 8, 0, 0)
+
+
+@functools.lru_cache(maxsize=None)
+def _mongo_available() -> bool:
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    from app.core.database.client import MONGODB_URI
+
+    try:
+        with MongoClient(MONGODB_URI, serverSelectionTimeoutMS=500) as client:
+            client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+async def _reset_mongo() -> None:
+    from app.core.database.client import MongoClient
+    from app.core.database.indexes import create_indexes
+
+    db = MongoClient.get_database()
+    for name in await db.list_collection_names():
+        await db.drop_collection(name)
+    # The unique indexes are part of the contract (usernames)
+    await create_indexes(db)
+
+
+@pytest.fixture(params=["memory", "sqlite", "mongo"])
+def repos(request, tmp_path, run):
+    if request.param == "mongo":
+        if not _mongo_available():
+            pytest.skip("no MongoDB server on TEST_MONGO_URI")
+        run(_reset_mongo())
+    return build_repositories(request.param, sqlite_path=str(tmp_path / "store.db"))
+
+
+def _without_id(doc):
+    # Only MongoDB adds an _id to these records
+    return {key: value for key, value in doc.items() if key != "_id"} if doc else doc
+
+
+# campus_state
+
+def test_campus_state_upsert_merges_fields(repos, run):
+    states = repos.campus_state
+    assert run(states.get(user_type="student", identifier="21BCS001")) is None
+
+    run(states.upsert(user_type="student", identifier="21BCS001", fields={
+        "user_name": "Asha", "is_inside": False, "last_exit_time": T0,
+    }))
+    run(states.upsert(user_type="student", identifier="21BCS001", fields={
+        "is_inside": True, "purpose": None,
+    }))
+
+    assert _without_id(run(states.get(user_type="student", identifier="21BCS001"))) == {
+        "user_type": "student",
+        "identifier": "21BCS001",
+        "user_name": "Asha",
+        "is_inside": True,
+        "last_exit_time": T0,
+        "purpose": None,
+    }
+
+
+def test_campus_state_delete_counts(repos, run):
+    states = repos.campus_state
+    run(states.upsert(user_type="visitor", identifier="v1", fields={"is_inside": True}))
+
+    assert run(states.delete(user_type="visitor", identifier="v1")) == 1
+    assert run(states.delete(user_type="visitor", identifier="v1")) == 0
+    assert run(states.get(user_type="visitor", identifier="v1")) is None
+
+
+def test_campus_state_list_filters_and_projects(repos, run):
+    states = repos.campus_state
+    run(states.upsert(user_type="student", identifier="a", fields={"is_inside": False, "user_name": "A"}))
+    run(states.upsert(user_type="student", identifier="b", fields={"is_inside": True, "user_name": "B"}))
+    run(states.upsert(user_type="visitor", identifier="c", fields={"is_inside": False, "user_name": "C"}))
+
+    outside = run(states.list(user_type="student", is_inside=False))
+    assert [_without_id(state) for state in outside] == [
+        {"user_type": "student", "identifier": "a", "is_inside": False, "user_name": "A"}
+    ]
+
+    projected = run(states.list(user_type="student", is_inside=True, fields=["identifier", "missing"]))
+    assert projected == [{"identifier": "b"}]
+
+
+# exit_permissions
+
+def test_exit_permissions_are_first_in_first_out(repos, run):
+    permissions = repos.exit_permissions
+    assert run(permissions.get(student_roll="21BCS001")) is None
+
+    run(permissions.create(student_roll="21BCS001", artifact={"purpose": "MARKET", "allowed_until": T0}))
+    run(permissions.create(student_roll="21BCS001", artifact={"purpose": "HOME", "allowed_until": T0}))
+
+    first = run(permissions.get(student_roll="21BCS001"))
+    assert _without_id(first) == {"student_roll": "21BCS001", "purpose": "MARKET", "allowed_until": T0}
+
+    assert run(permissions.delete(student_roll="21BCS001")) == 1
+    assert run(permissions.get(student_roll="21BCS001"))["purpose"] == "HOME"
+    assert run(permissions.delete(student_roll="21BCS001")) == 1
+    assert run(permissions.delete(student_roll="21BCS001")) == 0
+
+
+# visitors
+
+def test_visitor_roundtrip(repos, run):
+    visitors = repos.visitors
+    visitor_id = run(visitors.create({"name": "Ravi", "number_of_visitors": 2, "entered_at": T0}))
+
+    visitor = run(visitors.get(visitor_id=visitor_id))
+    assert str(visitor["_id"]) == visitor_id
+    assert _without_id(visitor) == {"name": "Ravi", "number_of_visitors": 2, "entered_at": T0}
+
+    assert run(visitors.delete(visitor_id=visitor_id)) == 1
+    assert run(visitors.delete(visitor_id=visitor_id)) == 0
+    assert run(visitors.get(visitor_id=visitor_id)) is None
+
+
+def test_visitor_unknown_ids(repos, run):
+    assert run(repos.visitors.get(visitor_id="not-an-id")) is None
+    assert run(repos.visitors.delete(visitor_id="not-an-id")) == 0
+
+
+# access_logs
+
+def _entry(user_type, identifier, minutes, **extra):
+    return {
+        "user_type": user_type,
+        "identifier": identifier,
+        "direction": "entry",
+        "gate_number": 1,
+        "timestamp": T0 + timedelta(minutes=minutes),
+        **extra,
+    }
+
+
+def test_access_logs_newest_first_per_type(repos, run):
+    logs = repos.access_logs
+    run(logs.append(_entry("student", "a", 1)))
+    run(logs.append(_entry("visitor", "v", 2, vehicle_number="HP12AB1234")))
+    run(logs.append(_entry("student", "b", 3)))
+
+    students = run(logs.list(user_type="student"))
+    assert [_without_id(entry) for entry in students] == [
+        _entry("student", "b", 3),
+        _entry("student", "a", 1),
+    ]
+
+    visitors = run(logs.list(user_type="visitor", fields=["identifier", "vehicle_number"]))
+    assert visitors == [{"identifier": "v", "vehicle_number": "HP12AB1234"}]
+
+
+def test_access_log_append_keeps_callers_entry(repos, run):
+    entry = _entry("student", "a", 1)
+    run(repos.access_logs.append(entry))
+    assert entry == _entry("student", "a", 1)
+
+
+# auth_users
+
+def _user(username, is_active=True):
+    return {"username": username, "hashed_password": "x", "role": "GUARD", "is_active": is_active}
+
+
+def test_auth_users_create_many_rejects_taken_names(repos, run):
+    users = repos.auth_users
+    assert run(users.create_many([])) == set()
+    assert run(users.create_many([_user("g1"), _user("g2")])) == set()
+
+    rejected = run(users.create_many([_user("g2"), _user("g3"), _user("g3")]))
+    assert rejected == {"g2", "g3"}
+    assert run(users.existing_usernames(["g1", "g3", "g4"])) == {"g1", "g3"}
+
+
+def test_auth_users_set_active(repos, run):
+    users = repos.auth_users
+    run(users.create_many([_user("g1")]))
+    assert _without_id(run(users.get_active(username="g1"))) == _user("g1")
+
+    assert run(users.set_active(username="g1", is_active=False)) is True
+    assert run(users.get_active(username="g1")) is None
+    assert run(users.set_active(username="nobody", is_active=False)) is False
+
+    run(users.set_active(username="g1", is_active=True))
+    assert run(users.get_active(username="g1"))["is_active"] is True
+
+
+# token_revocations
+
+def test_revocations_since_and_expiry(repos, run):
+    revocations = repos.revocations
+    run(revocations.add(key="jti:a", revoked_at=T0, expires_at=T0 + timedelta(hours=1)))
+    run(revocations.add(key="jti:b", revoked_at=T0 + timedelta(minutes=5), expires_at=T0 + timedelta(hours=2)))
+    # Re-adding a key replaces it
+    run(revocations.add(key="user:g1", revoked_at=T0, expires_at=T0 + timedelta(hours=1)))
+    run(revocations.add(key="user:g1", revoked_at=T0 + timedelta(minutes=10), expires_at=T0 + timedelta(hours=3)))
+
+    everything = run(revocations.list_since(since=None, now=T0))
+    assert sorted(entry["key"] for entry in everything) == ["jti:a", "jti:b", "user:g1"]
+
+    recent = run(revocations.list_since(since=T0 + timedelta(minutes=5), now=T0))
+    assert sorted(recent, key=lambda entry: entry["key"]) == [
+        {"key": "jti:b", "revoked_at": T0 + timedelta(minutes=5), "expires_at": T0 + timedelta(hours=2)},
+        {"key": "user:g1", "revoked_at": T0 + timedelta(minutes=10), "expires_at": T0 + timedelta(hours=3)},
+    ]
+
+    later = run(revocations.list_since(since=None, now=T0 + timedelta(hours=1)))
+    assert sorted(entry["key"] for entry in later) == ["jti:b", "user:g1"]
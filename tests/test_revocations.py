@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import pytest
+from jose import jwt
+
+from app.core.security import ALGORITHM, SECRET_KEY, create_access_token
+from app.services import revocation_service
+from app.services.revocation_service import RevocationService
+
+REVOKED_AT = datetime(2025, 1, 6, 8, 0, 0, 500000)
+
+
+@pytest.fixture
+def revoked_user(monkeypatch):
+    users = {}
+    monkeypatch.setattr(RevocationService, "_users", users)
+    revocation_service._apply(
+        {"key": "user:g1", "revoked_at": REVOKED_AT, "expires_at": REVOKED_AT + timedelta(hours=1)},
+        {}, users
+    )
+
+
+def _issued_at(monkeypatch, when: datetime) -> dict:
+    class _Clock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return when
+
+    monkeypatch.setattr("app.core.security.datetime", _Clock)
+    token = create_access_token({"username": "g1"})
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+
+
+def test_user_revocation_covers_tokens_issued_up_to_it(revoked_user, monkeypatch):
+    assert RevocationService.is_revoked(_issued_at(monkeypatch, REVOKED_AT - timedelta(milliseconds=400)))
+    # Same millisecond: counted as before the revocation
+    assert RevocationService.is_revoked(_issued_at(monkeypatch, REVOKED_AT + timedelta(microseconds=900)))
+    # Tokens without an iat predate it
+    assert RevocationService.is_revoked({"username": "g1"})
+
+
+def test_tokens_issued_later_in_the_same_second_stay_valid(revoked_user, monkeypatch):
+    assert not RevocationService.is_revoked(_issued_at(monkeypatch, REVOKED_AT + timedelta(milliseconds=1)))
+    assert not RevocationService.is_revoked(_issued_at(monkeypatch, REVOKED_AT + timedelta(milliseconds=400)))